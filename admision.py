@@ -0,0 +1,170 @@
+# admision.py - Control de admisión: concurrencia por ruta, token bucket por cliente y colas con plazo
+import asyncio
+import json
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+
+@dataclass
+class ReglaAdmision:
+    """Límites para una ruta cara. `ruta` termina en '*' para indicar prefijo."""
+    ruta: str
+    metodos: Tuple[str, ...] = ("GET",)
+    max_concurrencia: int = 2
+    max_cola: int = 8
+    espera_max_s: float = 2.0
+    tasa_por_s: float = 2.0
+    rafaga: int = 5
+    # Estado interno
+    activos: int = field(default=0, init=False)
+    en_cola: int = field(default=0, init=False)
+    admitidas: int = field(default=0, init=False)
+    rechazadas_tasa: int = field(default=0, init=False)
+    rechazadas_saturacion: int = field(default=0, init=False)
+    _semaforo: Optional[asyncio.Semaphore] = field(default=None, init=False, repr=False)
+
+    def aplica(self, metodo: str, ruta: str) -> bool:
+        if metodo not in self.metodos:
+            return False
+        if self.ruta.endswith("*"):
+            return ruta.startswith(self.ruta[:-1])
+        return ruta == self.ruta
+
+    @property
+    def semaforo(self) -> asyncio.Semaphore:
+        if self._semaforo is None:
+            self._semaforo = asyncio.Semaphore(self.max_concurrencia)
+        return self._semaforo
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "ruta": self.ruta,
+            "metodos": list(self.metodos),
+            "max_concurrencia": self.max_concurrencia,
+            "max_cola": self.max_cola,
+            "espera_max_s": self.espera_max_s,
+            "tasa_por_s": self.tasa_por_s,
+            "rafaga": self.rafaga,
+            "activos": self.activos,
+            "en_cola": self.en_cola,
+            "admitidas": self.admitidas,
+            "rechazadas_429": self.rechazadas_tasa,
+            "rechazadas_503": self.rechazadas_saturacion,
+        }
+
+
+class CuboTokens:
+    def __init__(self, tasa_por_s: float, rafaga: int):
+        self.tasa = tasa_por_s
+        self.capacidad = rafaga
+        self.tokens = float(rafaga)
+        self.ultimo = time.monotonic()
+
+    def tomar(self) -> float:
+        """0 si hay token; si no, segundos hasta el próximo"""
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.ultimo) * self.tasa)
+        self.ultimo = ahora
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.tasa if self.tasa > 0 else 60.0
+
+
+class ControlAdmision:
+    """Middleware ASGI. Las rutas sin regla (health, check-in...) pasan sin coste.
+
+    El cliente se identifica por su X-API-Key sólo si está entre `claves`: una
+    clave inventada no abre un cubo nuevo, cuenta como su IP. La IP es la del
+    par TCP o, detrás de `proxies_confiables` proxies, la que el más externo
+    agregó a X-Forwarded-For (las anteriores las escribe el cliente y no valen).
+    Todo el estado vive en el event loop, así que no necesita locks.
+    """
+
+    def __init__(self, app, reglas: List[ReglaAdmision], max_clientes: int = 10000,
+                 claves: Iterable[str] = (), proxies_confiables: int = 0):
+        self.app = app
+        self.reglas = reglas
+        self.max_clientes = max_clientes
+        self.claves = frozenset(c for c in claves if c)
+        self.proxies_confiables = max(0, proxies_confiables)
+        self._cubos: "OrderedDict[tuple, CuboTokens]" = OrderedDict()
+
+    def _clave_cliente(self, scope) -> str:
+        reenviada = None
+        for nombre, valor in scope.get("headers", []):
+            if nombre == b"x-api-key" and self.claves:
+                clave = valor.decode("latin-1")
+                if clave in self.claves:
+                    return "key:" + clave
+            elif nombre == b"x-forwarded-for":
+                # Varias cabeceras equivalen a una sola separada por comas
+                reenviada = valor.decode("latin-1") if reenviada is None else f"{reenviada},{valor.decode('latin-1')}"
+        if self.proxies_confiables and reenviada:
+            saltos = [ip.strip() for ip in reenviada.split(",") if ip.strip()]
+            if len(saltos) >= self.proxies_confiables:
+                return "ip:" + saltos[-self.proxies_confiables]
+        cliente = scope.get("client")
+        return "ip:" + (cliente[0] if cliente else "desconocido")
+
+    def _cubo(self, regla: ReglaAdmision, cliente: str) -> CuboTokens:
+        clave = (regla.ruta, cliente)
+        cubo = self._cubos.get(clave)
+        if cubo is None:
+            cubo = self._cubos[clave] = CuboTokens(regla.tasa_por_s, regla.rafaga)
+            while len(self._cubos) > self.max_clientes:
+                self._cubos.popitem(last=False)
+        else:
+            self._cubos.move_to_end(clave)
+        return cubo
+
+    async def _rechazar(self, send, estado: int, detalle: str, reintentar_s: float):
+        cuerpo = json.dumps({"detail": detalle}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": estado,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(cuerpo)).encode()),
+                (b"retry-after", str(max(1, int(reintentar_s + 0.999))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": cuerpo})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        regla = next((r for r in self.reglas if r.aplica(scope["method"], scope["path"])), None)
+        if regla is None:
+            return await self.app(scope, receive, send)
+
+        espera = self._cubo(regla, self._clave_cliente(scope)).tomar()
+        if espera > 0:
+            regla.rechazadas_tasa += 1
+            return await self._rechazar(send, 429, "Demasiadas peticiones", espera)
+
+        semaforo = regla.semaforo
+        if semaforo.locked():
+            if regla.en_cola >= regla.max_cola:
+                regla.rechazadas_saturacion += 1
+                return await self._rechazar(send, 503, "Servicio saturado, reintenta más tarde", regla.espera_max_s)
+            regla.en_cola += 1
+            try:
+                await asyncio.wait_for(semaforo.acquire(), timeout=regla.espera_max_s)
+            except asyncio.TimeoutError:
+                regla.rechazadas_saturacion += 1
+                return await self._rechazar(send, 503, "Tiempo de espera agotado en la cola", regla.espera_max_s)
+            finally:
+                regla.en_cola -= 1
+        else:
+            await semaforo.acquire()
+
+        regla.activos += 1
+        regla.admitidas += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            regla.activos -= 1
+            semaforo.release()
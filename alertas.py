@@ -0,0 +1,111 @@
+# alertas.py - Alertas del dashboard (vencimientos, demanda de clases, inactividad) calculadas sobre columnas enteras
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import List, Optional
+
+import numpy as np
+import pandas as pd
+
+UMBRAL_CLASE_LLENA = 80
+UMBRAL_ALTA_DEMANDA = 60
+
+
+@dataclass
+class ResultadoAlertas:
+    """Una tabla por tipo de alerta; `mensajes()` las convierte en las líneas del dashboard.
+
+    - vencimientos: id, nombre, vencimiento, dias (0..dias_aviso)
+    - demanda: id, nombre, reservas, capacidad_max, ocupacion, nivel ("llena" | "alta")
+    - inactivos: id, nombre, ultima_entrada, dias_inactivo
+    """
+    vencimientos: pd.DataFrame = field(default_factory=pd.DataFrame)
+    demanda: pd.DataFrame = field(default_factory=pd.DataFrame)
+    inactivos: pd.DataFrame = field(default_factory=pd.DataFrame)
+
+    @property
+    def total(self) -> int:
+        return len(self.vencimientos) + len(self.demanda) + len(self.inactivos)
+
+    def mensajes(self, limite: Optional[int] = None) -> List[str]:
+        lineas = []
+        if self.total == 0:
+            return lineas
+        for socio_id, nombre, dias in self.vencimientos[["id", "nombre", "dias"]].itertuples(index=False):
+            cuando = "HOY" if dias == 0 else ("1 día" if dias == 1 else f"{dias} días")
+            lineas.append(f" **{cuando}** - {nombre} (ID: {socio_id})")
+        for nombre, ocupacion, nivel in self.demanda[["nombre", "ocupacion", "nivel"]].itertuples(index=False):
+            titulo = "Clase llena" if nivel == "llena" else "Alta demanda"
+            lineas.append(f" **{titulo}** - {nombre} ({ocupacion:.0f}% ocupada)")
+        for nombre, dias in self.inactivos[["nombre", "dias_inactivo"]].itertuples(index=False):
+            lineas.append(f" **Inactivo** - {nombre} ({dias} días sin venir)")
+        return lineas[:limite] if limite is not None else lineas
+
+
+def _como_fecha(columna: pd.Series) -> pd.Series:
+    """datetime64 normalizado al día; lo que no es fecha queda NaT (p. ej. 'string')"""
+    if not pd.api.types.is_datetime64_any_dtype(columna):
+        columna = pd.to_datetime(columna, errors="coerce")
+    return columna.dt.normalize()
+
+
+def alertas_vencimiento(socios: pd.DataFrame, hoy: pd.Timestamp, dias_aviso: int = 3) -> pd.DataFrame:
+    if socios.empty or "vencimiento" not in socios.columns:
+        return pd.DataFrame(columns=["id", "nombre", "vencimiento", "dias"])
+    dias = (_como_fecha(socios["vencimiento"]) - hoy).dt.days
+    mascara = dias.between(0, dias_aviso)
+    resultado = socios.loc[mascara, ["id", "nombre", "vencimiento"]].assign(dias=dias[mascara].astype(int))
+    return resultado.reset_index(drop=True)
+
+
+def alertas_demanda(clases: pd.DataFrame, reservas: pd.DataFrame) -> pd.DataFrame:
+    columnas = ["id", "nombre", "reservas", "capacidad_max", "ocupacion", "nivel"]
+    if clases.empty or reservas.empty:
+        return pd.DataFrame(columns=columnas)
+    confirmadas = reservas.loc[reservas["estado"] == "confirmada", "clase_id"].value_counts()
+    resultado = clases[["id", "nombre", "capacidad_max"]].copy()
+    resultado["reservas"] = resultado["id"].map(confirmadas).fillna(0).astype(int)
+    capacidad = resultado["capacidad_max"].astype(float)
+    resultado["ocupacion"] = np.where(capacidad > 0, resultado["reservas"] / capacidad.where(capacidad > 0) * 100, 0.0)
+    resultado["nivel"] = np.select(
+        [resultado["ocupacion"] >= UMBRAL_CLASE_LLENA, resultado["ocupacion"] >= UMBRAL_ALTA_DEMANDA],
+        ["llena", "alta"], default="")
+    return resultado.loc[resultado["nivel"] != "", columnas].reset_index(drop=True)
+
+
+def alertas_inactividad(socios: pd.DataFrame, entradas: pd.DataFrame, hoy: pd.Timestamp,
+                        dias_inactividad: int = 30, ultimas: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+    """Socios que alguna vez vinieron y cuya última entrada es anterior a hoy - dias_inactividad.
+
+    `ultimas` (socio_id, ultima_entrada; /entradas/ultimas) cubre los meses
+    archivados, que ya no están en `entradas`: sin ella, quien lleva más tiempo
+    sin venir desaparecería de la alerta al archivarse sus entradas.
+    """
+    columnas = ["id", "nombre", "ultima_entrada", "dias_inactivo"]
+    partes = []
+    if not entradas.empty:
+        # tablas_dashboard ya deriva `fecha` (datetime64 al día) al cargar las entradas
+        if "fecha" in entradas.columns and pd.api.types.is_datetime64_any_dtype(entradas["fecha"]):
+            fechas = entradas["fecha"]
+        else:
+            fechas = _como_fecha(entradas["fecha_hora"])
+        partes.append(fechas.groupby(entradas["socio_id"].astype(str)).max())
+    if ultimas is not None and not ultimas.empty:
+        partes.append(_como_fecha(ultimas["ultima_entrada"]).groupby(ultimas["socio_id"].astype(str)).max())
+    if socios.empty or not partes:
+        return pd.DataFrame(columns=columnas)
+    ultimas = pd.concat(partes).groupby(level=0).max().rename("ultima_entrada")
+    resultado = socios[["id", "nombre"]].merge(ultimas, left_on="id", right_index=True, how="inner")
+    resultado = resultado[resultado["ultima_entrada"] < hoy - pd.Timedelta(days=dias_inactividad)]
+    resultado = resultado.assign(dias_inactivo=(hoy - resultado["ultima_entrada"]).dt.days.astype(int))
+    return resultado[columnas].reset_index(drop=True)
+
+
+def calcular_alertas(socios: pd.DataFrame, clases: pd.DataFrame, reservas: pd.DataFrame, entradas: pd.DataFrame,
+                     hoy: Optional[date] = None, dias_aviso: int = 3, dias_inactividad: int = 30,
+                     ultimas_entradas: Optional[pd.DataFrame] = None) -> ResultadoAlertas:
+    hoy = pd.Timestamp(hoy or datetime.now().date())
+    return ResultadoAlertas(
+        vencimientos=alertas_vencimiento(socios, hoy, dias_aviso),
+        demanda=alertas_demanda(clases, reservas),
+        inactivos=alertas_inactividad(socios, entradas, hoy, dias_inactividad, ultimas_entradas),
+    )
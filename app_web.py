@@ -1,11 +1,22 @@
 ﻿# app_web.py - Dashboard con manejo de errores mejorado
 import streamlit as st
 import pandas as pd
-import requests
 import os
+import logging
+import time
+import uuid
 import plotly.express as px
 import plotly.graph_objects as go
 from datetime import datetime, timedelta
+from alertas import calcular_alertas
+from datos_dashboard import AlmacenDatos, Conjunto
+from fuente_dashboard import crear_fuente
+from tiempos_dashboard import ETAPAS, Medidor
+
+# Una línea JSON por render (logger tiempos_dashboard) y los avisos del almacén de datos
+logging.basicConfig(level=os.environ.get("DASHBOARD_LOG_NIVEL", "INFO"))
+VERSION_APP = os.environ.get("DASHBOARD_VERSION", "2.1")
+HISTORIAL_TIEMPOS = 100
 
 # Configuración de la página
 st.set_page_config(
@@ -19,78 +30,158 @@ st.title(" Dashboard - Gestión del Gimnasio")
 st.markdown("---")
 
 # ========== FUNCIONES PARA OBTENER DATOS (CON MANEJO DE ERRORES MEJORADO) ==========
+# Cargas contra la API (API_URL) o, con DASHBOARD_BACKEND=local, contra la base directamente (ver fuente_dashboard).
+# Lanzan excepción si fallan; el almacén decide qué mostrar
+@st.cache_resource
+def fuente_datos():
+    """Fuente compartida por todas las sesiones: sesión HTTP con keep-alive o engine de la base"""
+    return crear_fuente()
+
+def _cargar_tabla(conjunto):
+    # Fechas a datetime64 una sola vez, textos repetidos como categorías (ver tablas_dashboard.ESQUEMAS)
+    return lambda campos=None: fuente_datos().tabla(conjunto, campos)
+
+def _cargar_reservas(campos=None, nombres=False):
+    # nombres=True: socio_nombre y clase_nombre vienen del join en la base, sin bajar socios ni clases
+    return fuente_datos().reservas(campos, nombres)
+
+def _cargar_reservas_detalle(clase_id, estado, desde, hasta, antes_de, limite):
+    # Una página ya unida con clase y socio; los filtros se aplican en la base
+    return fuente_datos().reservas_detalle(clase_id, estado, desde, hasta, antes_de, limite)
+
+def _pagina_vacia():
+    return {"reservas": pd.DataFrame(), "siguiente": None, "total": 0, "por_estado": {}}
+
+def _cargar_serie_entradas(desde, hasta, resolucion, max_puntos):
+    # El servidor agrupa y acota los puntos: Plotly recibe la serie ya reducida
+    return fuente_datos().serie_entradas(desde, hasta, resolucion, max_puntos)
+
+def _cargar_ultimas_entradas():
+    # Incluye los meses archivados, que ya no vienen en /entradas/ (alerta de inactividad)
+    return fuente_datos().ultimas_entradas()
+
+def _cargar_mapa_calor(tipo, clase_id):
+    return fuente_datos().mapa_calor(tipo, clase_id)
+
+def _ttl(conjunto, defecto):
+    return float(os.environ.get(f"DASHBOARD_TTL_{conjunto.upper()}", defecto))
+
+@st.cache_resource
+def almacen_datos():
+    """Un almacén por proceso: todas las sesiones del dashboard comparten los datos y el hilo de refresco"""
+    return AlmacenDatos({
+        "socios": Conjunto(_cargar_tabla("socios"), _ttl("socios", 60), pd.DataFrame),
+        "clases": Conjunto(_cargar_tabla("clases"), _ttl("clases", 300), pd.DataFrame),
+        "reservas": Conjunto(_cargar_reservas, _ttl("reservas", 30), pd.DataFrame),
+        "reservas_detalle": Conjunto(_cargar_reservas_detalle, _ttl("reservas", 30), _pagina_vacia),
+        "entradas": Conjunto(_cargar_tabla("entradas"), _ttl("entradas", 15), pd.DataFrame),
+        "ultimas_entradas": Conjunto(_cargar_ultimas_entradas, _ttl("ultimas_entradas", 300), pd.DataFrame),
+        "planes": Conjunto(_cargar_tabla("planes"), _ttl("planes", 300), pd.DataFrame),
+        "pagos": Conjunto(_cargar_tabla("pagos"), _ttl("pagos", 60), pd.DataFrame),
+        "serie_entradas": Conjunto(_cargar_serie_entradas, _ttl("entradas", 15)),
+        "mapa_calor": Conjunto(_cargar_mapa_calor, _ttl("mapa_calor", 60)),
+    }, intervalo=float(os.environ.get("DASHBOARD_INTERVALO_REFRESCO", 1.0)), en_paralelo=fuente_datos().en_paralelo,
+       max_entradas=int(os.environ.get("DASHBOARD_MAX_ENTRADAS", 200)))
+
+def _registrar_cargas(peticiones, inicio_espera):
+    """Tiempos de la última carga de cada conjunto; `en_este_render` si se hizo durante esta espera"""
+    for conjunto, *args in peticiones:
+        tiempos = almacen_datos().tiempos_carga(conjunto, *args)
+        medidor.cargas.append({"conjunto": conjunto, "fetch": tiempos.get("fetch", 0.0),
+                               "decode": tiempos.get("decode", 0.0),
+                               "en_este_render": tiempos.get("obtenido", -1) >= inicio_espera})
+
+def _avisar_respaldo(peticiones):
+    """Aviso en la barra lateral (una vez por render) si algo de lo que ve esta sesión salió de la instantánea"""
+    for conjunto, *args in peticiones:
+        origen = almacen_datos().respaldo(conjunto, *args)
+        if origen and not avisos_respaldo:
+            st.sidebar.warning(f"La API no responde: se muestran los datos de la {origen}")
+        if origen:
+            avisos_respaldo.add(conjunto)
+
+def _obtener(conjunto, mensaje_error=None, *args):
+    with medidor.esperar_datos():
+        inicio_espera = time.monotonic()
+        datos = almacen_datos().obtener(conjunto, *args)
+        _registrar_cargas([(conjunto, *args)], inicio_espera)
+    _avisar_respaldo([(conjunto, *args)])
+    error = almacen_datos().error(conjunto, *args)
+    if error and mensaje_error:
+        st.error(f"{mensaje_error}: {error}")
+    return datos
+
+def invalidar_datos(*conjuntos):
+    """Llamar después de escribir en la API (crear socio, pago, reserva...) con los conjuntos afectados"""
+    almacen_datos().invalidar(*conjuntos)
+
+MENSAJES_ERROR = {
+    "socios": "Error al conectar con la API de socios",
+    "clases": "Error al obtener clases",
+    "reservas": "Error al obtener reservas",
+    "reservas_detalle": "Error al obtener reservas",
+}
+
+def obtener_datos(*peticiones):
+    """Varios conjuntos de una sección en una sola espera (se piden en paralelo).
+
+    Cada petición es un nombre o una tupla (nombre, campos, ...) con los argumentos de su carga.
+    """
+    peticiones = [(p,) if isinstance(p, str) else tuple(p) for p in peticiones]
+    with medidor.esperar_datos():
+        inicio_espera = time.monotonic()
+        datos = almacen_datos().obtener_varios(*peticiones)
+        _registrar_cargas(peticiones, inicio_espera)
+    _avisar_respaldo(peticiones)
+    for conjunto, *args in peticiones:
+        error = almacen_datos().error(conjunto, *args)
+        if error and conjunto in MENSAJES_ERROR:
+            st.error(f"{MENSAJES_ERROR[conjunto]}: {error}")
+    return datos
+
+# Qué pide cada sección y con qué columnas; las secciones que no figuran no descargan nada.
+# La clave del almacén incluye las columnas, así que secciones con distinta proyección no se pisan.
+SECCIONES = {
+    "Dashboard": [
+        ("socios", ("id", "nombre", "vencimiento")),
+        ("entradas", ("socio_id", "nombre_socio", "fecha_hora")),
+        ("reservas", ("clase_id", "estado")),
+        ("clases", ("id", "nombre", "dia_semana", "capacidad_max")),
+        ("ultimas_entradas",),
+    ],
+    "Clases": [("clases",)],
+    # Las reservas se piden por página en /reservas/detalle (ver la sección)
+    "Reservas": [("clases", ("id", "nombre", "capacidad_max"))],
+    "Reportes": [("clases", ("id", "nombre", "dia_semana", "hora_inicio"))],
+}
+
+def datos_seccion(seccion):
+    """DataFrames de `seccion` en el orden de SECCIONES[seccion]"""
+    return obtener_datos(*SECCIONES.get(seccion, []))
+
 def obtener_todos_socios():
-    try:
-        response = requests.get("https://gimnasio-2-0-1.onrender.com/socios/")
-        if response.status_code == 200:
-            datos = response.json()
-            # Filtrar datos válidos (eliminar registros con "string")
-            datos_validos = [s for s in datos if s.get('id', '') != 'string']
-            return pd.DataFrame(datos_validos)
-        else:
-            return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Error al conectar con la API de socios: {e}")
-        return pd.DataFrame()
+    return _obtener("socios", MENSAJES_ERROR["socios"])
 
 def obtener_clases():
-    try:
-        response = requests.get("https://gimnasio-2-0-1.onrender.com/clases/")
-        if response.status_code == 200:
-            datos = response.json()
-            return pd.DataFrame(datos)
-        else:
-            st.error(f"Error al obtener clases: {response.status_code}")
-            return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Error al conectar con la API de clases: {e}")
-        return pd.DataFrame()
+    return _obtener("clases", MENSAJES_ERROR["clases"])
 
 def obtener_reservas():
-    try:
-        response = requests.get("https://gimnasio-2-0-1.onrender.com/reservas/")
-        if response.status_code == 200:
-            datos = response.json()
-            return pd.DataFrame(datos)
-        else:
-            st.error(f"Error al obtener reservas: {response.status_code}")
-            return pd.DataFrame()
-    except Exception as e:
-        st.error(f"Error al conectar con la API de reservas: {e}")
-        return pd.DataFrame()
+    return _obtener("reservas", MENSAJES_ERROR["reservas"])
 
 def obtener_entradas():
-    try:
-        response = requests.get("https://gimnasio-2-0-1.onrender.com/entradas/")
-        if response.status_code == 200:
-            datos = response.json()
-            return pd.DataFrame(datos)
-        else:
-            return pd.DataFrame()
-    except Exception as e:
-        return pd.DataFrame()
+    return _obtener("entradas")
 
 def obtener_planes():
-    try:
-        response = requests.get("https://gimnasio-2-0-1.onrender.com/planes/")
-        if response.status_code == 200:
-            datos = response.json()
-            return pd.DataFrame(datos)
-        else:
-            return pd.DataFrame()
-    except Exception as e:
-        return pd.DataFrame()
+    return _obtener("planes")
 
 def obtener_pagos():
-    try:
-        response = requests.get("https://gimnasio-2-0-1.onrender.com/pagos/")
-        if response.status_code == 200:
-            datos = response.json()
-            return pd.DataFrame(datos)
-        else:
-            return pd.DataFrame()
-    except Exception as e:
-        return pd.DataFrame()
+    return _obtener("pagos")
+
+def obtener_serie_entradas(desde=None, hasta=None, resolucion="auto", max_puntos=120):
+    return _obtener("serie_entradas", "Error al obtener la serie de entradas", desde, hasta, resolucion, max_puntos)
+
+def obtener_mapa_calor(tipo="total", clase_id=None):
+    return _obtener("mapa_calor", "Error al conectar con la API de reportes", tipo, clase_id)
 
 # ========== INTERFAZ PRINCIPAL ==========
 # Sidebar para navegación
@@ -99,14 +190,19 @@ opcion = st.sidebar.selectbox(
     "Selecciona una sección:",
     ["Dashboard", "Gestión de Socios", "Pagos", "Clases", "Entradas", "Reservas", "Reportes", " Notificaciones"]
 )
+# Tiempos por etapa de este render (ver tiempos_dashboard); se muestran al final si se pide
+medidor = Medidor(opcion, sesion=st.session_state.setdefault("id_sesion", uuid.uuid4().hex[:8]), version=VERSION_APP)
+mostrar_tiempos = st.sidebar.checkbox("Mostrar tiempos de render", value=os.environ.get("DASHBOARD_DEBUG") == "1")
+estado_datos = almacen_datos().estado()
+st.sidebar.caption(f"Datos en memoria: {estado_datos['bytes_total'] / 1024 / 1024:.1f} MB "
+                   f"(cada sesión trabaja sobre su copia) · origen: {fuente_datos().modo}")
+# Conjuntos de este render que salieron de la instantánea (ver _avisar_respaldo)
+avisos_respaldo = set()
 
 if opcion == "Dashboard":
     st.header(" Dashboard de Métricas")
     # Obtener datos
-    df_socios = obtener_todos_socios()
-    df_entradas = obtener_entradas()
-    df_reservas = obtener_reservas()
-    df_clases = obtener_clases()
+    df_socios, df_entradas, df_reservas, df_clases, df_ultimas_entradas = datos_seccion("Dashboard")
     
     # ========== MÉTRICAS VISUALES ==========
     st.subheader(" Métricas en Tiempo Real")
@@ -116,7 +212,7 @@ if opcion == "Dashboard":
         total_socios = len(df_socios) if not df_socios.empty else 0
         if not df_socios.empty and 'vencimiento' in df_socios.columns:
             try:
-                socios_nuevos = sum(pd.to_datetime(df_socios['vencimiento'], errors='coerce') >= pd.Timestamp(datetime.now().date() - timedelta(days=30)))
+                socios_nuevos = int((df_socios['vencimiento'] >= pd.Timestamp(datetime.now().date() - timedelta(days=30))).sum())
             except:
                 socios_nuevos = 0
         else:
@@ -139,8 +235,7 @@ if opcion == "Dashboard":
     with col2:
         # MÉTRICA 2: Entradas 7 Días
         if not df_entradas.empty:
-            df_entradas['fecha'] = pd.to_datetime(df_entradas['fecha_hora']).dt.date
-            hoy = datetime.now().date()
+            hoy = pd.Timestamp(datetime.now().date())
             semana_actual = df_entradas[df_entradas['fecha'] >= hoy - timedelta(days=7)]
             semana_pasada = df_entradas[(df_entradas['fecha'] >= hoy - timedelta(days=14)) & 
                                        (df_entradas['fecha'] < hoy - timedelta(days=7))]
@@ -241,65 +336,11 @@ if opcion == "Dashboard":
     # ========== SISTEMA DE ALERTAS AUTOMÁTICAS ==========
     st.subheader(" Alertas del Sistema")
     
-    # Contador de alertas
-    alertas_totales = 0
-    alertas_items = []
-    
-    # ALERTA 1: Membresías próximas a vencer (3 días)
-    if not df_socios.empty:
-        hoy = datetime.now().date()
-        try:
-            # Filtrar socios con membresías válidas
-            df_socios_validos = df_socios[df_socios['vencimiento'] != 'string']
-            fechas_vencimiento = pd.to_datetime(df_socios_validos['vencimiento'], errors='coerce')
-            # Calcular días hasta vencimiento
-            dias_hasta_vencer = (fechas_vencimiento - pd.Timestamp(hoy)).dt.days
-            # Encontrar membresías que vencen en 3 días o menos
-            membresias_proximas = df_socios_validos[
-                (dias_hasta_vencer >= 0) & (dias_hasta_vencer <= 3)
-            ]
-            if not membresias_proximas.empty:
-                alertas_totales += len(membresias_proximas)
-                for _, socio in membresias_proximas.iterrows():
-                    dias = (pd.to_datetime(socio['vencimiento']) - pd.Timestamp(hoy)).days
-                    if dias == 0:
-                        mensaje = f" **HOY** - {socio['nombre']} (ID: {socio['id']})"
-                    elif dias == 1:
-                        mensaje = f" **1 día** - {socio['nombre']} (ID: {socio['id']})"
-                    else:
-                        mensaje = f" **{dias} días** - {socio['nombre']} (ID: {socio['id']})"
-                    alertas_items.append(mensaje)
-        except:
-            pass
-    
-    # ALERTA 2: Clases con alta demanda (>80% ocupación)
-    if not df_clases.empty and not df_reservas.empty:
-        for _, clase in df_clases.iterrows():
-            reservas_clase = len(df_reservas[
-                (df_reservas['clase_id'] == clase['id']) & 
-                (df_reservas['estado'] == 'confirmada')
-            ])
-            ocupacion = (reservas_clase / clase['capacidad_max']) * 100 if clase['capacidad_max'] > 0 else 0
-            if ocupacion >= 80:
-                alertas_totales += 1
-                alertas_items.append(f" **Clase llena** - {clase['nombre']} ({ocupacion:.0f}% ocupada)")
-            elif ocupacion >= 60:
-                alertas_totales += 1
-                alertas_items.append(f" **Alta demanda** - {clase['nombre']} ({ocupacion:.0f}% ocupada)")
-    
-    # ALERTA 3: Socios inactivos (sin entrada en 30 días)
-    if not df_socios.empty and not df_entradas.empty:
-        df_entradas['fecha'] = pd.to_datetime(df_entradas['fecha_hora']).dt.date
-        fecha_limite = hoy - timedelta(days=30)
-        # Encontrar última entrada de cada socio
-        ultimas_entradas = df_entradas.groupby('socio_id')['fecha'].max()
-        for _, socio in df_socios.iterrows():
-            if socio['id'] in ultimas_entradas:
-                ultima_entrada = ultimas_entradas[socio['id']]
-                if ultima_entrada < fecha_limite:
-                    alertas_totales += 1
-                    dias_inactivo = (hoy - ultima_entrada).days
-                    alertas_items.append(f" **Inactivo** - {socio['nombre']} ({dias_inactivo} días sin venir)")
+    # Vencimientos en 3 días, clases con ≥60 % de ocupación y socios sin venir hace 30 días
+    resultado_alertas = calcular_alertas(df_socios, df_clases, df_reservas, df_entradas,
+                                         ultimas_entradas=df_ultimas_entradas)
+    alertas_totales = resultado_alertas.total
+    alertas_items = resultado_alertas.mensajes()
     
     # Mostrar alertas
     if alertas_totales > 0:
@@ -320,56 +361,53 @@ if opcion == "Dashboard":
         if not df_clases.empty:
             # Gráfico de torta - Clases por día
             clase_count = df_clases['dia_semana'].value_counts()
+            medidor.marca("transform")
             fig_clases = px.pie(
                 values=clase_count.values,
                 names=clase_count.index,
                 title="Clases por Día de la Semana"
             )
             st.plotly_chart(fig_clases, use_container_width=True)
+            medidor.marca("chart")
         else:
             st.info("No hay datos de clases disponibles")
     
     with col_right:
         st.subheader(" Entradas por Día")
-        if not df_entradas.empty:
-            # Convertir fecha_hora a datetime y extraer fecha
-            df_entradas['fecha'] = pd.to_datetime(df_entradas['fecha_hora']).dt.date
-            entradas_por_dia = df_entradas['fecha'].value_counts().sort_index()
+        # Todo el histórico con a lo sumo 120 barras: el servidor pasa a semanas o meses si hace falta
+        serie = obtener_serie_entradas()
+        if serie and serie['total'] > 0:
+            titulos = {"hora": "Hora", "dia": "Día", "semana": "Semana", "mes": "Mes"}
+            medidor.marca("transform")
             fig_entradas = px.bar(
-                x=entradas_por_dia.index.astype(str),
-                y=entradas_por_dia.values,
-                title="Entradas Registradas por Día",
+                x=serie['puntos']['inicio'],
+                y=serie['puntos']['total'],
+                title=f"Entradas Registradas por {titulos[serie['resolucion']]}",
                 labels={'x': 'Fecha', 'y': 'Número de Entradas'}
             )
             st.plotly_chart(fig_entradas, use_container_width=True)
+            medidor.marca("chart")
         else:
             st.info("No hay datos de entradas disponibles")
     
     # ========== GRÁFICO DE TENDENCIA SEMANAL ==========
     st.subheader(" Tendencia de Asistencia Semanal")
-    if not df_entradas.empty:
-        # Preparar datos para el gráfico de tendencia
-        df_entradas['fecha'] = pd.to_datetime(df_entradas['fecha_hora']).dt.date
-        df_entradas['dia_semana'] = pd.to_datetime(df_entradas['fecha_hora']).dt.day_name()
-        df_entradas['hora'] = pd.to_datetime(df_entradas['fecha_hora']).dt.hour
-        
-        # Crear datos para las últimas 2 semanas
-        hoy = datetime.now().date()
-        inicio_semana_actual = hoy - timedelta(days=hoy.weekday())
-        inicio_semana_pasada = inicio_semana_actual - timedelta(days=7)
-        
-        # Filtrar datos de las últimas 2 semanas
-        datos_semana_actual = df_entradas[df_entradas['fecha'] >= inicio_semana_actual]
-        datos_semana_pasada = df_entradas[
-            (df_entradas['fecha'] >= inicio_semana_pasada) & 
-            (df_entradas['fecha'] < inicio_semana_actual)
-        ]
-        
-        # Contar entradas por día para cada semana
-        tendencia_actual = datos_semana_actual['fecha'].value_counts().sort_index()
-        tendencia_pasada = datos_semana_pasada['fecha'].value_counts().sort_index()
+    # Crear datos para las últimas 2 semanas
+    hoy = pd.Timestamp(datetime.now().date())
+    inicio_semana_actual = hoy - timedelta(days=hoy.weekday())
+    inicio_semana_pasada = inicio_semana_actual - timedelta(days=7)
+    # Conteo diario de las dos semanas calculado en el servidor (días sin entradas = 0)
+    serie_semanas = obtener_serie_entradas(inicio_semana_pasada.date().isoformat(), hoy.date().isoformat(), "dia", 14)
+    if serie_semanas and serie_semanas['total'] > 0:
+        por_dia = serie_semanas['puntos'].set_index('inicio')['total']
+        tendencia_actual = por_dia[por_dia.index >= inicio_semana_actual]
+        tendencia_pasada = por_dia[por_dia.index < inicio_semana_actual]
+        # Una semana sin entradas se trata como sin datos (gráfico sin línea, crecimiento "Nuevo")
+        if tendencia_pasada.sum() == 0:
+            tendencia_pasada = tendencia_pasada.iloc[0:0]
         
         # Crear gráfico de líneas comparativo
+        medidor.marca("transform")
         fig_tendencia = go.Figure()
         
         # Línea de la semana actual
@@ -402,12 +440,14 @@ if opcion == "Dashboard":
             showlegend=True
         )
         st.plotly_chart(fig_tendencia, use_container_width=True)
+        medidor.marca("chart")
         
-        # Estadísticas rápidas de la tendencia
-        if not tendencia_actual.empty:
+        # Estadísticas rápidas de la tendencia: como antes de la serie del servidor, sobre los días con entradas
+        dias_con_entradas = tendencia_actual[tendencia_actual > 0]
+        if not dias_con_entradas.empty:
             col1, col2, col3 = st.columns(3)
             with col1:
-                promedio_actual = tendencia_actual.mean()
+                promedio_actual = dias_con_entradas.mean()
                 st.metric("Promedio Semanal", f"{promedio_actual:.1f} entradas/día")
             with col2:
                 if not tendencia_pasada.empty:
@@ -416,7 +456,7 @@ if opcion == "Dashboard":
                 else:
                     st.metric("Crecimiento", "Nuevo")
             with col3:
-                dia_pico = tendencia_actual.idxmax().strftime('%A') if not tendencia_actual.empty else "N/A"
+                dia_pico = dias_con_entradas.idxmax().strftime('%A')
                 st.metric("Día Más Activo", dia_pico)
     else:
         st.info("No hay suficientes datos para mostrar tendencia")
@@ -432,7 +472,7 @@ if opcion == "Dashboard":
 
 elif opcion == "Clases":
     st.header(" Gestión de Clases")
-    df_clases = obtener_clases()
+    df_clases, = datos_seccion("Clases")
     if not df_clases.empty:
         st.dataframe(df_clases, use_container_width=True)
         # Estadísticas de clases
@@ -446,42 +486,127 @@ elif opcion == "Clases":
 
 elif opcion == "Reservas":
     st.header(" Gestión de Reservas")
-    df_reservas = obtener_reservas()
-    df_clases = obtener_clases()
-    df_socios = obtener_todos_socios()
+    df_clases, = datos_seccion("Reservas")
     
-    if not df_reservas.empty:
-        # Mostrar reservas con información detallada
-        df_reservas_detalle = df_reservas.copy()
-        
-        # Añadir información de clase y socio (si está disponible)
+    # Filtros: se aplican en el servidor, que devuelve una página ya unida con clase y socio
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        opciones_clase = {"Todas las clases": None}
         if not df_clases.empty:
-            clase_map = {row['id']: row['nombre'] for _, row in df_clases.iterrows()}
-            df_reservas_detalle['clase_nombre'] = df_reservas_detalle['clase_id'].map(clase_map)
-        
-        if not df_socios.empty:
-            socio_map = {row['id']: row['nombre'] for _, row in df_socios.iterrows()}
-            df_reservas_detalle['socio_nombre'] = df_reservas_detalle['socio_id'].map(socio_map)
-        
+            opciones_clase.update(dict(zip(df_clases['nombre'].astype(str) + " (#" + df_clases['id'].astype(str) + ")",
+                                           df_clases['id'].astype(int))))
+        clase_id = opciones_clase[st.selectbox("Clase:", list(opciones_clase.keys()))]
+    with col2:
+        estados = {"Todos": None, "Confirmadas": "confirmada", "Canceladas": "cancelada"}
+        estado = estados[st.selectbox("Estado:", list(estados.keys()))]
+    with col3:
+        rango = st.date_input("Fechas:", value=())
+    desde = rango[0].isoformat() if len(rango) > 0 else None
+    hasta = rango[1].isoformat() if len(rango) > 1 else desde
+    
+    # Cursores de las páginas visitadas; se reinician al cambiar los filtros
+    filtros = (clase_id, estado, desde, hasta)
+    if st.session_state.get("reservas_filtros") != filtros:
+        st.session_state["reservas_filtros"] = filtros
+        st.session_state["reservas_cursores"] = [None]
+    cursores = st.session_state["reservas_cursores"]
+    pagina, = obtener_datos(("reservas_detalle", *filtros, cursores[-1], 50))
+    df_reservas = pagina["reservas"]
+    
+    if not df_reservas.empty:
         st.subheader(" Reservas Activas")
-        st.dataframe(df_reservas_detalle, use_container_width=True)
+        st.dataframe(df_reservas, use_container_width=True)
+        col_ant, col_pag, col_sig = st.columns([1, 2, 1])
+        with col_ant:
+            if len(cursores) > 1 and st.button("← Anterior"):
+                cursores.pop()
+                st.rerun()
+        with col_pag:
+            st.caption(f"Página {len(cursores)} · {pagina['total']} reservas con estos filtros")
+        with col_sig:
+            if pagina["siguiente"] is not None and st.button("Siguiente →"):
+                cursores.append(pagina["siguiente"])
+                st.rerun()
         
-        # Estadísticas de reservas
+        # Estadísticas de reservas (sobre todas las que cumplen los filtros, no sólo la página)
+        confirmadas = pagina["por_estado"].get("confirmada", 0)
         col1, col2, col3 = st.columns(3)
         with col1:
-            st.metric("Total Reservas", len(df_reservas))
+            st.metric("Total Reservas", pagina["total"])
         with col2:
-            st.metric("Reservas Confirmadas", len(df_reservas[df_reservas['estado'] == 'confirmada']))
+            st.metric("Reservas Confirmadas", confirmadas)
         with col3:
             if not df_clases.empty:
-                capacidad_total = df_clases['capacidad_max'].sum()
-                ocupacion = len(df_reservas) / capacidad_total * 100 if capacidad_total > 0 else 0
+                capacidad = df_clases if clase_id is None else df_clases[df_clases['id'] == clase_id]
+                capacidad_total = capacidad['capacidad_max'].sum()
+                ocupacion = pagina["total"] / capacidad_total * 100 if capacidad_total > 0 else 0
                 st.metric("Ocupación General", f"{ocupacion:.0f}%")
     else:
         st.info("No hay reservas registradas aún")
 
+elif opcion == "Reportes":
+    st.header(" Reportes")
+    st.subheader(" Ocupación por Día y Hora")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        tipos = {"Entradas + Reservas": "total", "Entradas": "entradas", "Reservas": "reservas"}
+        tipo_mapa = st.selectbox("Datos:", list(tipos.keys()))
+    with col2:
+        df_clases, = datos_seccion("Reportes")
+        opciones_clase = {"Todas las clases": None}
+        if not df_clases.empty:
+            opciones_clase.update({f"{c['nombre']} ({c['dia_semana']} {c['hora_inicio']})": c['id']
+                                   for c in df_clases.to_dict('records')})
+        clase_sel = st.selectbox("Clase:", list(opciones_clase.keys()))
+    
+    # La matriz 7×24 ya viene calculada por el servidor
+    mapa = obtener_mapa_calor(tipos[tipo_mapa], opciones_clase[clase_sel])
+    if mapa and mapa['total'] > 0:
+        medidor.marca("transform")
+        fig_mapa = px.imshow(
+            mapa['valores'],
+            x=[f"{h:02d}:00" for h in mapa['horas']],
+            y=[d.capitalize() for d in mapa['dias']],
+            color_continuous_scale="YlOrRd",
+            labels={'x': 'Hora', 'y': 'Día', 'color': 'Total'},
+            aspect="auto",
+            title="Mapa de Calor de Ocupación"
+        )
+        st.plotly_chart(fig_mapa, use_container_width=True)
+        medidor.marca("chart")
+        st.caption(f"Total: {mapa['total']} | Actualizado: {mapa['actualizado']}")
+    else:
+        st.info("No hay datos de ocupación para mostrar")
+
 # Agregar las otras secciones aquí (Gestión de Socios, Pagos, etc.)
 
+# ========== TIEMPOS DE RENDER ==========
+# Lo que queda sin marcar al final de la sección cuenta como transform
+medidor.marca("transform")
+registro_tiempos = medidor.registrar()
+historial_tiempos = st.session_state.setdefault("historial_tiempos", [])
+historial_tiempos.append(registro_tiempos)
+del historial_tiempos[:-HISTORIAL_TIEMPOS]
+
+if mostrar_tiempos:
+    with st.expander(f" Tiempos de render: {registro_tiempos['total_ms']:.0f} ms", expanded=False):
+        st.caption("fetch/decode: espera por datos en este render, repartida según las cargas que la causaron; "
+                   "0 si todo salió de la caché compartida")
+        st.dataframe(pd.DataFrame([registro_tiempos['etapas_ms']], index=["ms"]), use_container_width=True)
+        if registro_tiempos['cargas']:
+            st.write("Última carga de cada conjunto usado (ms)")
+            st.dataframe(pd.DataFrame(registro_tiempos['cargas']), use_container_width=True)
+        df_historial = pd.DataFrame([
+            {"fecha": r['fecha'], "seccion": r['seccion'], "version": r['version'], "total_ms": r['total_ms'],
+             **r['etapas_ms']} for r in historial_tiempos
+        ])
+        st.write(f"Historial de esta sesión ({len(df_historial)} renders)")
+        st.line_chart(df_historial[list(ETAPAS)])
+        # Mediana por sección y versión: una regresión tras un despliegue se ve como un salto entre versiones
+        st.dataframe(df_historial.groupby(["seccion", "version"])[["total_ms", *ETAPAS]].median().round(1),
+                     use_container_width=True)
+
 # Footer
 st.markdown("---")
-st.markdown("Sistema de Gestión Gimnasio v2.1 |  Con Sistema de Pagos y Notificaciones Integrados")
+st.markdown(f"Sistema de Gestión Gimnasio v{VERSION_APP} |  Con Sistema de Pagos y Notificaciones Integrados")
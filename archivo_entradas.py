@@ -0,0 +1,196 @@
+# archivo_entradas.py - Archivo mensual de entradas: tablas por mes, resúmenes y vista histórica
+import logging
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import Column, Integer, MetaData, String, Table, and_, func, select, text
+
+import cambios
+from modelos import ArchivoMes, Entrada, ResumenEntradasHora, ResumenEntradasSocio
+from programador import TareaPeriodica
+
+logger = logging.getLogger(__name__)
+
+VISTA_HISTORICA = "entrada_historica"
+_entrada = Entrada.__table__
+_columnas = ["id", "socio_id", "nombre_socio", "fecha_hora"]
+
+
+def nombre_tabla(mes: str) -> str:
+    """'2024-03' -> 'entrada_2024_03'"""
+    return "entrada_" + mes.replace("-", "_")
+
+
+def _tabla(nombre: str) -> Table:
+    return Table(
+        nombre, MetaData(),
+        Column("id", Integer, primary_key=True),
+        Column("socio_id", String, nullable=False),
+        Column("nombre_socio", String, nullable=False),
+        Column("fecha_hora", String, nullable=False),
+    )
+
+
+def tabla_historica() -> Table:
+    """Vista con las entradas activas y todas las archivadas (UNION ALL)"""
+    return _tabla(VISTA_HISTORICA)
+
+
+def _mes_siguiente(mes: str) -> str:
+    anio, numero = int(mes[:4]), int(mes[5:7])
+    return f"{anio + numero // 12}-{numero % 12 + 1:02d}"
+
+
+def inicio_meses_activos(meses_activos: int, hoy: Optional[date] = None) -> str:
+    """Primer día que se conserva en la tabla `entrada` (mes actual + meses_activos-1 anteriores)"""
+    hoy = hoy or datetime.now().date()
+    indice = hoy.year * 12 + (hoy.month - 1) - (max(1, meses_activos) - 1)
+    return f"{indice // 12}-{indice % 12 + 1:02d}-01"
+
+
+def recrear_vista(conn):
+    meses = conn.execute(select(ArchivoMes.__table__.c.tabla).order_by(ArchivoMes.__table__.c.mes)).scalars().all()
+    columnas = ", ".join(_columnas)
+    partes = [f"SELECT {columnas} FROM entrada"] + [f"SELECT {columnas} FROM {tabla}" for tabla in meses]
+    conn.execute(text(f"DROP VIEW IF EXISTS {VISTA_HISTORICA}"))
+    conn.execute(text(f"CREATE VIEW {VISTA_HISTORICA} AS " + " UNION ALL ".join(partes)))
+
+
+def preparar(engine):
+    """Vista histórica al día (el índice por fecha_hora es la revisión 006 de migraciones)"""
+    with engine.begin() as conn:
+        recrear_vista(conn)
+
+
+def _sumar_resumenes(conn, tabla: Table, claves: List[str], nuevos: Dict[tuple, Dict[str, Any]]):
+    """Suma `nuevos` a los resúmenes existentes (un mes puede recibir entradas tardías)"""
+    if not nuevos:
+        return
+    condicion = tabla.c[claves[0]].in_({k[0] for k in nuevos})
+    existentes = {tuple(fila[c] for c in claves): dict(fila)
+                  for fila in conn.execute(select(tabla).where(condicion)).mappings()}
+    for clave, valores in nuevos.items():
+        previo = existentes.get(clave)
+        if previo is None:
+            continue
+        valores["total"] += previo["total"]
+        if "ultima_entrada" in valores:
+            valores["ultima_entrada"] = max(valores["ultima_entrada"], previo["ultima_entrada"])
+        conn.execute(tabla.delete().where(and_(*[tabla.c[c] == v for c, v in zip(claves, clave)])))
+    conn.execute(tabla.insert(), list(nuevos.values()))
+
+
+def archivar_mes(engine, mes: str) -> int:
+    """Mueve las entradas de `mes` (YYYY-MM) a su tabla, en una única transacción"""
+    inicio, fin = f"{mes}-01", f"{_mes_siguiente(mes)}-01"
+    rango = and_(_entrada.c.fecha_hora >= inicio, _entrada.c.fecha_hora < fin)
+    archivo = _tabla(nombre_tabla(mes))
+
+    with engine.begin() as conn:
+        archivo.create(conn, checkfirst=True)
+        movidas = conn.execute(archivo.insert().from_select(
+            _columnas, select(*[_entrada.c[c] for c in _columnas]).where(rango)
+        )).rowcount
+        if not movidas:
+            return 0
+
+        # Resúmenes que sobreviven al archivo
+        hora = func.substr(_entrada.c.fecha_hora, 1, 13)
+        por_hora = {}
+        for clave, total in conn.execute(select(hora, func.count()).where(rango).group_by(hora)):
+            try:
+                fecha, h = clave[:10], int(clave[11:13])
+            except (TypeError, ValueError):
+                continue
+            fila = por_hora.setdefault((fecha, h), {"fecha": fecha, "hora": h, "total": 0})
+            fila["total"] += total
+        _sumar_resumenes(conn, ResumenEntradasHora.__table__, ["fecha", "hora"], por_hora)
+
+        por_socio = {
+            (mes, socio_id): {"mes": mes, "socio_id": socio_id, "total": total, "ultima_entrada": ultima}
+            for socio_id, total, ultima in conn.execute(
+                select(_entrada.c.socio_id, func.count(), func.max(_entrada.c.fecha_hora))
+                .where(rango).group_by(_entrada.c.socio_id)
+            )
+        }
+        _sumar_resumenes(conn, ResumenEntradasSocio.__table__, ["mes", "socio_id"], por_socio)
+
+        conn.execute(_entrada.delete().where(rango))
+        cambios.registrar_archivo(conn, mes)
+
+        registro = ArchivoMes.__table__
+        previo = conn.execute(select(registro.c.filas).where(registro.c.mes == mes)).scalar()
+        if previo is None:
+            conn.execute(registro.insert().values(mes=mes, tabla=archivo.name, filas=movidas,
+                                                  archivado=datetime.now().isoformat()))
+        else:
+            conn.execute(registro.update().where(registro.c.mes == mes)
+                         .values(filas=previo + movidas, archivado=datetime.now().isoformat()))
+        recrear_vista(conn)
+    return movidas
+
+
+def meses_por_archivar(engine, meses_activos: int) -> List[str]:
+    corte = inicio_meses_activos(meses_activos)
+    mes = func.substr(_entrada.c.fecha_hora, 1, 7)
+    with engine.connect() as conn:
+        return sorted(m for m in conn.execute(
+            select(mes).where(_entrada.c.fecha_hora < corte).group_by(mes)
+        ).scalars() if m)
+
+
+class ArchivadorEntradas:
+    """Tarea periódica que archiva los meses cerrados. Sólo la ejecuta el worker líder.
+
+    Con meses_activos <= 0 no archiva (ni arranca la tarea).
+    """
+
+    NOMBRE_BLOQUEO = "archivo_entradas"
+
+    def __init__(self, engine, meses_activos: int = 0, intervalo_horas: float = 24.0):
+        self.engine = engine
+        self.meses_activos = meses_activos
+        self.habilitado = meses_activos > 0
+        # TareaPeriodica ignora intervalos <= 0
+        self.intervalo_horas = intervalo_horas if self.habilitado else 0
+        self.tarea = TareaPeriodica(engine, self.NOMBRE_BLOQUEO, self.ejecutar_ahora, self.intervalo_horas)
+        self.ultima_ejecucion: Optional[Dict[str, Any]] = None
+        self._en_curso = threading.Lock()
+
+    def ejecutar_ahora(self) -> Dict[str, Any]:
+        with self._en_curso:
+            return self._archivar()
+
+    def _archivar(self) -> Dict[str, Any]:
+        inicio = time.perf_counter()
+        resumen: Dict[str, Any] = {"inicio": datetime.now().isoformat(), "meses": {}}
+        try:
+            if not self.habilitado:
+                raise ValueError("El archivo de entradas está desactivado (meses_activos <= 0)")
+            for mes in meses_por_archivar(self.engine, self.meses_activos):
+                resumen["meses"][mes] = archivar_mes(self.engine, mes)
+            resumen["estado"] = "ok"
+        except Exception as e:
+            logger.error(f" Error archivando entradas: {e}")
+            resumen.update({"estado": "error", "error": str(e)})
+        resumen["filas_archivadas"] = sum(resumen["meses"].values())
+        resumen["duracion_s"] = round(time.perf_counter() - inicio, 4)
+        self.ultima_ejecucion = resumen
+        logger.info(f" Archivo de entradas: {resumen}")
+        return resumen
+
+    def estado(self) -> Dict[str, Any]:
+        with self.engine.connect() as conn:
+            meses = [dict(fila) for fila in conn.execute(
+                select(ArchivoMes.__table__).order_by(ArchivoMes.__table__.c.mes)).mappings()]
+        return {
+            "activo": self.tarea.activa,
+            "meses_activos": self.meses_activos,
+            "habilitado": self.habilitado,
+            "conserva_desde": inicio_meses_activos(self.meses_activos) if self.habilitado else None,
+            "intervalo_horas": self.intervalo_horas,
+            "meses_archivados": meses,
+            "ultima_ejecucion": self.ultima_ejecucion,
+        }
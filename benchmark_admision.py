@@ -0,0 +1,109 @@
+# benchmark_admision.py - Latencia de check-in durante una tormenta de peticiones caras, con y sin control de admisión
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import uvicorn
+from fastapi import FastAPI
+
+from admision import ControlAdmision, ReglaAdmision
+
+CLIENTES_TORMENTA = 60
+DURACION_S = 6.0
+COSTE_REPORTE_S = 0.25  # consulta pesada que ocupa un hilo del threadpool
+
+
+def crear_app(con_admision: bool) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/reportes/pesado")
+    def reporte_pesado():
+        time.sleep(COSTE_REPORTE_S)
+        return {"ok": True}
+
+    @app.post("/entradas/")
+    def check_in():
+        time.sleep(0.002)
+        return {"ok": True}
+
+    @app.get("/health")
+    def health():
+        return {"status": "running"}
+
+    if con_admision:
+        app.add_middleware(ControlAdmision, claves=[f"cliente-{n}" for n in range(CLIENTES_TORMENTA)], reglas=[
+            ReglaAdmision("/reportes/*", max_concurrencia=2, max_cola=4, espera_max_s=1.0, tasa_por_s=2.0, rafaga=4),
+        ])
+    return app
+
+
+def puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def ejecutar(con_admision: bool):
+    puerto = puerto_libre()
+    servidor = uvicorn.Server(uvicorn.Config(crear_app(con_admision), host="127.0.0.1", port=puerto, log_level="error"))
+    hilo = threading.Thread(target=servidor.run, daemon=True)
+    hilo.start()
+    while not servidor.started:
+        time.sleep(0.05)
+
+    base = f"http://127.0.0.1:{puerto}"
+    fin = time.monotonic() + DURACION_S
+    estados = {}
+    lock = threading.Lock()
+
+    def tormenta(n):
+        sesion = requests.Session()
+        while time.monotonic() < fin:
+            try:
+                r = sesion.get(f"{base}/reportes/pesado", headers={"X-API-Key": f"cliente-{n}"}, timeout=30)
+                codigo = r.status_code
+            except requests.RequestException:
+                codigo = "error"
+            with lock:
+                estados[codigo] = estados.get(codigo, 0) + 1
+            if codigo in (429, 503):
+                time.sleep(0.25)  # cliente razonable: breve espera antes de reintentar
+
+    def medir(ruta, metodo):
+        sesion = requests.Session()
+        tiempos = []
+        time.sleep(0.5)  # dejar que la tormenta arranque
+        while time.monotonic() < fin:
+            inicio = time.perf_counter()
+            sesion.request(metodo, f"{base}{ruta}", timeout=60)
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+            time.sleep(0.05)
+        return tiempos
+
+    with ThreadPoolExecutor(max_workers=CLIENTES_TORMENTA + 2) as pool:
+        for n in range(CLIENTES_TORMENTA):
+            pool.submit(tormenta, n)
+        checkin = pool.submit(medir, "/entradas/", "POST")
+        health = pool.submit(medir, "/health", "GET")
+        tiempos_checkin, tiempos_health = checkin.result(), health.result()
+
+    servidor.should_exit = True
+    hilo.join()
+
+    titulo = "CON control de admisión" if con_admision else "SIN control de admisión"
+    print(f"\n{titulo}")
+    print(f"  Reportes: {estados}")
+    for nombre, tiempos in (("check-in", tiempos_checkin), ("health", tiempos_health)):
+        tiempos.sort()
+        print(f"  {nombre:<9} p50={statistics.median(tiempos):8.1f} ms  "
+              f"p99={tiempos[int(len(tiempos) * 0.99)]:8.1f} ms  ({len(tiempos)} peticiones)")
+
+
+if __name__ == "__main__":
+    print(f" {CLIENTES_TORMENTA} clientes pidiendo un reporte de {COSTE_REPORTE_S}s durante {DURACION_S}s")
+    print("=" * 70)
+    ejecutar(con_admision=False)
+    ejecutar(con_admision=True)
@@ -0,0 +1,98 @@
+# benchmark_alertas.py - Alertas del dashboard: bucles con iterrows() frente al módulo alertas vectorizado
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+import pandas as pd
+
+from alertas import calcular_alertas
+
+SOCIOS = 100_000
+ENTRADAS = 1_000_000
+CLASES = 300
+RESERVAS = 200_000
+
+
+def generar(socios: int, entradas: int, clases: int, reservas: int):
+    hoy = datetime.now().date()
+    rng = np.random.default_rng(7)
+    vencimientos = pd.to_datetime(hoy) + pd.to_timedelta(rng.integers(-200, 200, socios), unit="D")
+    df_socios = pd.DataFrame({
+        "id": [f"S{i}" for i in range(socios)],
+        "nombre": [f"Socio {i}" for i in range(socios)],
+        "vencimiento": vencimientos.strftime("%Y-%m-%d"),
+    })
+    momentos = pd.to_datetime(hoy) - pd.to_timedelta(rng.integers(0, 120 * 86400, entradas), unit="s")
+    df_entradas = pd.DataFrame({
+        "id": np.arange(entradas),
+        "socio_id": np.char.add("S", rng.integers(0, socios, entradas).astype(str)),
+        "nombre_socio": "x",
+        "fecha_hora": momentos.strftime("%Y-%m-%d %H:%M:%S"),
+    })
+    df_clases = pd.DataFrame({
+        "id": np.arange(1, clases + 1),
+        "nombre": [f"Clase {i}" for i in range(clases)],
+        "dia_semana": [random.choice(["Lunes", "Martes", "Miércoles"]) for _ in range(clases)],
+        "capacidad_max": rng.integers(0, 2000, clases),
+    })
+    df_reservas = pd.DataFrame({
+        "id": np.arange(reservas),
+        "socio_id": "S1",
+        "clase_id": rng.integers(1, clases + 1, reservas),
+        "estado": rng.choice(["confirmada", "cancelada"], reservas, p=[0.8, 0.2]),
+    })
+    return df_socios, df_clases, df_reservas, df_entradas
+
+
+def alertas_con_bucles(df_socios, df_clases, df_reservas, df_entradas):
+    """El bloque que tenía app_web.py antes de extraer el módulo, tal cual"""
+    alertas_items = []
+    hoy = datetime.now().date()
+    df_socios_validos = df_socios[df_socios['vencimiento'] != 'string']
+    fechas_vencimiento = pd.to_datetime(df_socios_validos['vencimiento'], errors='coerce')
+    dias_hasta_vencer = (fechas_vencimiento - pd.Timestamp(hoy)).dt.days
+    membresias_proximas = df_socios_validos[(dias_hasta_vencer >= 0) & (dias_hasta_vencer <= 3)]
+    for _, socio in membresias_proximas.iterrows():
+        dias = (pd.to_datetime(socio['vencimiento']) - pd.Timestamp(hoy)).days
+        cuando = "HOY" if dias == 0 else ("1 día" if dias == 1 else f"{dias} días")
+        alertas_items.append(f" **{cuando}** - {socio['nombre']} (ID: {socio['id']})")
+    for _, clase in df_clases.iterrows():
+        reservas_clase = len(df_reservas[(df_reservas['clase_id'] == clase['id']) & (df_reservas['estado'] == 'confirmada')])
+        ocupacion = (reservas_clase / clase['capacidad_max']) * 100 if clase['capacidad_max'] > 0 else 0
+        if ocupacion >= 80:
+            alertas_items.append(f" **Clase llena** - {clase['nombre']} ({ocupacion:.0f}% ocupada)")
+        elif ocupacion >= 60:
+            alertas_items.append(f" **Alta demanda** - {clase['nombre']} ({ocupacion:.0f}% ocupada)")
+    df_entradas['fecha'] = pd.to_datetime(df_entradas['fecha_hora']).dt.date
+    fecha_limite = hoy - timedelta(days=30)
+    ultimas_entradas = df_entradas.groupby('socio_id')['fecha'].max()
+    for _, socio in df_socios.iterrows():
+        if socio['id'] in ultimas_entradas:
+            ultima_entrada = ultimas_entradas[socio['id']]
+            if ultima_entrada < fecha_limite:
+                alertas_items.append(f" **Inactivo** - {socio['nombre']} ({(hoy - ultima_entrada).days} días sin venir)")
+    return alertas_items
+
+
+if __name__ == "__main__":
+    escala = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    socios, entradas, clases, reservas = (max(1, int(n * escala)) for n in (SOCIOS, ENTRADAS, CLASES, RESERVAS))
+    print(f" {socios} socios, {entradas} entradas, {clases} clases, {reservas} reservas")
+    df_socios, df_clases, df_reservas, df_entradas = generar(socios, entradas, clases, reservas)
+
+    inicio = time.perf_counter()
+    con_bucles = alertas_con_bucles(df_socios, df_clases, df_reservas, df_entradas.copy())
+    t_bucles = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    resultado = calcular_alertas(df_socios, df_clases, df_reservas, df_entradas)
+    vectorizado = resultado.mensajes()
+    t_vectorizado = time.perf_counter() - inicio
+
+    print("=" * 64)
+    print(f"{'método':<22} {'segundos':>10} {'alertas':>9}")
+    print(f"{'iterrows()':<22} {t_bucles:>10.2f} {len(con_bucles):>9}")
+    print(f"{'alertas.py':<22} {t_vectorizado:>10.2f} {len(vectorizado):>9}")
+    print(f"\n Mismas alertas: {con_bucles == vectorizado} | x{t_bucles / t_vectorizado:.0f} más rápido")
@@ -0,0 +1,75 @@
+# benchmark_archivo.py - Latencia de consultas sobre la tabla caliente de entradas al crecer el historial
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import SQLModel, create_engine
+
+import modelos  # noqa: F401  (registra las tablas)
+import archivo_entradas
+import migraciones
+
+ENTRADAS_POR_MES = 20000
+HISTORIALES_MESES = [3, 6, 12, 24, 48]
+MESES_ACTIVOS = 3
+REPETICIONES = 5
+
+# Consultas típicas del dashboard y de los agregados sobre la tabla `entrada`
+CONSULTAS = {
+    "entradas por día": "SELECT substr(fecha_hora, 1, 10), COUNT(*) FROM entrada GROUP BY 1",
+    "total entradas": "SELECT COUNT(*) FROM entrada",
+    "listado completo": "SELECT id, socio_id, nombre_socio, fecha_hora FROM entrada",
+}
+
+
+def crear_bd(meses: int):
+    ruta = os.path.join(tempfile.mkdtemp(), "archivo.db")
+    engine = create_engine(f"sqlite:///{ruta}")
+    SQLModel.metadata.create_all(engine)
+    ahora = datetime.now()
+    filas = []
+    for i in range(meses * ENTRADAS_POR_MES):
+        momento = ahora - timedelta(minutes=random.randint(0, meses * 30 * 24 * 60))
+        socio = random.randint(1, 5000)
+        filas.append({"socio_id": str(socio), "nombre_socio": f"Socio {socio}",
+                      "fecha_hora": momento.strftime("%Y-%m-%d %H:%M:%S")})
+    with engine.begin() as conn:
+        conn.execute(modelos.Entrada.__table__.insert(), filas)
+    migraciones.crear_indice(engine, "ix_entrada_fecha_hora", "entrada", ["fecha_hora"])
+    archivo_entradas.preparar(engine)
+    return engine
+
+
+def medir(engine, sql: str) -> float:
+    tiempos = []
+    with engine.connect() as conn:
+        for _ in range(REPETICIONES):
+            inicio = time.perf_counter()
+            conn.execute(text(sql)).fetchall()
+            tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+if __name__ == "__main__":
+    print(f" {ENTRADAS_POR_MES} entradas/mes, se conservan {MESES_ACTIVOS} meses en la tabla caliente")
+    print("=" * 84)
+    print(f"{'historial':>10} {'consulta':<18} {'sin archivo (ms)':>18} {'con archivo (ms)':>18} {'filas calientes':>16}")
+    for meses in HISTORIALES_MESES:
+        engine = crear_bd(meses)
+        sin_archivo = {nombre: medir(engine, sql) for nombre, sql in CONSULTAS.items()}
+
+        archivador = archivo_entradas.ArchivadorEntradas(engine, meses_activos=MESES_ACTIVOS)
+        resumen = archivador.ejecutar_ahora()
+        with engine.connect() as conn:
+            calientes = conn.execute(text("SELECT COUNT(*) FROM entrada")).scalar()
+            historicas = conn.execute(text(f"SELECT COUNT(*) FROM {archivo_entradas.VISTA_HISTORICA}")).scalar()
+        assert historicas == meses * ENTRADAS_POR_MES, "La vista histórica perdió filas"
+
+        for nombre, sql in CONSULTAS.items():
+            print(f"{meses:>8} m {nombre:<18} {sin_archivo[nombre]:>18.2f} {medir(engine, sql):>18.2f} {calientes:>16}")
+        print(f"{'':>10} archivado en {resumen['duracion_s']:.2f}s ({resumen['filas_archivadas']} filas)")
+        engine.dispose()
@@ -0,0 +1,69 @@
+# benchmark_cache_socios.py - Latencia de validación de check-in con y sin cache de socios
+import os
+import random
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+# Base de datos temporal para no tocar temp.db
+_directorio = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{_directorio}/benchmark.db"
+
+import main_completo as api  # noqa: E402
+from sqlmodel import Session, select  # noqa: E402
+
+api.engine.echo = False
+
+TOTAL_SOCIOS = 20000
+CHECKINS = 50000
+SOCIOS_ACTIVOS = 2000  # socios que realmente vienen al gimnasio
+
+
+def poblar():
+    hoy = datetime.now().date()
+    with Session(api.engine) as session:
+        for i in range(TOTAL_SOCIOS):
+            session.add(api.Socio(
+                id=str(100000 + i),
+                nombre=f"Socio {i}",
+                vencimiento=(hoy + timedelta(days=random.randint(-30, 60))).strftime("%Y-%m-%d")
+            ))
+        session.commit()
+
+
+def validar_directo(session, socio_id):
+    socio = session.exec(select(api.Socio).where(api.Socio.id == socio_id)).first()
+    return socio is not None and datetime.strptime(socio.vencimiento, "%Y-%m-%d").date() >= datetime.now().date()
+
+
+def validar_cache(session, socio_id):
+    socio = api.buscar_socio(session, socio_id)
+    return socio is not None and datetime.strptime(socio.vencimiento, "%Y-%m-%d").date() >= datetime.now().date()
+
+
+def medir(nombre, validar, ids):
+    tiempos = []
+    with Session(api.engine) as session:
+        for socio_id in ids:
+            inicio = time.perf_counter()
+            validar(session, socio_id)
+            tiempos.append((time.perf_counter() - inicio) * 1e6)
+    tiempos.sort()
+    print(f"{nombre:<12} media={statistics.mean(tiempos):8.1f} us  "
+          f"p50={tiempos[len(tiempos) // 2]:8.1f} us  p99={tiempos[int(len(tiempos) * 0.99)]:8.1f} us")
+
+
+if __name__ == "__main__":
+    print(f" Poblando {TOTAL_SOCIOS} socios...")
+    poblar()
+    activos = [str(100000 + i) for i in random.sample(range(TOTAL_SOCIOS), SOCIOS_ACTIVOS)]
+    ids = [random.choice(activos) for _ in range(CHECKINS)]
+
+    print(f" Validando {CHECKINS} check-ins sobre {SOCIOS_ACTIVOS} socios activos")
+    print("=" * 70)
+    medir("Sin cache", validar_directo, ids)
+    api.cache_socios.limpiar()
+    medir("Con cache", validar_cache, ids)
+    print("=" * 70)
+    print(api.cache_socios.estadisticas())
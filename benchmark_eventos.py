@@ -0,0 +1,71 @@
+# benchmark_eventos.py - Fan-out del bus de eventos con cientos de suscriptores locales
+import asyncio
+import statistics
+import threading
+import time
+
+from eventos import BusEventos, FIN
+
+SUSCRIPTORES = 500
+EVENTOS = 2000
+MAX_PENDIENTES = 100
+
+
+async def consumidor(suscripcion, latencias, recibidos, indice):
+    while True:
+        evento = await suscripcion.siguiente()
+        if evento is FIN:
+            return
+        latencias.append(time.perf_counter() - evento["datos"]["enviado"])
+        recibidos[indice] += 1
+        if evento["datos"]["n"] == EVENTOS - 1:
+            return
+
+
+def publicar_desde_hilo(bus):
+    # Igual que los endpoints síncronos de FastAPI, que corren en el threadpool
+    for n in range(EVENTOS):
+        bus.publicar("entrada", {"n": n, "enviado": time.perf_counter()})
+        if n % 100 == 0:
+            time.sleep(0.005)
+
+
+async def main():
+    bus = BusEventos(max_pendientes=MAX_PENDIENTES)
+    latencias = []
+    recibidos = [0] * SUSCRIPTORES
+    suscripciones = [bus.suscribir() for _ in range(SUSCRIPTORES)]
+    lento = bus.suscribir()  # nunca lee: debe ser descartado
+
+    tareas = [asyncio.create_task(consumidor(s, latencias, recibidos, i))
+              for i, s in enumerate(suscripciones)]
+
+    inicio = time.perf_counter()
+    hilo = threading.Thread(target=publicar_desde_hilo, args=(bus,))
+    hilo.start()
+    await asyncio.gather(*tareas)
+    hilo.join()
+    total = time.perf_counter() - inicio
+
+    ultimo = None
+    while not lento.cola.empty():
+        ultimo = lento.cola.get_nowait()
+
+    latencias.sort()
+    print(f" {SUSCRIPTORES} suscriptores, {EVENTOS} eventos, buffer de {MAX_PENDIENTES} por cliente")
+    print("=" * 60)
+    print(f"Entregas totales: {sum(recibidos)} en {total:.2f}s "
+          f"({sum(recibidos) / total:,.0f} entregas/s)")
+    print(f"Latencia fan-out: p50={latencias[len(latencias) // 2] * 1000:.2f} ms "
+          f"p99={latencias[int(len(latencias) * 0.99)] * 1000:.2f} ms "
+          f"media={statistics.mean(latencias) * 1000:.2f} ms")
+    print(f"Suscriptor lento descartado: {lento.descartada and ultimo is FIN}")
+    print(bus.estadisticas())
+
+    assert all(r == EVENTOS for r in recibidos), "Algún suscriptor perdió eventos"
+    assert lento.descartada and ultimo is FIN, "El suscriptor lento no fue descartado"
+    assert bus.estadisticas()["suscriptores"] == SUSCRIPTORES
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,113 @@
+# benchmark_fuente_dashboard.py - Render de datos del Dashboard: API por HTTP frente a modo local (misma base)
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+SOCIOS, ENTRADAS, CLASES, RESERVAS = 20_000, 200_000, 300, 50_000
+RENDERS = 5
+# Lo que pide la rama Dashboard de app_web.py (SECCIONES["Dashboard"] y los dos gráficos de entradas)
+PETICIONES = [
+    ("socios", ("id", "nombre", "vencimiento")),
+    ("entradas", ("socio_id", "nombre_socio", "fecha_hora")),
+    ("reservas", ("clase_id", "estado")),
+    ("clases", ("id", "nombre", "dia_semana", "capacidad_max")),
+]
+
+
+def poblar(url: str, socios: int, entradas: int, clases: int, reservas: int):
+    from sqlalchemy import create_engine, insert
+    from sqlmodel import SQLModel
+
+    from benchmark_alertas import generar
+    from modelos import Clase, Entrada, Reserva, Socio
+
+    df_socios, df_clases, df_reservas, df_entradas = generar(socios, entradas, clases, reservas)
+    df_clases = df_clases.assign(hora_inicio="18:00")
+    hoy = datetime.now().date()
+    df_reservas = df_reservas.assign(
+        socio_id=df_entradas["socio_id"].sample(len(df_reservas), replace=True, random_state=1).to_numpy(),
+        fecha_reserva=[(hoy - timedelta(days=i % 60)).isoformat() for i in range(len(df_reservas))])
+    engine = create_engine(url)
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        for modelo, df in ((Socio, df_socios), (Clase, df_clases), (Entrada, df_entradas), (Reserva, df_reservas)):
+            columnas = [c.name for c in modelo.__table__.columns if c.name in df.columns]
+            conn.execute(insert(modelo.__table__), df[columnas].to_dict("records"))
+
+
+def render_dashboard(fuente) -> float:
+    """Datos de un render completo de la rama Dashboard, sin caché: cargas en paralelo, series y alertas"""
+    from alertas import calcular_alertas
+
+    inicio = time.perf_counter()
+    df_socios, df_entradas, df_reservas, df_clases = fuente.en_paralelo(
+        lambda p: fuente.tabla(p[0], p[1]) if p[0] != "reservas" else fuente.reservas(p[1]), PETICIONES)
+    hoy = pd.Timestamp(datetime.now().date())
+    inicio_semana_pasada = hoy - timedelta(days=hoy.weekday() + 7)
+    fuente.serie_entradas(None, None, "auto", 120)
+    fuente.serie_entradas(inicio_semana_pasada.date().isoformat(), hoy.date().isoformat(), "dia", 14)
+    calcular_alertas(df_socios, df_clases, df_reservas, df_entradas, ultimas_entradas=fuente.ultimas_entradas())
+    df_clases["dia_semana"].value_counts()
+    df_entradas.sort_values("fecha_hora", ascending=False).head(5)
+    return time.perf_counter() - inicio
+
+
+def _puerto_libre() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+if __name__ == "__main__":
+    escala = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    socios, entradas, clases, reservas = (max(1, int(n * escala)) for n in (SOCIOS, ENTRADAS, CLASES, RESERVAS))
+    directorio = tempfile.mkdtemp()
+    url = f"sqlite:///{directorio}/benchmark.db"
+    os.environ.update(DATABASE_URL=url, RECORDATORIOS_HORAS="", MANTENIMIENTO_INTERVALO_HORAS="1000")
+    # Claves válidas para la API: sin ellas X-API-Key se ignora y todos los renders comparten la IP
+    os.environ["ADMISION_CLAVES"] = ",".join(f"benchmark-{nombre}-{i}" for nombre in ("http (localhost)", "local")
+                                             for i in range(RENDERS + 1))
+    # El mantenimiento del arranque deja su backup en ./backups: que quede en el directorio temporal
+    os.chdir(directorio)
+    print(f" {socios} socios, {entradas} entradas, {clases} clases, {reservas} reservas en {url}")
+    poblar(url, socios, entradas, clases, reservas)
+
+    import uvicorn
+
+    import main_completo
+    from cliente_api import ClienteAPI
+    from fuente_dashboard import FuenteHTTP, FuenteLocal
+
+    main_completo.engine.echo = False
+    puerto = _puerto_libre()
+    servidor = uvicorn.Server(uvicorn.Config(main_completo.app, host="127.0.0.1", port=puerto, log_level="warning"))
+    threading.Thread(target=servidor.run, daemon=True).start()
+    while not servidor.started:
+        time.sleep(0.1)
+
+    cliente = ClienteAPI(f"http://127.0.0.1:{puerto}")
+    fuentes = {"http (localhost)": FuenteHTTP(cliente), "local": FuenteLocal(url)}
+    resultados = {}
+    for nombre, fuente in fuentes.items():
+        tiempos = []
+        for i in range(RENDERS + 1):
+            # Una clave por render para que el control de admisión no mida su propia espera
+            cliente.session.headers["X-API-Key"] = f"benchmark-{nombre}-{i}"
+            tiempos.append(render_dashboard(fuente))
+        resultados[nombre] = tiempos[1:]
+
+    print("=" * 60)
+    print(f"{'fuente':<18} {'mediana (s)':>12} {'mín (s)':>9} {'máx (s)':>9}")
+    for nombre, tiempos in resultados.items():
+        print(f"{nombre:<18} {statistics.median(tiempos):>12.2f} {min(tiempos):>9.2f} {max(tiempos):>9.2f}")
+    http, local = (statistics.median(t) for t in resultados.values())
+    print(f"\n Modo local: {http / local:.1f}x más rápido que HTTP contra localhost "
+          f"(contra la API pública se suma la latencia de red a cada petición)")
+    servidor.should_exit = True
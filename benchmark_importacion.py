@@ -0,0 +1,74 @@
+# benchmark_importacion.py - Velocidad y memoria de la importación masiva de socios y pagos al crecer el archivo
+import csv
+import os
+import random
+import resource
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine
+
+from importacion import Importador
+from modelos import PlanMembresia
+
+TAMANOS = [10_000, 100_000, 1_000_000]
+LOTE = 2000
+PORCENTAJE_ERRORES = 0.01
+
+
+def memoria_pico_mb() -> float:
+    # ru_maxrss está en KB en Linux; el pico sólo puede crecer, así que los tamaños van de menor a mayor
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def generar_csv(directorio: str, tipo: str, filas: int) -> str:
+    ruta = os.path.join(directorio, f"{tipo}_{filas}.csv")
+    hoy = datetime.now()
+    with open(ruta, "w", newline="", encoding="utf-8") as f:
+        escritor = csv.writer(f)
+        if tipo == "socios":
+            escritor.writerow(["id", "nombre", "vencimiento", "email", "telefono"])
+            for i in range(filas):
+                vencimiento = (hoy + timedelta(days=random.randint(-200, 200))).strftime("%Y-%m-%d")
+                if random.random() < PORCENTAJE_ERRORES:
+                    vencimiento = "31/02/2024"
+                escritor.writerow([f"S{i}", f"Socio {i}", vencimiento, f"socio{i}@gimnasio.cl", f"+5691234{i % 10000:04d}"])
+        else:
+            escritor.writerow(["socio_id", "plan_id", "fecha_pago", "metodo_pago"])
+            for i in range(filas):
+                plan = random.choice([1, 2]) if random.random() >= PORCENTAJE_ERRORES else 99
+                fecha = (hoy - timedelta(days=random.randint(0, 720))).strftime("%Y-%m-%d")
+                escritor.writerow([f"S{random.randint(0, filas - 1)}", plan, fecha, random.choice(["efectivo", "tarjeta"])])
+    return ruta
+
+
+def importar(importador: Importador, tipo: str, ruta: str):
+    with open(ruta, "rb") as archivo:
+        trabajo = importador.iniciar(tipo, archivo, os.path.basename(ruta))
+    while trabajo.estado in ("en_cola", "procesando"):
+        time.sleep(0.2)
+    return trabajo.resumen()
+
+
+if __name__ == "__main__":
+    directorio = tempfile.mkdtemp()
+    print(f" Lotes de {LOTE} filas, {PORCENTAJE_ERRORES:.0%} de filas inválidas")
+    print("=" * 92)
+    print(f"{'tipo':<7} {'filas':>9} {'insertados':>11} {'actualiz.':>10} {'errores':>8} "
+          f"{'segundos':>9} {'filas/s':>9} {'RSS pico (MB)':>14}")
+    for filas in TAMANOS:
+        engine = create_engine(f"sqlite:///{os.path.join(directorio, f'import_{filas}.db')}")
+        SQLModel.metadata.create_all(engine)
+        with Session(engine) as session:
+            session.add(PlanMembresia(id=1, nombre="Mensual", precio=30000, duracion_dias=30, descripcion=""))
+            session.add(PlanMembresia(id=2, nombre="Trimestral", precio=80000, duracion_dias=90, descripcion=""))
+            session.commit()
+        importador = Importador(engine, directorio=os.path.join(directorio, "trabajos"), lote=LOTE)
+        for tipo in ("socios", "pagos"):
+            ruta = generar_csv(directorio, tipo, filas)
+            r = importar(importador, tipo, ruta)
+            os.remove(ruta)
+            print(f"{tipo:<7} {filas:>9} {r['insertados']:>11} {r['actualizados']:>10} {r['errores']:>8} "
+                  f"{r['duracion_s']:>9.1f} {r['filas_por_segundo']:>9.0f} {memoria_pico_mb():>14.1f}")
+        engine.dispose()
@@ -0,0 +1,109 @@
+# benchmark_ingresos.py - Reporte de ingresos en SQL frente a cargar /pagos/ y agregar en Python, con 1M de pagos
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+import migraciones
+import modelos
+import reportes_ingresos
+
+PAGOS = 1_000_000
+SOCIOS = 50_000
+MESES_HISTORIAL = 36
+LOTE = 50_000
+REPETICIONES = 3
+PLANES = [(1, "Mensual", 30000.0, 30), (2, "Trimestral", 80000.0, 90), (3, "Anual", 300000.0, 365)]
+METODOS = ["efectivo", "tarjeta", "transferencia", None]
+
+
+def crear_bd() -> str:
+    ruta = os.path.join(tempfile.mkdtemp(), "ingresos.db")
+    engine = create_engine(f"sqlite:///{ruta}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+
+    conn = sqlite3.connect(ruta)
+    conn.executemany("INSERT INTO planmembresia (id, nombre, precio, duracion_dias, descripcion, activo) VALUES (?, ?, ?, ?, '', 1)", PLANES)
+    inicio = datetime.now() - timedelta(days=MESES_HISTORIAL * 30)
+    dias = MESES_HISTORIAL * 30
+    lote = []
+    for i in range(PAGOS):
+        plan_id, _, precio, duracion = random.choice(PLANES)
+        fecha = inicio + timedelta(days=random.randint(0, dias))
+        estado = "pagado" if random.random() > 0.03 else "cancelado"
+        lote.append((str(random.randint(1, SOCIOS)), plan_id, precio, fecha.strftime("%Y-%m-%d"),
+                     (fecha + timedelta(days=duracion)).strftime("%Y-%m-%d"), estado, random.choice(METODOS)))
+        if len(lote) == LOTE:
+            conn.executemany("INSERT INTO pago (socio_id, plan_id, monto, fecha_pago, fecha_vencimiento, estado, metodo_pago) "
+                             "VALUES (?, ?, ?, ?, ?, ?, ?)", lote)
+            lote = []
+    conn.commit()
+    conn.close()
+    return ruta
+
+
+def ingresos_en_python(engine, desde: str, hasta: str):
+    """Lo que hace hoy un cliente: traer todos los pagos como GET /pagos/ y agregar en memoria"""
+    with Session(engine) as session:
+        pagos = session.exec(select(modelos.Pago)).all()
+    excluidos = ("pendiente",) + reportes_ingresos.ESTADOS_EXCLUIDOS
+    diario, mensual, por_plan, por_metodo = (defaultdict(float) for _ in range(4))
+    for pago in pagos:
+        if pago.estado in excluidos or not desde <= pago.fecha_pago[:10] <= hasta:
+            continue
+        diario[pago.fecha_pago[:10]] += pago.monto
+        mensual[pago.fecha_pago[:7]] += pago.monto
+        por_plan[pago.plan_id] += pago.monto
+        por_metodo[pago.metodo_pago] += pago.monto
+    return mensual
+
+
+def medir(funcion) -> float:
+    tiempos = []
+    for _ in range(REPETICIONES):
+        inicio = time.perf_counter()
+        funcion()
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    return statistics.median(tiempos)
+
+
+def medir_reporte(engine, desde: str, hasta: str) -> float:
+    return medir(lambda: reportes_ingresos.reporte_ingresos(engine, desde, hasta, usar_cache=False))
+
+
+if __name__ == "__main__":
+    print(f" Generando {PAGOS} pagos de {SOCIOS} socios en {MESES_HISTORIAL} meses...")
+    ruta = crear_bd()
+    engine = create_engine(f"sqlite:///{ruta}")
+    hoy = datetime.now()
+    hasta = (hoy.replace(day=1) - timedelta(days=1)).strftime("%Y-%m-%d")
+    desde = (hoy - timedelta(days=365)).strftime("%Y-%m-01")
+
+    sin_indices = medir_reporte(engine, desde, hasta)
+    migraciones.migrar(engine)  # revisión 007: índices de pago
+    with engine.connect() as conn:
+        conn.exec_driver_sql("ANALYZE")
+
+    reporte = reportes_ingresos.reporte_ingresos(engine, desde, hasta, usar_cache=False)
+    mensual_py = ingresos_en_python(engine, desde, hasta)
+    for fila in reporte["mensual"]:
+        assert abs(fila["ingresos"] - mensual_py[fila["mes"]]) < 1e-6, fila["mes"]
+
+    print("=" * 70)
+    print(f" Periodo cerrado {desde} .. {hasta}: {reporte['total_pagos']} pagos, "
+          f"{len(reporte['diario'])} días, {len(reporte['mrr'])} meses de MRR y renovación")
+    print(f"{'variante':<44} {'mediana (ms)':>14}")
+    print(f"{'ORM /pagos/ + agregar en Python':<44} {medir(lambda: ingresos_en_python(engine, desde, hasta)):>14.1f}")
+    print(f"{'SQL sin índices de reportes':<44} {sin_indices:>14.1f}")
+    print(f"{'SQL con índices de reportes':<44} {medir_reporte(engine, desde, hasta):>14.1f}")
+    reportes_ingresos.reporte_ingresos(engine, desde, hasta)
+    print(f"{'SQL periodo cerrado servido desde caché':<44} "
+          f"{medir(lambda: reportes_ingresos.reporte_ingresos(engine, desde, hasta)):>14.3f}")
+    engine.dispose()
@@ -0,0 +1,115 @@
+# benchmark_migraciones.py - Latencia de los check-in mientras se crea un índice en una tabla de entradas grande
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+from migraciones import reconstruir_tabla
+
+FILAS = int(os.environ.get("BENCH_FILAS", 2_000_000))
+INTERVALO_CHECKIN_S = 0.002
+INDICE = 'CREATE INDEX "ix_entrada_socio_fecha" ON "entrada" ("socio_id", "fecha_hora")'
+
+
+def crear_base(ruta: str, filas: int):
+    conn = sqlite3.connect(ruta)
+    conn.execute("PRAGMA journal_mode = WAL")
+    conn.execute("CREATE TABLE entrada (id INTEGER NOT NULL, socio_id VARCHAR NOT NULL, "
+                 "nombre_socio VARCHAR NOT NULL, fecha_hora VARCHAR NOT NULL, PRIMARY KEY (id))")
+    inicio = datetime(2024, 1, 1)
+    lote = []
+    for i in range(filas):
+        fecha = (inicio + timedelta(seconds=random.randint(0, 365 * 86400))).strftime("%Y-%m-%d %H:%M:%S")
+        socio = f"S{random.randint(0, 50_000)}"
+        lote.append((socio, f"Socio {socio}", fecha))
+        if len(lote) == 50_000:
+            conn.executemany("INSERT INTO entrada (socio_id, nombre_socio, fecha_hora) VALUES (?, ?, ?)", lote)
+            conn.commit()
+            lote = []
+    conn.executemany("INSERT INTO entrada (socio_id, nombre_socio, fecha_hora) VALUES (?, ?, ?)", lote)
+    conn.commit()
+    conn.close()
+
+
+def medir_checkins(ruta: str, migracion) -> dict:
+    """Inserta una entrada cada INTERVALO_CHECKIN_S mientras corre `migracion` y devuelve latencias"""
+    latencias = []
+    terminado = threading.Event()
+
+    def registrar():
+        conn = sqlite3.connect(ruta, timeout=60)
+        i = 0
+        while not terminado.is_set():
+            inicio = time.perf_counter()
+            conn.execute("INSERT INTO entrada (socio_id, nombre_socio, fecha_hora) VALUES (?, ?, ?)",
+                         (f"N{i}", "Nuevo", datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+            conn.commit()
+            latencias.append((time.perf_counter() - inicio) * 1000)
+            i += 1
+            time.sleep(INTERVALO_CHECKIN_S)
+        conn.close()
+
+    hilo = threading.Thread(target=registrar)
+    hilo.start()
+    time.sleep(0.5)
+    inicio = time.perf_counter()
+    detalle = migracion()
+    duracion = time.perf_counter() - inicio
+    time.sleep(0.5)
+    terminado.set()
+    hilo.join()
+
+    conn = sqlite3.connect(ruta)
+    total = conn.execute("SELECT COUNT(*) FROM entrada").fetchone()[0]
+    indice = conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'ix_entrada_socio_fecha'").fetchone() is not None
+    conn.close()
+    latencias.sort()
+    return {
+        "duracion_s": duracion,
+        "checkins": len(latencias),
+        "p50": statistics.median(latencias),
+        "p99": latencias[int(len(latencias) * 0.99)],
+        "max": latencias[-1],
+        "filas_finales": total,
+        "indice": indice,
+        "detalle": detalle,
+    }
+
+
+def indice_directo(ruta: str):
+    conn = sqlite3.connect(ruta, timeout=60)
+    conn.execute(INDICE)
+    conn.commit()
+    conn.close()
+
+
+if __name__ == "__main__":
+    filas = int(sys.argv[1]) if len(sys.argv) > 1 else FILAS
+    directorio = tempfile.mkdtemp()
+    print(f" Generando {filas} entradas...")
+    base = os.path.join(directorio, "base.db")
+    crear_base(base, filas)
+
+    resultados = {}
+    for nombre, migracion in [
+        ("CREATE INDEX directo", lambda ruta: indice_directo(ruta)),
+        ("reconstrucción por lotes", lambda ruta: reconstruir_tabla(ruta, "entrada", indices_extra=[INDICE])),
+    ]:
+        ruta = os.path.join(directorio, f"{len(resultados)}.db")
+        with open(base, "rb") as origen, open(ruta, "wb") as destino:
+            destino.write(origen.read())
+        resultados[nombre] = medir_checkins(ruta, lambda: migracion(ruta))
+
+    print("=" * 100)
+    print(f"{'método':<26} {'dur. (s)':>9} {'check-ins':>10} {'p50 (ms)':>9} {'p99 (ms)':>9} "
+          f"{'máx (ms)':>10} {'filas finales':>14} {'índice':>7}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<26} {r['duracion_s']:>9.1f} {r['checkins']:>10} {r['p50']:>9.2f} {r['p99']:>9.2f} "
+              f"{r['max']:>10.1f} {r['filas_finales']:>14} {'sí' if r['indice'] else 'no':>7}")
+    detalle = resultados["reconstrucción por lotes"]["detalle"]
+    print(f"\n Reconstrucción: {detalle['lotes']} lotes, bloqueo final {detalle['bloqueo_final_ms']} ms")
@@ -0,0 +1,53 @@
+# benchmark_tablas_dashboard.py - Memoria y tiempo de los DataFrames del dashboard: JSON tal cual frente a tablas_dashboard
+import sys
+import time
+
+import pandas as pd
+
+from alertas import calcular_alertas
+from benchmark_alertas import generar
+from tablas_dashboard import a_dataframe, memoria_mb
+
+SOCIOS, ENTRADAS, CLASES, RESERVAS = 100_000, 1_000_000, 300, 200_000
+
+
+def fechas_como_antes(df_entradas: pd.DataFrame):
+    """Las cuatro conversiones de fecha_hora que hacía la rama Dashboard en cada rerun"""
+    df_entradas['fecha'] = pd.to_datetime(df_entradas['fecha_hora']).dt.date
+    df_entradas['fecha'] = pd.to_datetime(df_entradas['fecha_hora']).dt.date
+    df_entradas['dia_semana'] = pd.to_datetime(df_entradas['fecha_hora']).dt.day_name()
+    df_entradas['hora'] = pd.to_datetime(df_entradas['fecha_hora']).dt.hour
+
+
+if __name__ == "__main__":
+    escala = float(sys.argv[1]) if len(sys.argv) > 1 else 1.0
+    socios, entradas, clases, reservas = (max(1, int(n * escala)) for n in (SOCIOS, ENTRADAS, CLASES, RESERVAS))
+    print(f" pandas {pd.__version__}: {socios} socios, {entradas} entradas, {clases} clases, {reservas} reservas")
+    tablas = dict(zip(("socios", "clases", "reservas", "entradas"), generar(socios, entradas, clases, reservas)))
+    registros = {nombre: df.to_dict("records") for nombre, df in tablas.items()}
+
+    inicio = time.perf_counter()
+    crudas = {nombre: pd.DataFrame(filas) for nombre, filas in registros.items()}
+    t_crudas = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    tipadas = {nombre: a_dataframe(nombre, filas) for nombre, filas in registros.items()}
+    t_tipadas = time.perf_counter() - inicio
+
+    print("=" * 60)
+    print(f"{'conjunto':<10} {'filas':>9} {'JSON tal cual (MB)':>19} {'tipado (MB)':>12}")
+    for nombre in crudas:
+        print(f"{nombre:<10} {len(crudas[nombre]):>9} {memoria_mb(crudas[nombre]):>19.1f} {memoria_mb(tipadas[nombre]):>12.1f}")
+    total_crudas = sum(memoria_mb(df) for df in crudas.values())
+    total_tipadas = sum(memoria_mb(df) for df in tipadas.values())
+    print(f"{'total':<10} {'':>9} {total_crudas:>19.1f} {total_tipadas:>12.1f}")
+
+    inicio = time.perf_counter()
+    fechas_como_antes(crudas["entradas"])
+    calcular_alertas(crudas["socios"], crudas["clases"], crudas["reservas"], crudas["entradas"])
+    t_rerun_antes = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    calcular_alertas(tipadas["socios"], tipadas["clases"], tipadas["reservas"], tipadas["entradas"].copy())
+    t_rerun = time.perf_counter() - inicio
+
+    print(f"\n Construcción: {t_crudas:.2f} s tal cual, {t_tipadas:.2f} s tipado (una vez por recarga, en segundo plano)")
+    print(f" Fechas + alertas por rerun: {t_rerun_antes:.2f} s antes, {t_rerun:.2f} s con las fechas ya parseadas")
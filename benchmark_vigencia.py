@@ -0,0 +1,82 @@
+# benchmark_vigencia.py - Validación de acceso: consulta + parseo de fecha frente al índice de vigencia en memoria
+import os
+import random
+import resource
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from indice_vigencia import IndiceVigencia
+from modelos import Socio
+
+SOCIOS = int(os.environ.get("BENCH_SOCIOS", 1_000_000))
+CONSULTAS = 100_000
+
+
+def rss_mb() -> float:
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize() / 1024 / 1024
+
+
+def crear_base(ruta: str, socios: int):
+    engine = create_engine(f"sqlite:///{ruta}")
+    SQLModel.metadata.create_all(engine)
+    engine.dispose()
+    conn = sqlite3.connect(ruta)
+    hoy = date.today()
+    fechas = [(hoy + timedelta(days=d)).strftime("%Y-%m-%d") for d in range(-400, 400)]
+    for inicio in range(0, socios, 100_000):
+        conn.executemany("INSERT INTO socio (id, nombre, vencimiento) VALUES (?, ?, ?)",
+                         [(f"S{i}", f"Socio {i}", random.choice(fechas)) for i in range(inicio, min(inicio + 100_000, socios))])
+    conn.commit()
+    conn.close()
+
+
+def validar_consultando(session: Session, socio_id: str) -> bool:
+    """Camino actual del check-in: buscar el socio, parsear el vencimiento y comparar"""
+    socio = session.exec(select(Socio).where(Socio.id == socio_id)).first()
+    if socio is None:
+        return False
+    return datetime.strptime(socio.vencimiento, "%Y-%m-%d").date() >= datetime.now().date()
+
+
+def medir(nombre: str, funcion, ids) -> list:
+    inicio = time.perf_counter()
+    vigentes = sum(1 for socio_id in ids if funcion(socio_id))
+    total = time.perf_counter() - inicio
+    return [nombre, len(ids), total / len(ids) * 1e6, len(ids) / total, vigentes]
+
+
+if __name__ == "__main__":
+    socios = int(sys.argv[1]) if len(sys.argv) > 1 else SOCIOS
+    ruta = os.path.join(tempfile.mkdtemp(), "vigencia.db")
+    print(f" Generando {socios} socios...")
+    crear_base(ruta, socios)
+    engine = create_engine(f"sqlite:///{ruta}")
+
+    # Un 5 % de ids inexistentes, como tarjetas mal leídas o socios dados de baja
+    ids = [f"S{random.randint(0, socios - 1)}" if random.random() > 0.05 else f"X{i}" for i in range(CONSULTAS)]
+
+    antes = rss_mb()
+    indice = IndiceVigencia(engine, intervalo_verificacion=1.0)
+    indice.cargar()
+    memoria = rss_mb() - antes
+
+    filas = []
+    with Session(engine) as session:
+        filas.append(medir("consulta + strptime", lambda i: validar_consultando(session, i), ids[:10_000]))
+    filas.append(medir("índice.validar()", lambda i: indice.validar(i)["acceso"], ids))
+    hoy = date.today().toordinal()
+    filas.append(medir("índice.vigente()", lambda i: indice.vigente(i, hoy), ids))
+
+    print(f" Carga del índice: {indice.duracion_carga_s:.2f} s, {memoria:.0f} MB "
+          f"({memoria * 1024 * 1024 / socios:.0f} bytes/socio), {indice.estadisticas()['fechas_distintas']} fechas distintas")
+    print("=" * 78)
+    print(f"{'método':<22} {'consultas':>10} {'µs/consulta':>12} {'consultas/s':>13} {'con acceso':>11}")
+    for nombre, n, us, por_s, vigentes in filas:
+        print(f"{nombre:<22} {n:>10} {us:>12.2f} {por_s:>13.0f} {vigentes / n:>10.1%}")
+    print(f"\n Sincronizaciones con `cambio` durante la medición: {indice.sincronizaciones}")
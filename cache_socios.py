@@ -0,0 +1,147 @@
+# cache_socios.py - Cache LRU/TTL en memoria para búsquedas de socios por id
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import func, select
+
+from modelos import Cambio
+
+_cambio = Cambio.__table__
+
+
+class CacheSocios:
+    """Cache LRU acotada con expiración por TTL.
+
+    Las escrituras (crear socio, merges, renovaciones de pago) deben llamar a
+    `invalidar` para que la siguiente lectura vuelva a la base de datos. Con
+    `engine`, además se leen de la tabla `cambio` los socios modificados por
+    otros workers como mucho cada `intervalo_verificacion` segundos (igual que
+    IndiceVigencia), así que un pago hecho en otro worker no deja un 403
+    viejo en cache hasta que venza el TTL.
+    """
+
+    def __init__(self, max_elementos: int = 5000, ttl_segundos: float = 300.0,
+                 engine=None, intervalo_verificacion: float = 1.0):
+        self.max_elementos = max_elementos
+        self.ttl_segundos = ttl_segundos
+        self.engine = engine
+        self.intervalo_verificacion = intervalo_verificacion
+        self._datos: "OrderedDict[str, tuple]" = OrderedDict()
+        # Carga en curso por clave: si se invalida mientras tanto, el valor leído no se guarda
+        self._cargando: Dict[str, object] = {}
+        self._cursor: Optional[int] = None
+        self._verificado = 0.0
+        self._lock = threading.Lock()
+        self._lock_sincronizacion = threading.Lock()
+        self.aciertos = 0
+        self.fallos = 0
+        self.desalojos = 0
+        self.invalidaciones = 0
+        self.descartadas = 0
+        self.sincronizaciones = 0
+
+    def obtener(self, clave: str, cargar: Callable[[str], Optional[Any]]) -> Optional[Any]:
+        """Devuelve el valor cacheado o lo carga con `cargar(clave)`.
+
+        Los resultados `None` (socio inexistente) no se guardan, para que un
+        socio recién creado sea visible de inmediato. La carga corre fuera del
+        lock; si la clave se invalida antes de que termine, el valor (que puede
+        ser anterior a la escritura) se devuelve pero no se guarda.
+        """
+        self._sincronizar()
+        ahora = time.monotonic()
+        with self._lock:
+            entrada = self._datos.get(clave)
+            if entrada is not None:
+                valor, expira = entrada
+                if expira > ahora:
+                    self._datos.move_to_end(clave)
+                    self.aciertos += 1
+                    return valor
+                del self._datos[clave]
+            self.fallos += 1
+            marca = self._cargando[clave] = object()
+
+        try:
+            valor = cargar(clave)
+        except BaseException:
+            with self._lock:
+                if self._cargando.get(clave) is marca:
+                    del self._cargando[clave]
+            raise
+        with self._lock:
+            vigente = self._cargando.get(clave) is marca
+            if vigente:
+                del self._cargando[clave]
+            elif valor is not None:
+                self.descartadas += 1
+            if vigente and valor is not None:
+                self._guardar(clave, valor)
+        return valor
+
+    def guardar(self, clave: str, valor: Any):
+        with self._lock:
+            self._guardar(clave, valor)
+
+    def _guardar(self, clave: str, valor: Any):
+        self._datos[clave] = (valor, time.monotonic() + self.ttl_segundos)
+        self._datos.move_to_end(clave)
+        while len(self._datos) > self.max_elementos:
+            self._datos.popitem(last=False)
+            self.desalojos += 1
+
+    def invalidar(self, *claves: str):
+        with self._lock:
+            for clave in claves:
+                self._cargando.pop(clave, None)
+                if self._datos.pop(clave, None) is not None:
+                    self.invalidaciones += 1
+
+    def limpiar(self):
+        with self._lock:
+            self.invalidaciones += len(self._datos)
+            self._datos.clear()
+            self._cargando.clear()
+
+    def _sincronizar(self):
+        """Invalida los socios que aparecen en `cambio` después del cursor (escrituras de otros workers)"""
+        if self.engine is None or time.monotonic() - self._verificado < self.intervalo_verificacion:
+            return
+        # Un solo hilo consulta; el resto sigue con la cache como está
+        if not self._lock_sincronizacion.acquire(blocking=False):
+            return
+        try:
+            with self.engine.connect() as conn:
+                # El tope se lee primero: lo que llegue después entra en la próxima vuelta
+                tope = conn.execute(select(func.max(_cambio.c.seq))).scalar() or 0
+                ids = []
+                if self._cursor is not None and tope > self._cursor:
+                    ids = conn.execute(select(_cambio.c.registro_id).distinct().where(
+                        _cambio.c.seq > self._cursor, _cambio.c.seq <= tope, _cambio.c.tabla == "socio")).scalars().all()
+            if ids:
+                self.invalidar(*ids)
+            # La primera vez la cache está vacía: basta con tomar el cursor
+            self._cursor = tope
+            self.sincronizaciones += 1
+            self._verificado = time.monotonic()
+        finally:
+            self._lock_sincronizacion.release()
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            consultas = self.aciertos + self.fallos
+            return {
+                "elementos": len(self._datos),
+                "max_elementos": self.max_elementos,
+                "ttl_segundos": self.ttl_segundos,
+                "aciertos": self.aciertos,
+                "fallos": self.fallos,
+                "desalojos": self.desalojos,
+                "invalidaciones": self.invalidaciones,
+                "cargas_descartadas": self.descartadas,
+                "sincronizaciones": self.sincronizaciones,
+                "cursor_cambios": self._cursor,
+                "tasa_aciertos": round(self.aciertos / consultas, 4) if consultas else 0.0,
+            }
@@ -0,0 +1,199 @@
+# cambios.py - Seguimiento de cambios y sincronización incremental (?since=<cursor>)
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import Integer, event, func, update
+from sqlmodel import Session, select
+
+from modelos import Cambio, VersionDatos
+
+_tabla_cambio = Cambio.__table__
+_version = VersionDatos.__table__
+_modelos: Dict[str, Any] = {}
+_ordenados: set = set()
+
+# Operación de los meses de entradas movidos al archivo: una fila por mes, registro_id = "YYYY-MM"
+ARCHIVAR = "archivar"
+# Fila de versiondatos que guarda el último seq borrado por `podar`
+PODADO = "cambio_podado"
+
+
+class CursorVencido(ValueError):
+    """El cursor apunta a cambios ya borrados por la retención: hay que volver a descargar todo"""
+
+
+def _ahora() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _serializar(connection):
+    """Fuera de SQLite, ordena los escritores del registro hasta su commit.
+
+    El cursor supone que seq crece en orden de commit. SQLite lo garantiza con su
+    único escritor; en otros motores dos transacciones pueden tomar seq 10 y 11
+    y confirmar al revés, y un lector que ya vio la 11 se saltaría la 10. El
+    UPDATE bloquea la fila 'cambio' de versiondatos hasta el commit, así que la
+    siguiente transacción no obtiene su seq hasta que la anterior terminó.
+    """
+    if connection.dialect.name == "sqlite":
+        return
+    transaccion = connection.get_transaction()
+    if connection.info.get("cambios_serializado") is transaccion:
+        return
+    if connection.execute(update(_version).where(_version.c.nombre == "cambio")
+                          .values(version=_version.c.version + 1)).rowcount == 0:
+        connection.execute(_version.insert().values(nombre="cambio", version=1))
+    connection.info["cambios_serializado"] = transaccion
+
+
+def _escuchar(operacion: str):
+    def listener(mapper, connection, target):
+        _serializar(connection)
+        registro_id = mapper.primary_key_from_instance(target)[0]
+        connection.execute(_tabla_cambio.insert().values(
+            tabla=mapper.local_table.name,
+            registro_id=str(registro_id),
+            operacion=operacion,
+            fecha=_ahora(),
+        ))
+    return listener
+
+
+def registrar_seguimiento(*modelos):
+    """Anota en la tabla `cambio` cada insert/update/delete hecho vía ORM.
+
+    La fila de cambio se escribe en la misma transacción que el dato, así que
+    un rollback tampoco deja rastro en el registro.
+    """
+    for modelo in modelos:
+        nombre = modelo.__table__.name
+        if nombre in _modelos:
+            continue
+        _modelos[nombre] = modelo
+        event.listen(modelo, "after_insert", _escuchar("insert"))
+        event.listen(modelo, "after_update", _escuchar("update"))
+        event.listen(modelo, "after_delete", _escuchar("delete"))
+
+
+def ordenar_inserciones(*modelos):
+    """Toma el bloqueo de `_serializar` antes de cada INSERT de `modelos`.
+
+    Con el bloqueo tomado antes de pedir el id, los ids de esas tablas quedan en
+    orden de commit también fuera de SQLite, y quien las lee con `id > cursor`
+    (ocupacion_actual) no se salta filas confirmadas tarde.
+    """
+    for modelo in modelos:
+        if modelo.__table__.name in _ordenados:
+            continue
+        _ordenados.add(modelo.__table__.name)
+        event.listen(modelo, "before_insert", lambda mapper, connection, target: _serializar(connection))
+
+
+def registrar_cambios(connection, tabla: str, ids: Iterable[Any], operacion: str):
+    """Anota cambios hechos con SQL directo (cargas masivas), que no disparan eventos ORM."""
+    fecha = _ahora()
+    filas = [{"tabla": tabla, "registro_id": str(i), "operacion": operacion, "fecha": fecha} for i in ids]
+    if filas:
+        _serializar(connection)
+        connection.execute(_tabla_cambio.insert(), filas)
+
+
+def registrar_archivo(connection, mes: str):
+    """Las entradas de `mes` salieron de la tabla `entrada` (delete por SQL, sin eventos ORM)"""
+    registrar_cambios(connection, "entrada", [mes], ARCHIVAR)
+
+
+def cursor_actual(session: Session) -> int:
+    return session.exec(select(func.max(Cambio.seq))).one() or 0
+
+
+def ultimo_podado(conn) -> int:
+    """Mayor seq borrado por la retención (0 si nunca se podó)"""
+    return conn.execute(select(_version.c.version).where(_version.c.nombre == PODADO)).scalar() or 0
+
+
+def podar(engine, retener_dias: int, lote: int = 10_000) -> Dict[str, Any]:
+    """Borra los cambios de más de `retener_dias` días, por lotes para no retener el bloqueo de escritura.
+
+    Un cliente con un cursor anterior a lo borrado recibe CursorVencido y vuelve
+    a la descarga completa.
+    """
+    corte = (datetime.now() - timedelta(days=retener_dias)).strftime("%Y-%m-%d %H:%M:%S")
+    with engine.connect() as conn:
+        tope = conn.execute(select(func.max(_tabla_cambio.c.seq)).where(_tabla_cambio.c.fecha < corte)).scalar()
+        podado = ultimo_podado(conn)
+    borrados = 0
+    while tope and podado < tope:
+        hasta = min(tope, podado + lote)
+        with engine.begin() as conn:
+            borrados += conn.execute(_tabla_cambio.delete().where(_tabla_cambio.c.seq <= hasta)).rowcount
+            if conn.execute(update(_version).where(_version.c.nombre == PODADO).values(version=hasta)).rowcount == 0:
+                conn.execute(_version.insert().values(nombre=PODADO, version=hasta))
+        podado = hasta
+    return {"borrados": borrados, "podado_hasta": podado, "corte": corte}
+
+
+def obtener_cambios(session: Session, desde: int = 0, limite: int = 500,
+                    tablas: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Devuelve una página de cambios posteriores a `desde`.
+
+    Dentro de la página se compactan los cambios repetidos de un mismo registro
+    (sólo cuenta el último) y se adjunta el estado actual de la fila. El orden
+    de seq coincide con el de commit (ver `_serializar`), así que el cursor
+    nunca salta cambios. Un cambio `archivar` de la tabla entrada lleva el mes
+    en `id`: todas las entradas de ese mes pasaron a /entradas/?historico=true.
+    """
+    if desde < ultimo_podado(session.connection()):
+        raise CursorVencido(f"El cursor {desde} es anterior a los cambios conservados; "
+                            "descargue todo y continúe desde /cambios/cursor")
+    consulta = select(Cambio).where(Cambio.seq > desde)
+    if tablas:
+        consulta = consulta.where(Cambio.tabla.in_(tablas))
+    filas = session.exec(consulta.order_by(Cambio.seq).limit(limite + 1)).all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    ultimos: Dict[tuple, Cambio] = {}
+    for cambio in filas:
+        ultimos[(cambio.tabla, cambio.registro_id)] = cambio
+
+    # Estado actual de las filas insertadas/actualizadas, una consulta por tabla
+    pendientes: Dict[str, List[str]] = {}
+    for (tabla, registro_id), cambio in ultimos.items():
+        if cambio.operacion not in ("delete", ARCHIVAR):
+            pendientes.setdefault(tabla, []).append(registro_id)
+
+    actuales: Dict[tuple, Any] = {}
+    for tabla, ids in pendientes.items():
+        modelo = _modelos.get(tabla)
+        if modelo is None:
+            continue
+        pk = list(modelo.__table__.primary_key.columns)[0]
+        if isinstance(pk.type, Integer):
+            ids = [int(i) for i in ids]
+        for fila in session.exec(select(modelo).where(pk.in_(ids))).all():
+            actuales[(tabla, str(getattr(fila, pk.name)))] = fila
+
+    resultado = []
+    for clave, cambio in sorted(ultimos.items(), key=lambda item: item[1].seq):
+        fila = actuales.get(clave)
+        operacion = cambio.operacion
+        if operacion not in ("delete", ARCHIVAR) and fila is None:
+            # Borrado más adelante en el registro
+            operacion = "delete"
+        resultado.append({
+            "seq": cambio.seq,
+            "tabla": cambio.tabla,
+            "id": cambio.registro_id,
+            "operacion": operacion,
+            "fecha": cambio.fecha,
+            "datos": fila.model_dump() if fila is not None else None,
+        })
+
+    return {
+        "desde": desde,
+        "cursor": filas[-1].seq if filas else desde,
+        "hay_mas": hay_mas,
+        "total": len(resultado),
+        "cambios": resultado,
+    }
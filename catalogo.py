@@ -0,0 +1,114 @@
+# catalogo.py - Planes y clases en memoria con invalidación por versión compartida entre workers
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import update
+from sqlmodel import Session, select
+
+from modelos import Clase, PlanMembresia, VersionDatos
+from ocupacion_horaria import indice_dia
+
+MODELOS = {"planes": PlanMembresia, "clases": Clase}
+
+
+def marcar_cambio(session: Session, nombre: str):
+    """Incrementa la versión dentro de la transacción de la escritura.
+
+    Se llama antes del commit: si la escritura se revierte, la versión también.
+    """
+    resultado = session.execute(update(VersionDatos).where(VersionDatos.nombre == nombre)
+                                .values(version=VersionDatos.version + 1))
+    if resultado.rowcount == 0:
+        session.add(VersionDatos(nombre=nombre, version=1))
+
+
+def ultima_sesion(clase: Clase, ahora: Optional[datetime] = None) -> Optional[str]:
+    """Fecha (YYYY-MM-DD) de la última sesión ya empezada de una clase semanal"""
+    dia = indice_dia(clase.dia_semana)
+    if dia is None:
+        return None
+    ahora = ahora or datetime.now()
+    fecha = ahora.date() - timedelta(days=(ahora.weekday() - dia) % 7)
+    if fecha == ahora.date() and ahora.strftime("%H:%M") < (clase.hora_inicio or "00:00"):
+        fecha -= timedelta(days=7)
+    return fecha.strftime("%Y-%m-%d")
+
+
+class CatalogoReferencia:
+    """Copia en memoria de planes y clases, que cambian pocas veces al mes.
+
+    Cada conjunto guarda la versión con la que se cargó. Las lecturas comparan
+    con la fila de `versiondatos` como mucho cada `intervalo_verificacion`
+    segundos, así que un cambio hecho en otro worker tarda a lo sumo eso en
+    verse; las escrituras del propio worker se ven al instante.
+    Los objetos devueltos son compartidos: no modificarlos.
+    """
+
+    def __init__(self, engine, intervalo_verificacion: float = 2.0):
+        self.engine = engine
+        self.intervalo_verificacion = intervalo_verificacion
+        self._datos: Dict[str, Dict[int, Any]] = {}
+        self._versiones: Dict[str, int] = {}
+        self._verificado: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self.cargas = 0
+        self.verificaciones = 0
+        self.aciertos = 0
+
+    def _version_bd(self, session: Session, nombre: str) -> int:
+        return session.exec(select(VersionDatos.version).where(VersionDatos.nombre == nombre)).first() or 0
+
+    def _vigentes(self, nombre: str) -> Dict[int, Any]:
+        datos = self._datos.get(nombre)
+        if datos is not None and time.monotonic() - self._verificado.get(nombre, 0) < self.intervalo_verificacion:
+            self.aciertos += 1
+            return datos
+        with self._lock:
+            datos = self._datos.get(nombre)
+            if datos is not None and time.monotonic() - self._verificado.get(nombre, 0) < self.intervalo_verificacion:
+                self.aciertos += 1
+                return datos
+            with Session(self.engine) as session:
+                version = self._version_bd(session, nombre)
+                self.verificaciones += 1
+                if datos is None or version != self._versiones.get(nombre):
+                    modelo = MODELOS[nombre]
+                    filas = session.exec(select(modelo).order_by(modelo.id)).all()
+                    for fila in filas:
+                        session.expunge(fila)
+                    datos = {fila.id: fila for fila in filas}
+                    self._datos[nombre] = datos
+                    self._versiones[nombre] = version
+                    self.cargas += 1
+            self._verificado[nombre] = time.monotonic()
+            return datos
+
+    def invalidar(self, nombre: Optional[str] = None):
+        """Fuerza a comprobar la versión en la próxima lectura (tras un commit local)"""
+        with self._lock:
+            for clave in [nombre] if nombre else list(MODELOS):
+                self._verificado.pop(clave, None)
+
+    def planes(self) -> List[PlanMembresia]:
+        return list(self._vigentes("planes").values())
+
+    def plan(self, plan_id: int) -> Optional[PlanMembresia]:
+        return self._vigentes("planes").get(plan_id)
+
+    def clases(self) -> List[Clase]:
+        return list(self._vigentes("clases").values())
+
+    def clase(self, clase_id: int) -> Optional[Clase]:
+        return self._vigentes("clases").get(clase_id)
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "versiones": dict(self._versiones),
+            "elementos": {nombre: len(datos) for nombre, datos in self._datos.items()},
+            "intervalo_verificacion_s": self.intervalo_verificacion,
+            "aciertos": self.aciertos,
+            "verificaciones": self.verificaciones,
+            "cargas": self.cargas,
+        }
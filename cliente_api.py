@@ -0,0 +1,64 @@
+# cliente_api.py - Cliente HTTP de la API para el dashboard: conexiones reutilizadas, timeouts y reintentos
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from tiempos_dashboard import medir
+
+URL_API = os.environ.get("API_URL", "https://gimnasio-2-0-1.onrender.com")
+# Clave del dashboard: si está en ADMISION_CLAVES de la API tiene su propio cubo de admisión
+CLAVE_API = os.environ.get("API_KEY")
+
+
+class ClienteAPI:
+    """Una requests.Session compartida por todos los hilos del proceso.
+
+    El pool mantiene abiertas hasta `max_conexiones` conexiones keep-alive, así
+    que sólo el primer pedido a cada host paga el handshake TLS. Los GET se
+    reintentan con espera exponencial ante errores de conexión y 429/5xx (Render
+    devuelve 502/503 mientras despierta el servicio), respetando Retry-After.
+    """
+
+    def __init__(self, url_base: str = URL_API, timeout: Tuple[float, float] = (3.05, 20.0),
+                 reintentos: int = 3, max_conexiones: int = 10, clave: Optional[str] = CLAVE_API):
+        self.url_base = url_base.rstrip("/")
+        self.timeout = timeout
+        self.session = requests.Session()
+        if clave:
+            self.session.headers["X-API-Key"] = clave
+        reintento = Retry(
+            total=reintentos,
+            backoff_factor=0.5,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+        adaptador = HTTPAdapter(pool_connections=2, pool_maxsize=max_conexiones, max_retries=reintento)
+        self.session.mount("https://", adaptador)
+        self.session.mount("http://", adaptador)
+        self._ejecutor = ThreadPoolExecutor(max_workers=max_conexiones, thread_name_prefix="cliente-api")
+
+    def get(self, ruta: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        """GET que devuelve el JSON; lanza requests.HTTPError si la respuesta final no es 2xx"""
+        with medir("fetch"):
+            # .content descarga el cuerpo entero: lo que queda en decode es sólo el parseo
+            response = self.session.get(f"{self.url_base}{ruta}", params=params, timeout=self.timeout)
+            response.raise_for_status()
+            response.content
+        with medir("decode"):
+            return response.json()
+
+    def post(self, ruta: str, **kwargs) -> Any:
+        """POST sin reintentos automáticos (no es idempotente)"""
+        response = self.session.post(f"{self.url_base}{ruta}", timeout=self.timeout, **kwargs)
+        response.raise_for_status()
+        return response.json()
+
+    def en_paralelo(self, funcion, argumentos):
+        """Aplica `funcion` a cada elemento de `argumentos` en el pool del cliente, conservando el orden"""
+        return list(self._ejecutor.map(funcion, argumentos))
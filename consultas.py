@@ -0,0 +1,100 @@
+# consultas.py - Consultas de lectura de los listados, compartidas por la API y el dashboard en modo local
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select, union_all
+
+from modelos import Clase, Entrada, Pago, PlanMembresia, Reserva, ResumenEntradasSocio, Socio
+
+# Conjunto del dashboard → tabla que lo respalda (/socios/, /entradas/, ...)
+TABLAS = {
+    "socios": Socio.__table__,
+    "entradas": Entrada.__table__,
+    "clases": Clase.__table__,
+    "reservas": Reserva.__table__,
+    "planes": PlanMembresia.__table__,
+    "pagos": Pago.__table__,
+}
+
+
+def columnas_pedidas(tabla, campos: Optional[str]):
+    """`campos=id,nombre` → esas columnas de la tabla (None = todas); ValueError si alguna no existe"""
+    if not campos:
+        return None
+    nombres = [c.strip() for c in campos.split(",") if c.strip()]
+    desconocidos = [n for n in nombres if n not in tabla.c]
+    if desconocidos:
+        raise ValueError(f"Campos desconocidos: {', '.join(desconocidos)}")
+    return [tabla.c[n] for n in nombres]
+
+
+def listado(tabla, columnas=None):
+    return select(*(columnas or tabla.c))
+
+
+def reservas_con_nombres(columnas=None):
+    """Reservas (todas las columnas o `columnas`) con socio_nombre y clase_nombre"""
+    return (
+        select(*(columnas or Reserva.__table__.c),
+               Socio.nombre.label("socio_nombre"), Clase.nombre.label("clase_nombre"))
+        .outerjoin(Socio, Socio.id == Reserva.socio_id)
+        .outerjoin(Clase, Clase.id == Reserva.clase_id)
+    )
+
+
+def ultimas_entradas():
+    """socio_id y ultima_entrada de todo el histórico: la tabla activa y los resúmenes de los meses archivados.
+
+    Un socio cuyas entradas se archivaron todas no aparece en /entradas/ pero sí aquí,
+    que es lo que necesita la alerta de inactividad.
+    """
+    activas = select(Entrada.socio_id, func.max(Entrada.fecha_hora).label("ultima_entrada")).group_by(Entrada.socio_id)
+    archivadas = select(ResumenEntradasSocio.socio_id,
+                        func.max(ResumenEntradasSocio.ultima_entrada).label("ultima_entrada")
+                        ).group_by(ResumenEntradasSocio.socio_id)
+    todas = union_all(activas, archivadas).subquery()
+    return select(todas.c.socio_id, func.max(todas.c.ultima_entrada).label("ultima_entrada")).group_by(todas.c.socio_id)
+
+
+def detalle_reservas(conn, clase_id: Optional[int] = None, estado: Optional[str] = None,
+                     desde: Optional[date] = None, hasta: Optional[date] = None,
+                     antes_de: Optional[int] = None, limite: int = 100) -> Dict[str, Any]:
+    """Una página de reservas unidas con clase y socio, de la más nueva a la más vieja.
+
+    `siguiente` es el `antes_de` de la página siguiente (None en la última);
+    `total` y `por_estado` cuentan todo lo que cumple los filtros.
+    """
+    limite = max(1, min(limite, 1000))
+    filtros = []
+    if clase_id is not None:
+        filtros.append(Reserva.clase_id == clase_id)
+    if estado:
+        filtros.append(Reserva.estado == estado)
+    # fecha_reserva es texto ISO (YYYY-MM-DD): el orden de texto es el de fechas
+    if desde:
+        filtros.append(Reserva.fecha_reserva >= desde.isoformat())
+    if hasta:
+        filtros.append(Reserva.fecha_reserva <= hasta.isoformat())
+
+    consulta = (
+        select(Reserva.id, Reserva.socio_id, Socio.nombre.label("socio_nombre"),
+               Reserva.clase_id, Clase.nombre.label("clase_nombre"), Clase.dia_semana, Clase.hora_inicio,
+               Reserva.fecha_reserva, Reserva.estado)
+        .outerjoin(Socio, Socio.id == Reserva.socio_id)
+        .outerjoin(Clase, Clase.id == Reserva.clase_id)
+        .where(*filtros)
+    )
+    if antes_de is not None:
+        consulta = consulta.where(Reserva.id < antes_de)
+    filas: List[Any] = conn.execute(consulta.order_by(Reserva.id.desc()).limit(limite + 1)).mappings().all()
+    hay_mas = len(filas) > limite
+    filas = filas[:limite]
+
+    por_estado = dict(conn.execute(
+        select(Reserva.estado, func.count()).where(*filtros).group_by(Reserva.estado)).all())
+    return {
+        "reservas": filas,
+        "siguiente": filas[-1]["id"] if hay_mas else None,
+        "total": sum(por_estado.values()),
+        "por_estado": por_estado,
+    }
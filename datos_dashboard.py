@@ -0,0 +1,244 @@
+# datos_dashboard.py - Datos del dashboard compartidos entre sesiones, con TTL por conjunto y refresco en segundo plano
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from tiempos_dashboard import recolectar
+
+logger = logging.getLogger(__name__)
+_local = threading.local()
+
+
+def marcar_respaldo(origen: str):
+    """La carga en curso en este hilo no salió de la fuente principal sino de `origen` (ver FuenteConRespaldo)"""
+    if getattr(_local, "respaldo", None) is not None:
+        _local.respaldo.append(origen)
+
+
+@dataclass
+class Conjunto:
+    cargar: Callable[..., Any]
+    ttl: float
+    # Lo que se devuelve si la primera carga falla
+    vacio: Callable[[], Any] = lambda: None
+
+
+@dataclass
+class _Entrada:
+    valor: Any
+    obtenido: float
+    usado: float
+    vencido: bool = False
+    error: Optional[str] = None
+    actualizado: Optional[str] = None
+    bytes: Optional[int] = None
+    # Segundos de la última carga por etapa (fetch, decode) según tiempos_dashboard.medir
+    tiempos: Optional[Dict[str, float]] = None
+    # De dónde salió el valor si no fue de la fuente principal (p. ej. "instantánea 20240101_120000")
+    respaldo: Optional[str] = None
+
+
+def _bytes(valor: Any) -> Optional[int]:
+    """Memoria de un DataFrame contando el contenido de las columnas de texto"""
+    if hasattr(valor, "memory_usage"):
+        return int(valor.memory_usage(deep=True).sum())
+    return None
+
+
+class AlmacenDatos:
+    """Una copia por proceso de cada conjunto de datos, compartida por todas las sesiones.
+
+    `obtener` sólo espera a la red la primera vez que se pide un conjunto; a
+    partir de ahí devuelve lo que hay y, si pasó su TTL, un hilo lo vuelve a
+    cargar. El hilo también adelanta los conjuntos a punto de vencer que se
+    usaron en los últimos `inactividad` segundos, así que un dashboard abierto
+    casi nunca ve datos más viejos que su TTL. Si una carga falla se sigue
+    sirviendo el valor anterior y el error queda en `error(nombre)`.
+    Los valores con `.copy()` (DataFrames) se devuelven copiados: cada sesión
+    puede añadirles columnas sin tocar la copia compartida.
+    Cada combinación de argumentos (columnas, páginas, filtros) es una entrada:
+    las que nadie pidió en `expiracion` segundos se descartan y, pasadas
+    `max_entradas`, también las usadas hace más tiempo.
+    """
+
+    def __init__(self, conjuntos: Dict[str, Conjunto], intervalo: float = 1.0, inactividad: float = 300.0,
+                 en_paralelo: Optional[Callable[[Callable, List], List]] = None,
+                 max_entradas: int = 200, expiracion: float = 3600.0):
+        self.conjuntos = conjuntos
+        # Cómo repartir varias cargas a la vez (p. ej. ClienteAPI.en_paralelo); por defecto, en serie
+        self.en_paralelo = en_paralelo or (lambda funcion, argumentos: [funcion(a) for a in argumentos])
+        self.intervalo = intervalo
+        self.inactividad = inactividad
+        self.max_entradas = max_entradas
+        self.expiracion = expiracion
+        self._datos: Dict[Tuple, _Entrada] = {}
+        self._lock = threading.Lock()
+        self._cargando: Dict[Tuple, threading.Lock] = {}
+        self._despertar = threading.Event()
+        self._hilo: Optional[threading.Thread] = None
+        self.cargas = 0
+        self.fallos = 0
+        self.aciertos = 0
+        self.descartadas = 0
+
+    def _clave(self, nombre: str, args: tuple) -> Tuple:
+        if nombre not in self.conjuntos:
+            raise KeyError(f"Conjunto de datos desconocido: {nombre}")
+        return (nombre,) + args
+
+    def _cargar(self, clave: Tuple, forzar: bool = False) -> _Entrada:
+        """Carga `clave`; si otro hilo la cargó mientras se esperaba, usa ese resultado"""
+        with self._lock:
+            cerrojo = self._cargando.setdefault(clave, threading.Lock())
+        with cerrojo:
+            previa = self._datos.get(clave)
+            if previa is not None and not forzar:
+                return previa
+            conjunto = self.conjuntos[clave[0]]
+            ahora = time.monotonic()
+            _local.respaldo = respaldo = []
+            try:
+                with recolectar() as tiempos:
+                    valor = conjunto.cargar(*clave[1:])
+                entrada = _Entrada(valor, ahora, previa.usado if previa else ahora,
+                                   actualizado=datetime.now().isoformat(timespec="seconds"), bytes=_bytes(valor),
+                                   tiempos=tiempos, respaldo=respaldo[-1] if respaldo else None)
+                self.cargas += 1
+            except Exception as e:
+                self.fallos += 1
+                logger.warning(f" Dashboard: no se pudo cargar {clave[0]}: {e}")
+                if previa is not None:
+                    # Se reintenta al volver a cumplirse el TTL, no en cada rerun
+                    entrada = _Entrada(previa.valor, ahora, previa.usado, error=str(e),
+                                       actualizado=previa.actualizado, bytes=previa.bytes, tiempos=previa.tiempos,
+                                       respaldo=previa.respaldo)
+                else:
+                    entrada = _Entrada(conjunto.vacio(), ahora, ahora, error=str(e))
+            finally:
+                _local.respaldo = None
+            self._datos[clave] = entrada
+        if len(self._datos) > self.max_entradas:
+            self._podar()
+        return entrada
+
+    def _podar(self):
+        """Descarta las entradas sin uso en `expiracion` segundos y, si aún sobran, las usadas hace más tiempo"""
+        ahora = time.monotonic()
+        with self._lock:
+            por_uso = sorted(list(self._datos.items()), key=lambda item: item[1].usado)
+            sobran = max(0, len(por_uso) - self.max_entradas)
+            for i, (clave, entrada) in enumerate(por_uso):
+                if i >= sobran and ahora - entrada.usado <= self.expiracion:
+                    break
+                self._datos.pop(clave, None)
+                cerrojo = self._cargando.get(clave)
+                if cerrojo is not None and not cerrojo.locked():
+                    del self._cargando[clave]
+                self.descartadas += 1
+
+    def _ttl(self, clave: Tuple) -> float:
+        return self.conjuntos[clave[0]].ttl
+
+    def _iniciar_hilo(self):
+        if self._hilo is None or not self._hilo.is_alive():
+            with self._lock:
+                if self._hilo is None or not self._hilo.is_alive():
+                    self._hilo = threading.Thread(target=self._bucle, daemon=True, name="dashboard-refresco")
+                    self._hilo.start()
+
+    def obtener(self, nombre: str, *args) -> Any:
+        clave = self._clave(nombre, args)
+        self._iniciar_hilo()
+        entrada = self._datos.get(clave)
+        if entrada is None:
+            entrada = self._cargar(clave)
+        else:
+            self.aciertos += 1
+            if entrada.vencido or time.monotonic() - entrada.obtenido >= self._ttl(clave):
+                self._despertar.set()
+        entrada.usado = time.monotonic()
+        valor = entrada.valor
+        return valor.copy() if hasattr(valor, "copy") else valor
+
+    def obtener_varios(self, *peticiones) -> List[Any]:
+        """Como `obtener` para varios conjuntos; los que aún no están se cargan a la vez.
+
+        Cada petición es un nombre o una tupla (nombre, *args). La espera es la de
+        la carga más lenta, no la suma.
+        """
+        claves = [self._clave(p, ()) if isinstance(p, str) else self._clave(p[0], tuple(p[1:])) for p in peticiones]
+        faltan = [clave for clave in dict.fromkeys(claves) if clave not in self._datos]
+        if len(faltan) > 1:
+            self.en_paralelo(self._cargar, faltan)
+        return [self.obtener(clave[0], *clave[1:]) for clave in claves]
+
+    def error(self, nombre: str, *args) -> Optional[str]:
+        entrada = self._datos.get(self._clave(nombre, args))
+        return entrada.error if entrada else None
+
+    def respaldo(self, nombre: str, *args) -> Optional[str]:
+        """De dónde salió el valor servido si no fue de la fuente principal; None si fue de ella"""
+        entrada = self._datos.get(self._clave(nombre, args))
+        return entrada.respaldo if entrada else None
+
+    def tiempos_carga(self, nombre: str, *args) -> Dict[str, Any]:
+        """Fetch y decode de la última carga del conjunto y cuándo fue (time.monotonic)"""
+        entrada = self._datos.get(self._clave(nombre, args))
+        if entrada is None:
+            return {}
+        return dict(entrada.tiempos or {}, obtenido=entrada.obtenido)
+
+    def invalidar(self, *nombres: str):
+        """Tras una escritura: los conjuntos indicados (o todos) se recargan ya en segundo plano"""
+        for clave, entrada in list(self._datos.items()):
+            if not nombres or clave[0] in nombres:
+                entrada.vencido = True
+        self._despertar.set()
+
+    def _pendientes(self):
+        ahora = time.monotonic()
+        for clave, entrada in list(self._datos.items()):
+            if ahora - entrada.usado > self.inactividad:
+                continue
+            # Se adelanta un intervalo para que nadie llegue a ver el conjunto vencido
+            if entrada.vencido or ahora - entrada.obtenido >= self._ttl(clave) - self.intervalo:
+                yield clave
+
+    def _refrescar(self):
+        self._podar()
+        self.en_paralelo(lambda clave: self._cargar(clave, forzar=True), list(self._pendientes()))
+
+    def _bucle(self):
+        while True:
+            self._despertar.wait(self.intervalo)
+            self._despertar.clear()
+            try:
+                self._refrescar()
+            except Exception as e:
+                logger.error(f" Dashboard: error en el refresco de datos: {e}")
+
+    def estado(self) -> Dict[str, Any]:
+        ahora = time.monotonic()
+        return {
+            "conjuntos": {
+                "/".join(str(p) for p in clave): {
+                    "edad_s": round(ahora - entrada.obtenido, 1),
+                    "ttl_s": self._ttl(clave),
+                    "actualizado": entrada.actualizado,
+                    "error": entrada.error,
+                    "respaldo": entrada.respaldo,
+                    "bytes": entrada.bytes,
+                    "tiempos_ms": {k: round(v * 1000, 1) for k, v in (entrada.tiempos or {}).items()},
+                }
+                for clave, entrada in list(self._datos.items())
+            },
+            "cargas": self.cargas,
+            "fallos": self.fallos,
+            "aciertos": self.aciertos,
+            "descartadas": self.descartadas,
+            "max_entradas": self.max_entradas,
+            "bytes_total": sum(entrada.bytes or 0 for entrada in list(self._datos.values())),
+        }
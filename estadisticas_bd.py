@@ -0,0 +1,137 @@
+# estadisticas_bd.py - Filas, índices, tamaños y última escritura por tabla sin materializar filas
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from sqlalchemy import inspect, text
+
+# Tablas con seguimiento en `cambio` (ver cambios.registrar_seguimiento)
+TABLAS_CON_CAMBIOS = ("socio", "entrada", "reserva", "pago")
+
+
+def _contar(conn, tabla: str) -> int:
+    return conn.execute(text(f'SELECT COUNT(*) FROM "{tabla}"')).scalar()
+
+
+def _estimaciones_sqlite(conn) -> Dict[str, int]:
+    """Filas por tabla según sqlite_stat1 (lo rellena el ANALYZE del mantenimiento)"""
+    existe = conn.execute(text("SELECT 1 FROM sqlite_master WHERE name = 'sqlite_stat1'")).first()
+    if not existe:
+        return {}
+    estimaciones: Dict[str, int] = {}
+    for tabla, stat in conn.execute(text("SELECT tbl, stat FROM sqlite_stat1")):
+        try:
+            estimaciones[tabla] = max(estimaciones.get(tabla, 0), int(stat.split()[0]))
+        except (ValueError, IndexError, AttributeError):
+            continue
+    return estimaciones
+
+
+def _tamanos_sqlite(conn) -> Optional[Dict[str, int]]:
+    """Bytes por tabla, sumando sus índices, con dbstat; None si SQLite se compiló sin él"""
+    try:
+        filas = conn.execute(text(
+            "SELECT m.tbl_name, SUM(d.pgsize) FROM dbstat AS d JOIN sqlite_master AS m ON m.name = d.name "
+            "WHERE d.aggregate = TRUE GROUP BY m.tbl_name")).all()
+    except Exception:
+        return None
+    return {tabla: tamano for tabla, tamano in filas}
+
+
+def _indices_sqlite(conn) -> Dict[str, int]:
+    """Índices por tabla, incluidos los automáticos de claves primarias y UNIQUE"""
+    return {tabla: total for tabla, total in conn.execute(text(
+        "SELECT tbl_name, COUNT(*) FROM sqlite_master WHERE type = 'index' GROUP BY tbl_name"))}
+
+
+def _ultimas_escrituras(conn, tablas) -> Dict[str, Optional[str]]:
+    """Fecha del último cambio registrado de cada tabla: MAX(seq) por el índice de `tabla`"""
+    resultado = {}
+    for tabla in tablas:
+        resultado[tabla] = conn.execute(text(
+            "SELECT fecha FROM cambio WHERE seq = (SELECT MAX(seq) FROM cambio WHERE tabla = :tabla)"
+        ), {"tabla": tabla}).scalar()
+    return resultado
+
+
+class EstadisticasBD:
+    """Estadísticas de la base cacheadas: conteos `ttl_segundos`, tamaños `ttl_tamanos_segundos`.
+
+    Los tamaños se recalculan en segundo plano y, mientras tanto, se sirven los
+    anteriores (o null justo tras arrancar).
+
+    Con SQLite, las tablas que según sqlite_stat1 superan `umbral_exacto` filas
+    devuelven esa estimación en lugar de un COUNT(*) que recorre un índice entero.
+    """
+
+    def __init__(self, engine, ttl_segundos: float = 30.0, ttl_tamanos_segundos: float = 600.0,
+                 umbral_exacto: int = 200_000):
+        self.engine = engine
+        self.ttl = ttl_segundos
+        self.ttl_tamanos = ttl_tamanos_segundos
+        self.umbral_exacto = umbral_exacto
+        self._lock = threading.Lock()
+        self._cache: Dict[bool, tuple] = {}
+        self._tamanos: Optional[tuple] = None
+        self._refrescando = threading.Lock()
+
+    def refrescar_tamanos(self):
+        """Recalcula los tamaños en un hilo aparte: dbstat recorre todas las páginas"""
+        if self.engine.dialect.name != "sqlite" or self._refrescando.locked():
+            return
+        threading.Thread(target=self._refrescar_tamanos, daemon=True, name="estadisticas-tamanos").start()
+
+    def _refrescar_tamanos(self):
+        with self._refrescando:
+            with self.engine.connect() as conn:
+                tamanos = _tamanos_sqlite(conn)
+            self._tamanos = (time.monotonic(), tamanos, datetime.now().isoformat(timespec="seconds"))
+
+    def _tamanos_cacheados(self) -> Dict[str, Any]:
+        if self._tamanos is None or time.monotonic() - self._tamanos[0] > self.ttl_tamanos:
+            self.refrescar_tamanos()
+        if self._tamanos is None:
+            return {"bytes": None, "calculado": None}
+        return {"bytes": self._tamanos[1], "calculado": self._tamanos[2]}
+
+    def calcular(self, exacto: bool = False) -> Dict[str, Any]:
+        inicio = time.perf_counter()
+        es_sqlite = self.engine.dialect.name == "sqlite"
+        with self.engine.connect() as conn:
+            inspector = inspect(conn)
+            nombres = sorted(inspector.get_table_names())
+            estimaciones = _estimaciones_sqlite(conn) if es_sqlite and not exacto else {}
+            tamanos = self._tamanos_cacheados()
+            con_cambios = [t for t in TABLAS_CON_CAMBIOS if t in nombres]
+            ultimas = _ultimas_escrituras(conn, con_cambios) if "cambio" in nombres else {}
+
+            indices = _indices_sqlite(conn) if es_sqlite else {
+                nombre: len(inspector.get_indexes(nombre)) for nombre in nombres}
+
+            tablas = {}
+            for nombre in nombres:
+                estimado = estimaciones.get(nombre, 0) > self.umbral_exacto
+                tablas[nombre] = {
+                    "filas": estimaciones[nombre] if estimado else _contar(conn, nombre),
+                    "filas_estimadas": estimado,
+                    "indices": indices.get(nombre, 0),
+                    "bytes": tamanos["bytes"].get(nombre) if tamanos["bytes"] is not None else None,
+                    "ultima_escritura": ultimas.get(nombre),
+                }
+        return {
+            "motor": self.engine.dialect.name,
+            "tablas": tablas,
+            "tamanos_calculados": tamanos["calculado"],
+            "generado": datetime.now().isoformat(timespec="seconds"),
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 2),
+        }
+
+    def obtener(self, exacto: bool = False) -> Dict[str, Any]:
+        with self._lock:
+            en_cache = self._cache.get(exacto)
+            if en_cache and time.monotonic() - en_cache[0] < self.ttl:
+                return {**en_cache[1], "cache": True}
+            resultado = self.calcular(exacto)
+            self._cache[exacto] = (time.monotonic(), resultado)
+            return {**resultado, "cache": False}
@@ -0,0 +1,131 @@
+# eventos.py - Bus de eventos en memoria (pub/sub) para check-ins y reservas en vivo
+import asyncio
+import itertools
+import json
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional, Set
+
+# Marca que recibe un suscriptor lento cuando se le desconecta
+FIN = None
+
+
+class Suscripcion:
+    """Un cliente suscrito con su propio buffer acotado."""
+
+    def __init__(self, bus: "BusEventos", loop: asyncio.AbstractEventLoop,
+                 max_pendientes: int, tipos: Optional[Set[str]] = None):
+        self.bus = bus
+        self.loop = loop
+        self.tipos = tipos
+        self.cola: asyncio.Queue = asyncio.Queue(maxsize=max_pendientes)
+        self.descartada = False
+
+    def _entregar(self, evento: Dict[str, Any]):
+        # Siempre se ejecuta dentro del loop del suscriptor
+        if self.descartada:
+            return
+        try:
+            self.cola.put_nowait(evento)
+            self.bus.entregados += 1
+        except asyncio.QueueFull:
+            # Cliente lento: se vacía su buffer y se le desconecta
+            self.descartada = True
+            self.bus.cancelar(self)
+            self.bus.descartados += 1
+            while not self.cola.empty():
+                self.cola.get_nowait()
+            self.cola.put_nowait(FIN)
+
+    async def siguiente(self, timeout: Optional[float] = None) -> Optional[Dict[str, Any]]:
+        """Espera el próximo evento. Lanza asyncio.TimeoutError si no llega ninguno."""
+        return await asyncio.wait_for(self.cola.get(), timeout=timeout)
+
+
+class BusEventos:
+    """Fan-out en proceso. `publicar` es seguro desde los hilos del threadpool."""
+
+    def __init__(self, max_pendientes: int = 100):
+        self.max_pendientes = max_pendientes
+        self._suscripciones: Set[Suscripcion] = set()
+        self._lock = threading.Lock()
+        self._secuencia = itertools.count(1)
+        self.publicados = 0
+        self.entregados = 0
+        self.descartados = 0
+
+    def suscribir(self, tipos: Optional[Set[str]] = None) -> Suscripcion:
+        """Crea una suscripción. Debe llamarse desde el event loop del cliente."""
+        suscripcion = Suscripcion(self, asyncio.get_running_loop(), self.max_pendientes, tipos)
+        with self._lock:
+            self._suscripciones.add(suscripcion)
+        return suscripcion
+
+    def cancelar(self, suscripcion: Suscripcion):
+        with self._lock:
+            self._suscripciones.discard(suscripcion)
+
+    def publicar(self, tipo: str, datos: Dict[str, Any]) -> Dict[str, Any]:
+        evento = {
+            "id": next(self._secuencia),
+            "tipo": tipo,
+            "fecha": datetime.now().isoformat(),
+            "datos": datos,
+        }
+        self.publicados += 1
+        with self._lock:
+            suscripciones = list(self._suscripciones)
+
+        try:
+            loop_actual = asyncio.get_running_loop()
+        except RuntimeError:
+            loop_actual = None
+
+        for suscripcion in suscripciones:
+            if suscripcion.tipos and tipo not in suscripcion.tipos:
+                continue
+            if suscripcion.loop is loop_actual:
+                suscripcion._entregar(evento)
+                continue
+            try:
+                suscripcion.loop.call_soon_threadsafe(suscripcion._entregar, evento)
+            except RuntimeError:
+                # El loop del cliente ya se cerró
+                self.cancelar(suscripcion)
+        return evento
+
+    def estadisticas(self) -> Dict[str, Any]:
+        with self._lock:
+            suscriptores = len(self._suscripciones)
+        return {
+            "suscriptores": suscriptores,
+            "max_pendientes_por_cliente": self.max_pendientes,
+            "publicados": self.publicados,
+            "entregados": self.entregados,
+            "clientes_descartados": self.descartados,
+        }
+
+
+def formatear_sse(evento: Dict[str, Any]) -> str:
+    datos = json.dumps(evento, ensure_ascii=False, default=str)
+    return f"id: {evento['id']}\nevent: {evento['tipo']}\ndata: {datos}\n\n"
+
+
+async def generar_sse(suscripcion: Suscripcion, request=None, intervalo_ping: float = 15.0):
+    """Generador para StreamingResponse con formato text/event-stream."""
+    try:
+        yield "retry: 3000\n\n"
+        while True:
+            if request is not None and await request.is_disconnected():
+                break
+            try:
+                evento = await suscripcion.siguiente(timeout=intervalo_ping)
+            except asyncio.TimeoutError:
+                yield ": ping\n\n"
+                continue
+            if evento is FIN:
+                yield "event: desconectado\ndata: {\"motivo\": \"cliente lento\"}\n\n"
+                break
+            yield formatear_sse(evento)
+    finally:
+        suscripcion.bus.cancelar(suscripcion)
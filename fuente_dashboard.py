@@ -0,0 +1,357 @@
+# fuente_dashboard.py - De dónde lee el dashboard: la API por HTTP, la base directamente o una instantánea Parquet
+import logging
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime
+from typing import Any, Dict, Optional
+
+import pandas as pd
+from sqlalchemy import create_engine
+from sqlmodel import Session
+
+import consultas
+import series_entradas
+from cliente_api import ClienteAPI
+from datos_dashboard import marcar_respaldo
+from ocupacion_horaria import DIAS_SEMANA, MapaCalor
+from tablas_dashboard import ESQUEMAS, Esquema, a_dataframe, tipar
+from tiempos_dashboard import medir
+
+logger = logging.getLogger(__name__)
+
+MODOS = ("http", "local", "instantanea")
+
+
+def _socios_validos(df: pd.DataFrame) -> pd.DataFrame:
+    # Filtrar datos válidos (eliminar registros con "string")
+    if df.empty or "id" not in df.columns:
+        return df
+    return df[df["id"] != "string"].reset_index(drop=True)
+
+
+def _puntos_serie(serie: Dict[str, Any]) -> Dict[str, Any]:
+    puntos = pd.DataFrame.from_records(serie["puntos"], columns=["inicio", "total"])
+    puntos["inicio"] = pd.to_datetime(puntos["inicio"])
+    serie["puntos"] = puntos
+    return serie
+
+
+def _instantaneas():
+    # pyarrow sólo hace falta para leer instantáneas: los modos http y local no lo importan
+    import instantaneas
+    return instantaneas
+
+
+def _fecha(valor) -> Optional[date]:
+    if valor is None or isinstance(valor, date):
+        return valor
+    return date.fromisoformat(valor)
+
+
+class FuenteHTTP:
+    """Lee de la API (API_URL). Sirve para un dashboard desplegado lejos de la base."""
+    modo = "http"
+
+    def __init__(self, cliente: Optional[ClienteAPI] = None):
+        self.cliente = cliente or ClienteAPI()
+        self.en_paralelo = self.cliente.en_paralelo
+
+    def _get(self, ruta: str, params: Optional[Dict[str, Any]] = None) -> Any:
+        return self.cliente.get(ruta, params={k: v for k, v in (params or {}).items() if v is not None})
+
+    def tabla(self, conjunto: str, campos=None) -> pd.DataFrame:
+        # Proyección en el servidor: sólo viajan y se decodifican las columnas que usa la sección
+        registros = self._get(f"/{conjunto}/", {"campos": ",".join(campos) if campos else None})
+        with medir("decode"):
+            df = a_dataframe(conjunto, registros)
+            return _socios_validos(df) if conjunto == "socios" else df
+
+    def reservas(self, campos=None, nombres=False) -> pd.DataFrame:
+        params = {"campos": ",".join(campos) if campos else None, "nombres": "true" if nombres else None}
+        registros = self._get("/reservas/", params)
+        with medir("decode"):
+            return a_dataframe("reservas", registros)
+
+    def ultimas_entradas(self) -> pd.DataFrame:
+        registros = self._get("/entradas/ultimas")
+        with medir("decode"):
+            return a_dataframe("ultimas_entradas", registros)
+
+    def reservas_detalle(self, clase_id, estado, desde, hasta, antes_de, limite) -> Dict[str, Any]:
+        pagina = self._get("/reservas/detalle", {"clase_id": clase_id, "estado": estado, "desde": desde,
+                                                 "hasta": hasta, "antes_de": antes_de, "limite": limite})
+        with medir("decode"):
+            pagina["reservas"] = a_dataframe("reservas", pagina["reservas"])
+        return pagina
+
+    def serie_entradas(self, desde, hasta, resolucion, max_puntos) -> Dict[str, Any]:
+        serie = self._get("/reportes/entradas/serie", {
+            "desde": desde, "hasta": hasta, "resolucion": resolucion, "max_puntos": max_puntos})
+        with medir("decode"):
+            return _puntos_serie(serie)
+
+    def mapa_calor(self, tipo, clase_id) -> Dict[str, Any]:
+        return self._get("/reportes/mapa-calor", {"tipo": tipo, "clase_id": clase_id})
+
+
+class FuenteLocal:
+    """Lee la base de DATABASE_URL con las mismas consultas que la API, sin HTTP ni JSON.
+
+    Para un dashboard que corre junto a la base: los listados salen de
+    pd.read_sql como DataFrames y se tipan con el mismo esquema que en modo HTTP,
+    así que las secciones no notan la diferencia. Sólo lee; las escrituras
+    siguen pasando por la API.
+    """
+    modo = "local"
+
+    def __init__(self, url: Optional[str] = None, hilos: int = 4):
+        self.engine = create_engine(url or os.environ.get("DATABASE_URL", "sqlite:///./temp.db"))
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="fuente-local")
+        self._mapa_calor = MapaCalor()
+
+    def en_paralelo(self, funcion, argumentos):
+        return list(self._ejecutor.map(funcion, argumentos))
+
+    def _leer(self, conjunto: str, consulta) -> pd.DataFrame:
+        with medir("fetch"), self.engine.connect() as conn:
+            df = pd.read_sql(consulta, conn)
+        if df.empty:
+            return df
+        with medir("decode"):
+            return tipar(df, ESQUEMAS.get(conjunto, Esquema()))
+
+    def tabla(self, conjunto: str, campos=None) -> pd.DataFrame:
+        tabla = consultas.TABLAS[conjunto]
+        df = self._leer(conjunto, consultas.listado(tabla, consultas.columnas_pedidas(tabla, ",".join(campos or ()))))
+        return _socios_validos(df) if conjunto == "socios" else df
+
+    def reservas(self, campos=None, nombres=False) -> pd.DataFrame:
+        if not nombres:
+            return self.tabla("reservas", campos)
+        columnas = consultas.columnas_pedidas(consultas.TABLAS["reservas"], ",".join(campos or ()))
+        return self._leer("reservas", consultas.reservas_con_nombres(columnas))
+
+    def ultimas_entradas(self) -> pd.DataFrame:
+        return self._leer("ultimas_entradas", consultas.ultimas_entradas())
+
+    def reservas_detalle(self, clase_id, estado, desde, hasta, antes_de, limite) -> Dict[str, Any]:
+        with medir("fetch"), self.engine.connect() as conn:
+            pagina = consultas.detalle_reservas(conn, clase_id, estado, _fecha(desde), _fecha(hasta), antes_de, limite)
+        with medir("decode"):
+            pagina["reservas"] = a_dataframe("reservas", [dict(fila) for fila in pagina["reservas"]])
+        return pagina
+
+    def serie_entradas(self, desde, hasta, resolucion, max_puntos) -> Dict[str, Any]:
+        with medir("fetch"):
+            serie = series_entradas.serie_entradas(self.engine, _fecha(desde), _fecha(hasta), resolucion, max_puntos)
+        with medir("decode"):
+            return _puntos_serie(serie)
+
+    def mapa_calor(self, tipo, clase_id) -> Dict[str, Any]:
+        # En la API la matriz vive en memoria y se actualiza con cada escritura; aquí se recalcula en cada carga
+        with medir("fetch"), Session(self.engine) as session:
+            self._mapa_calor.reconstruir(session)
+        return self._mapa_calor.matriz(tipo, clase_id)
+
+
+class FuenteInstantanea:
+    """Lee la última instantánea publicada por instantaneas.exportar (DASHBOARD_INSTANTANEA).
+
+    Los Parquet se abren mapeados en memoria y sólo se decodifican las columnas
+    pedidas, así que arrancar es casi inmediato aunque el histórico sea grande.
+    Cada lectura mira el puntero `actual.json`: una instantánea nueva se ve en la
+    siguiente recarga del almacén, sin reiniciar el dashboard.
+    """
+    modo = "instantanea"
+
+    def __init__(self, directorio: str, hilos: int = 4):
+        self.directorio = directorio
+        self._ejecutor = ThreadPoolExecutor(max_workers=hilos, thread_name_prefix="fuente-instantanea")
+
+    def en_paralelo(self, funcion, argumentos):
+        return list(self._ejecutor.map(funcion, argumentos))
+
+    @property
+    def manifiesto(self) -> Dict[str, Any]:
+        manifiesto = _instantaneas().manifiesto(self.directorio)
+        if manifiesto is None:
+            raise FileNotFoundError(f"No hay instantánea publicada en {self.directorio}")
+        return manifiesto
+
+    @property
+    def version(self) -> Optional[str]:
+        return (_instantaneas().manifiesto(self.directorio) or {}).get("version")
+
+    def _leer(self, conjunto: str, columnas=None, version: Optional[str] = None) -> pd.DataFrame:
+        version = version or self.manifiesto["version"]
+        with medir("fetch"):
+            tabla = _instantaneas().leer(self.directorio, version, conjunto, columnas)
+        with medir("decode"):
+            return tabla.to_pandas()
+
+    def tabla(self, conjunto: str, campos=None) -> pd.DataFrame:
+        df = self._leer(conjunto, campos)
+        if df.empty:
+            return df
+        with medir("decode"):
+            df = tipar(df, ESQUEMAS.get(conjunto, Esquema()))
+            return _socios_validos(df) if conjunto == "socios" else df
+
+    def ultimas_entradas(self) -> pd.DataFrame:
+        # Lo mismo que consultas.ultimas_entradas: entradas activas y resúmenes del archivo de la misma versión
+        version = self.manifiesto["version"]
+        activas = self._leer("entradas", ["socio_id", "fecha_hora"], version).rename(
+            columns={"fecha_hora": "ultima_entrada"})
+        archivadas = self._leer("entradas_por_socio", ["socio_id", "ultima_entrada"], version)
+        with medir("decode"):
+            df = pd.concat([activas, archivadas]).groupby("socio_id", as_index=False)["ultima_entrada"].max()
+            return tipar(df, ESQUEMAS["ultimas_entradas"])
+
+    def _reservas_con_nombres(self) -> pd.DataFrame:
+        # El join que hace la API en SQL, aquí con las tres tablas de la misma versión
+        version = self.manifiesto["version"]
+        reservas = self._leer("reservas", version=version)
+        socios = self._leer("socios", ["id", "nombre"], version).rename(
+            columns={"id": "socio_id", "nombre": "socio_nombre"})
+        clases = self._leer("clases", ["id", "nombre", "dia_semana", "hora_inicio"], version).rename(
+            columns={"id": "clase_id", "nombre": "clase_nombre"})
+        return reservas.merge(socios, on="socio_id", how="left").merge(clases, on="clase_id", how="left")
+
+    def reservas(self, campos=None, nombres=False) -> pd.DataFrame:
+        if not nombres:
+            return self.tabla("reservas", campos)
+        df = self._reservas_con_nombres()
+        columnas = list(campos or consultas.TABLAS["reservas"].c.keys()) + ["socio_nombre", "clase_nombre"]
+        return tipar(df[columnas], ESQUEMAS["reservas"])
+
+    def reservas_detalle(self, clase_id, estado, desde, hasta, antes_de, limite) -> Dict[str, Any]:
+        df = self._reservas_con_nombres()
+        filtro = pd.Series(True, index=df.index)
+        if clase_id is not None:
+            filtro &= df["clase_id"] == clase_id
+        if estado:
+            filtro &= df["estado"] == estado
+        if desde:
+            filtro &= df["fecha_reserva"] >= str(desde)
+        if hasta:
+            filtro &= df["fecha_reserva"] <= str(hasta)
+        df = df[filtro]
+        por_estado = {k: int(v) for k, v in df["estado"].value_counts().items()}
+        if antes_de is not None:
+            df = df[df["id"] < antes_de]
+        limite = max(1, min(limite, 1000))
+        pagina = df.sort_values("id", ascending=False).head(limite + 1)
+        hay_mas = len(pagina) > limite
+        pagina = pagina.head(limite)
+        columnas = ["id", "socio_id", "socio_nombre", "clase_id", "clase_nombre", "dia_semana", "hora_inicio",
+                    "fecha_reserva", "estado"]
+        return {
+            "reservas": tipar(pagina[columnas].reset_index(drop=True), ESQUEMAS["reservas"]),
+            "siguiente": int(pagina["id"].iloc[-1]) if hay_mas else None,
+            "total": sum(por_estado.values()),
+            "por_estado": por_estado,
+        }
+
+    def serie_entradas(self, desde, hasta, resolucion, max_puntos) -> Dict[str, Any]:
+        series_entradas.validar_resolucion(resolucion)
+        por_hora = self._leer("entradas_por_hora")
+        fechas = pd.to_datetime(por_hora["fecha"]).dt.date
+        hasta = _fecha(hasta) or datetime.now().date()
+        desde = _fecha(desde) or (fechas.min() if not por_hora.empty else hasta)
+        desde, hasta = min(desde, hasta), max(desde, hasta)
+        elegida = series_entradas.elegir_resolucion(desde, hasta, max(2, max_puntos), resolucion)
+        en_rango = por_hora[(fechas >= desde) & (fechas <= hasta)]
+        fechas = fechas[en_rango.index]
+        if elegida == "hora":
+            conteos = {(dia, int(hora)): int(total)
+                       for dia, hora, total in zip(fechas, en_rango["hora"], en_rango["total"])}
+        else:
+            conteos = {(dia,): int(total) for dia, total in en_rango["total"].groupby(fechas.values).sum().items()}
+        return _puntos_serie(series_entradas.armar_serie(conteos, desde, hasta, elegida))
+
+    def mapa_calor(self, tipo, clase_id) -> Dict[str, Any]:
+        celdas = self._leer("mapa_calor")
+        if clase_id is not None:
+            celdas, tipo = celdas[celdas["clase_id"] == clase_id], "reservas"
+        else:
+            celdas = celdas[celdas["clase_id"].isna()]
+            if tipo in ("entradas", "reservas"):
+                celdas = celdas[celdas["tipo"] == tipo]
+        valores = [[0] * 24 for _ in range(7)]
+        for dia, hora, valor in zip(celdas["dia"], celdas["hora"], celdas["valor"]):
+            valores[int(dia)][int(hora)] += int(valor)
+        return {
+            "tipo": tipo,
+            "clase_id": clase_id,
+            "dias": DIAS_SEMANA,
+            "horas": list(range(24)),
+            "valores": valores,
+            "total": sum(map(sum, valores)),
+            "actualizado": self.manifiesto["generado"],
+        }
+
+
+class FuenteConRespaldo:
+    """La fuente principal y, si una lectura falla (API dormida o caída), la instantánea.
+
+    La fuente la comparten todas las sesiones, así que no guarda de dónde salió
+    la última lectura: lo anota en la carga en curso (datos_dashboard.marcar_respaldo)
+    y queda en la entrada del almacén de ese conjunto. La carga siguiente vuelve a
+    probar la principal.
+    """
+
+    def __init__(self, principal, respaldo: FuenteInstantanea):
+        self.principal = principal
+        self.respaldo = respaldo
+        self.en_paralelo = principal.en_paralelo
+
+    @property
+    def modo(self) -> str:
+        return f"{self.principal.modo} (respaldo: instantanea)"
+
+    def _leer(self, metodo: str, *args):
+        try:
+            return getattr(self.principal, metodo)(*args)
+        except Exception as e:
+            if self.respaldo.version is None:
+                raise
+            logger.warning(f" Dashboard: {self.principal.modo} falló en {metodo} ({e}); se usa la instantánea")
+            resultado = getattr(self.respaldo, metodo)(*args)
+            marcar_respaldo(f"instantánea {self.respaldo.version}")
+            return resultado
+
+    def tabla(self, conjunto, campos=None):
+        return self._leer("tabla", conjunto, campos)
+
+    def reservas(self, campos=None, nombres=False):
+        return self._leer("reservas", campos, nombres)
+
+    def ultimas_entradas(self):
+        return self._leer("ultimas_entradas")
+
+    def reservas_detalle(self, clase_id, estado, desde, hasta, antes_de, limite):
+        return self._leer("reservas_detalle", clase_id, estado, desde, hasta, antes_de, limite)
+
+    def serie_entradas(self, desde, hasta, resolucion, max_puntos):
+        return self._leer("serie_entradas", desde, hasta, resolucion, max_puntos)
+
+    def mapa_calor(self, tipo, clase_id):
+        return self._leer("mapa_calor", tipo, clase_id)
+
+
+def crear_fuente(modo: Optional[str] = None):
+    """DASHBOARD_BACKEND=http (por defecto, API en API_URL), local (base en DATABASE_URL) o instantanea.
+
+    Con DASHBOARD_INSTANTANEA (directorio de instantaneas.exportar) los modos http y
+    local caen a la instantánea cuando no pueden leer.
+    """
+    modo = (modo or os.environ.get("DASHBOARD_BACKEND", "http")).strip().lower()
+    if modo not in MODOS:
+        raise ValueError(f"DASHBOARD_BACKEND debe ser uno de: {', '.join(MODOS)}")
+    directorio = os.environ.get("DASHBOARD_INSTANTANEA")
+    if modo == "instantanea":
+        if not directorio:
+            raise ValueError("DASHBOARD_BACKEND=instantanea necesita DASHBOARD_INSTANTANEA")
+        return FuenteInstantanea(directorio)
+    fuente = FuenteLocal() if modo == "local" else FuenteHTTP()
+    return FuenteConRespaldo(fuente, FuenteInstantanea(directorio)) if directorio else fuente
@@ -0,0 +1,386 @@
+# importacion.py - Importación masiva de socios y pagos desde CSV/XLSX, por lotes y en segundo plano
+import csv
+import io
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import select
+
+import cambios
+from modelos import Pago, PlanMembresia, Socio
+
+logger = logging.getLogger(__name__)
+
+TIPOS = ("socios", "pagos")
+FORMATOS = ("csv", "xlsx")
+ESTADOS_PAGO = ("pagado", "pendiente", "cancelado", "anulado", "rechazado")
+_socio = Socio.__table__
+_pago = Pago.__table__
+
+
+def formato_de(nombre: str) -> Optional[str]:
+    extension = os.path.splitext(nombre or "")[1].lower().lstrip(".")
+    return extension if extension in FORMATOS else None
+
+
+def leer_filas(ruta: str, formato: str) -> Iterator[Tuple[int, Dict[str, Any]]]:
+    """Recorre el archivo fila a fila, sin cargarlo entero. Devuelve (número de fila, datos)."""
+    if formato == "csv":
+        with open(ruta, newline="", encoding="utf-8-sig") as f:
+            muestra = f.read(4096)
+            f.seek(0)
+            try:
+                dialecto = csv.Sniffer().sniff(muestra, delimiters=",;\t")
+            except csv.Error:
+                dialecto = csv.excel
+            for numero, fila in enumerate(csv.DictReader(f, dialect=dialecto), start=2):
+                yield numero, {(k or "").strip().lower(): v for k, v in fila.items()}
+        return
+
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        raise ValueError("Para importar XLSX instala openpyxl")
+    libro = load_workbook(ruta, read_only=True, data_only=True)
+    try:
+        filas = libro.active.iter_rows(values_only=True)
+        cabecera = [str(c or "").strip().lower() for c in next(filas, ())]
+        for numero, valores in enumerate(filas, start=2):
+            if any(v is not None for v in valores):
+                yield numero, dict(zip(cabecera, valores))
+    finally:
+        libro.close()
+
+
+def contar_filas(ruta: str, formato: str) -> Optional[int]:
+    """Filas de datos estimadas (sin cabecera) para calcular el porcentaje de avance"""
+    if formato == "csv":
+        lineas, ultimo = 0, b"\n"
+        with open(ruta, "rb") as f:
+            while bloque := f.read(1024 * 1024):
+                lineas += bloque.count(b"\n")
+                ultimo = bloque[-1:]
+        return max(0, lineas + (ultimo != b"\n") - 1)
+    try:
+        from openpyxl import load_workbook
+    except ImportError:
+        return None
+    libro = load_workbook(ruta, read_only=True)
+    try:
+        return max(0, (libro.active.max_row or 1) - 1)
+    finally:
+        libro.close()
+
+
+def _texto(valor) -> str:
+    if valor is None:
+        return ""
+    if isinstance(valor, float) and valor.is_integer():
+        valor = int(valor)
+    return str(valor).strip()
+
+
+def _fecha(valor) -> Optional[str]:
+    """Fecha YYYY-MM-DD (también acepta DD/MM/YYYY y celdas fecha de Excel); None si no es válida"""
+    if hasattr(valor, "strftime"):
+        return valor.strftime("%Y-%m-%d")
+    texto = _texto(valor)
+    for formato in ("%Y-%m-%d", "%d/%m/%Y", "%Y-%m-%d %H:%M:%S"):
+        try:
+            return datetime.strptime(texto, formato).strftime("%Y-%m-%d")
+        except ValueError:
+            continue
+    return None
+
+
+def validar_socio(fila: Dict[str, Any]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    socio_id = _texto(fila.get("id"))
+    nombre = _texto(fila.get("nombre"))
+    if not socio_id:
+        return None, "id vacío"
+    if not nombre:
+        return None, "nombre vacío"
+    vencimiento = _fecha(fila.get("vencimiento"))
+    if vencimiento is None:
+        return None, f"vencimiento inválido: {_texto(fila.get('vencimiento'))!r}"
+    email = _texto(fila.get("email")) or None
+    if email and "@" not in email:
+        return None, f"email inválido: {email!r}"
+    return {"id": socio_id, "nombre": nombre, "vencimiento": vencimiento,
+            "email": email, "telefono": _texto(fila.get("telefono")) or None}, None
+
+
+def validar_pago(fila: Dict[str, Any], planes: Dict[int, Tuple[float, int]]) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    socio_id = _texto(fila.get("socio_id"))
+    if not socio_id:
+        return None, "socio_id vacío"
+    try:
+        plan_id = int(_texto(fila.get("plan_id")))
+    except ValueError:
+        return None, f"plan_id inválido: {_texto(fila.get('plan_id'))!r}"
+    if plan_id not in planes:
+        return None, f"plan {plan_id} no existe"
+    precio, duracion = planes[plan_id]
+    try:
+        monto = float(_texto(fila.get("monto")).replace(",", ".")) if _texto(fila.get("monto")) else precio
+    except ValueError:
+        return None, f"monto inválido: {_texto(fila.get('monto'))!r}"
+    if monto < 0:
+        return None, "monto negativo"
+    fecha_pago = _fecha(fila.get("fecha_pago")) if _texto(fila.get("fecha_pago")) else datetime.now().strftime("%Y-%m-%d")
+    if fecha_pago is None:
+        return None, f"fecha_pago inválida: {_texto(fila.get('fecha_pago'))!r}"
+    if _texto(fila.get("fecha_vencimiento")):
+        fecha_vencimiento = _fecha(fila.get("fecha_vencimiento"))
+        if fecha_vencimiento is None:
+            return None, f"fecha_vencimiento inválida: {_texto(fila.get('fecha_vencimiento'))!r}"
+    else:
+        fecha_vencimiento = (datetime.strptime(fecha_pago, "%Y-%m-%d") + timedelta(days=duracion)).strftime("%Y-%m-%d")
+    estado = _texto(fila.get("estado")).lower() or "pagado"
+    if estado not in ESTADOS_PAGO:
+        return None, f"estado inválido: {estado!r}"
+    registro = {"socio_id": socio_id, "plan_id": plan_id, "monto": monto, "fecha_pago": fecha_pago,
+                "fecha_vencimiento": fecha_vencimiento, "estado": estado,
+                "metodo_pago": _texto(fila.get("metodo_pago")) or None,
+                "referencia": _texto(fila.get("referencia")) or None}
+    if _texto(fila.get("id")):
+        try:
+            registro["id"] = int(_texto(fila.get("id")))
+        except ValueError:
+            return None, f"id inválido: {_texto(fila.get('id'))!r}"
+    return registro, None
+
+
+def _insert_upsert(conn, tabla, filas: List[Dict[str, Any]], columnas: List[str]):
+    """INSERT ... ON CONFLICT (id) DO UPDATE para SQLite y PostgreSQL; si el id existe sólo se pisan `columnas`"""
+    if conn.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    consulta = insert(tabla)
+    consulta = consulta.on_conflict_do_update(
+        index_elements=["id"], set_={c: consulta.excluded[c] for c in columnas if c != "id"})
+    conn.execute(consulta, filas)
+
+
+class TrabajoImportacion:
+    def __init__(self, tipo: str, nombre: str, formato: str, ruta: str, ruta_errores: str):
+        self.id = uuid.uuid4().hex[:12]
+        self.tipo = tipo
+        self.nombre = nombre
+        self.formato = formato
+        self.ruta = ruta
+        self.ruta_errores = ruta_errores
+        self.estado = "en_cola"
+        self.filas_leidas = 0
+        self.insertados = 0
+        self.actualizados = 0
+        self.errores = 0
+        self.lotes = 0
+        self.error: Optional[str] = None
+        self.inicio: Optional[float] = None
+        self.fin: Optional[float] = None
+        self.filas_estimadas: Optional[int] = None
+
+    def resumen(self) -> Dict[str, Any]:
+        duracion = ((self.fin or time.time()) - self.inicio) if self.inicio else 0.0
+        return {
+            "id": self.id,
+            "tipo": self.tipo,
+            "archivo": self.nombre,
+            "estado": self.estado,
+            "filas_leidas": self.filas_leidas,
+            "filas_estimadas": self.filas_estimadas,
+            "progreso_pct": (round(min(100.0, self.filas_leidas * 100 / self.filas_estimadas), 1)
+                             if self.filas_estimadas else None),
+            "insertados": self.insertados,
+            "actualizados": self.actualizados,
+            "errores": self.errores,
+            "lotes": self.lotes,
+            "duracion_s": round(duracion, 2),
+            "filas_por_segundo": round(self.filas_leidas / duracion, 1) if duracion else None,
+            "error": self.error,
+        }
+
+
+class Importador:
+    """Importa archivos subidos en un hilo propio, confirmando cada `lote` filas.
+
+    El archivo se copia a disco y se lee en streaming, y los errores se vuelcan a
+    un CSV según aparecen, así que la memoria no crece con el tamaño del archivo.
+    Un lote que falla en la base se revierte entero y sus filas cuentan como error.
+    El progreso vive en el proceso: con varios workers, consultar el mismo que lo recibió.
+    """
+
+    def __init__(self, engine, directorio: Optional[str] = None, lote: int = 1000,
+                 al_confirmar: Optional[Callable[[str, List[Any]], None]] = None, max_trabajos: int = 50):
+        self.engine = engine
+        self.directorio = directorio or os.path.join(tempfile.gettempdir(), "gimnasio_importaciones")
+        self.lote = lote
+        self.al_confirmar = al_confirmar
+        self.max_trabajos = max_trabajos
+        self.trabajos: Dict[str, TrabajoImportacion] = {}
+        # Un único importador a la vez: SQLite sólo admite un escritor
+        self._en_curso = threading.Lock()
+
+    def iniciar(self, tipo: str, archivo, nombre: str) -> TrabajoImportacion:
+        formato = formato_de(nombre)
+        if formato is None:
+            raise ValueError("El archivo debe ser .csv o .xlsx")
+        if formato == "xlsx":
+            try:
+                import openpyxl  # noqa: F401
+            except ImportError:
+                raise ValueError("Para importar XLSX instala openpyxl")
+        os.makedirs(self.directorio, exist_ok=True)
+        base = os.path.join(self.directorio, f"{datetime.now():%Y%m%d_%H%M%S}_{uuid.uuid4().hex[:6]}")
+        ruta = f"{base}.{formato}"
+        with open(ruta, "wb") as destino:
+            shutil.copyfileobj(archivo, destino, 1024 * 1024)
+        trabajo = TrabajoImportacion(tipo, nombre, formato, ruta, f"{base}_errores.csv")
+        self.trabajos[trabajo.id] = trabajo
+        for viejo in list(self.trabajos)[:-self.max_trabajos]:
+            self._descartar(self.trabajos.pop(viejo))
+        threading.Thread(target=self._ejecutar, args=(trabajo,), daemon=True,
+                         name=f"importacion-{trabajo.id}").start()
+        return trabajo
+
+    def _descartar(self, trabajo: TrabajoImportacion):
+        for ruta in (trabajo.ruta, trabajo.ruta_errores):
+            if os.path.exists(ruta):
+                os.remove(ruta)
+
+    def _ejecutar(self, trabajo: TrabajoImportacion):
+        with self._en_curso:
+            trabajo.estado = "procesando"
+            trabajo.inicio = time.time()
+            try:
+                trabajo.filas_estimadas = contar_filas(trabajo.ruta, trabajo.formato)
+                with open(trabajo.ruta_errores, "w", newline="", encoding="utf-8") as f:
+                    errores = csv.writer(f)
+                    errores.writerow(["fila", "error", "datos"])
+                    self._importar(trabajo, errores)
+                trabajo.estado = "completado"
+            except Exception as e:
+                logger.error(f" Importación {trabajo.id} interrumpida: {e}")
+                trabajo.estado = "error"
+                trabajo.error = str(e)
+            finally:
+                trabajo.fin = time.time()
+                if os.path.exists(trabajo.ruta):
+                    os.remove(trabajo.ruta)
+            logger.info(f" Importación {trabajo.id}: {trabajo.resumen()}")
+
+    def _importar(self, trabajo: TrabajoImportacion, errores):
+        planes: Dict[int, Tuple[float, int]] = {}
+        if trabajo.tipo == "pagos":
+            with self.engine.connect() as conn:
+                tabla_plan = PlanMembresia.__table__
+                for plan_id, precio, duracion in conn.execute(
+                        select(tabla_plan.c.id, tabla_plan.c.precio, tabla_plan.c.duracion_dias)):
+                    planes[plan_id] = (precio, duracion)
+
+        pendientes: List[Tuple[int, Dict[str, Any], Dict[str, Any]]] = []
+        for numero, fila in leer_filas(trabajo.ruta, trabajo.formato):
+            trabajo.filas_leidas += 1
+            if trabajo.tipo == "socios":
+                registro, error = validar_socio(fila)
+            else:
+                registro, error = validar_pago(fila, planes)
+            if error:
+                trabajo.errores += 1
+                errores.writerow([numero, error, _resumir(fila)])
+                continue
+            pendientes.append((numero, registro, fila))
+            if len(pendientes) >= self.lote:
+                self._confirmar_lote(trabajo, pendientes, errores)
+                pendientes = []
+        if pendientes:
+            self._confirmar_lote(trabajo, pendientes, errores)
+
+    def _confirmar_lote(self, trabajo: TrabajoImportacion, pendientes, errores):
+        try:
+            with self.engine.begin() as conn:
+                if trabajo.tipo == "socios":
+                    ids = self._guardar_socios(conn, trabajo, pendientes)
+                else:
+                    ids = self._guardar_pagos(conn, trabajo, pendientes, errores)
+        except Exception as e:
+            trabajo.errores += len(pendientes)
+            for numero, _, fila in pendientes:
+                errores.writerow([numero, f"lote revertido: {e}", _resumir(fila)])
+            return
+        trabajo.lotes += 1
+        if self.al_confirmar and ids:
+            self.al_confirmar(trabajo.tipo, ids)
+
+    def _guardar_socios(self, conn, trabajo, pendientes) -> List[Any]:
+        # Si un id se repite dentro del lote gana la última fila
+        por_id = {registro["id"]: registro for _, registro, _ in pendientes}
+        existentes = set(conn.execute(select(_socio.c.id).where(_socio.c.id.in_(list(por_id)))).scalars())
+        _insert_upsert(conn, _socio, list(por_id.values()), _columnas_del_archivo(pendientes))
+        nuevos = [i for i in por_id if i not in existentes]
+        cambios.registrar_cambios(conn, "socio", nuevos, "insert")
+        cambios.registrar_cambios(conn, "socio", existentes, "update")
+        trabajo.insertados += len(nuevos)
+        trabajo.actualizados += len(existentes)
+        return list(por_id)
+
+    def _guardar_pagos(self, conn, trabajo, pendientes, errores) -> List[Any]:
+        socios = {registro["socio_id"] for _, registro, _ in pendientes}
+        existentes = set(conn.execute(select(_socio.c.id).where(_socio.c.id.in_(list(socios)))).scalars())
+        con_id, sin_id = {}, []
+        for numero, registro, fila in pendientes:
+            if registro["socio_id"] not in existentes:
+                trabajo.errores += 1
+                errores.writerow([numero, f"socio {registro['socio_id']} no existe", _resumir(fila)])
+            elif "id" in registro:
+                con_id[registro["id"]] = registro
+            else:
+                sin_id.append(registro)
+
+        ids: List[Any] = []
+        if con_id:
+            previos = set(conn.execute(select(_pago.c.id).where(_pago.c.id.in_(list(con_id)))).scalars())
+            _insert_upsert(conn, _pago, list(con_id.values()), _columnas_del_archivo(pendientes))
+            nuevos = [i for i in con_id if i not in previos]
+            cambios.registrar_cambios(conn, "pago", nuevos, "insert")
+            cambios.registrar_cambios(conn, "pago", previos, "update")
+            trabajo.insertados += len(nuevos)
+            trabajo.actualizados += len(previos)
+            ids.extend(con_id)
+        if sin_id:
+            insertados = list(conn.execute(_pago.insert().returning(_pago.c.id), sin_id).scalars())
+            cambios.registrar_cambios(conn, "pago", insertados, "insert")
+            trabajo.insertados += len(insertados)
+            ids.extend(insertados)
+        return ids
+
+    def obtener(self, trabajo_id: str) -> Optional[TrabajoImportacion]:
+        return self.trabajos.get(trabajo_id)
+
+    def listar(self) -> List[Dict[str, Any]]:
+        return [t.resumen() for t in reversed(list(self.trabajos.values()))]
+
+
+def _columnas_del_archivo(pendientes) -> List[str]:
+    """Columnas que trae la cabecera del archivo: una reimportación parcial no borra las demás.
+
+    Los validadores completan lo que falta (email None, estado "pagado", ...) para
+    las altas, pero en un registro existente esos valores no vienen del archivo.
+    """
+    _, registro, fila = pendientes[0]
+    return [c for c in registro if c != "id" and c in fila]
+
+
+def _resumir(fila: Dict[str, Any]) -> str:
+    salida = io.StringIO()
+    csv.writer(salida).writerow(_texto(v) for v in fila.values())
+    return salida.getvalue().strip()
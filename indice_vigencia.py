@@ -0,0 +1,142 @@
+# indice_vigencia.py - Vencimiento de cada socio en memoria para validar el acceso sin ir a la base
+import threading
+import time
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, Optional
+
+from sqlalchemy import func, select
+
+from modelos import Cambio, Socio
+
+FECHA_INVALIDA = -1
+
+_socio = Socio.__table__
+_cambio = Cambio.__table__
+
+
+class IndiceVigencia:
+    """socio_id → vencimiento como ordinal de fecha (date.toordinal()).
+
+    Se carga entera al arrancar y se pone al día leyendo la tabla `cambio`
+    como mucho cada `intervalo_verificacion` segundos, así que lo escrito por
+    otro worker (o por una importación) tarda a lo sumo eso en verse. Las
+    escrituras del propio worker llaman a `actualizar` y se ven al instante.
+    Los ordinales de una misma fecha son el mismo objeto int: con miles de
+    socios venciendo el mismo día, cada entrada cuesta sólo la clave y el hueco.
+    """
+
+    def __init__(self, engine, intervalo_verificacion: float = 1.0, lote: int = 50_000):
+        self.engine = engine
+        self.intervalo_verificacion = intervalo_verificacion
+        self.lote = lote
+        self._vencimientos: Dict[str, int] = {}
+        self._ordinales: Dict[str, int] = {}
+        self._cursor = 0
+        self._verificado = 0.0
+        self._lock = threading.Lock()
+        self.cargado: Optional[str] = None
+        self.duracion_carga_s: Optional[float] = None
+        self.consultas = 0
+        self.sincronizaciones = 0
+        self.socios_sincronizados = 0
+
+    def _ordinal(self, vencimiento: Optional[str]) -> int:
+        ordinal = self._ordinales.get(vencimiento)
+        if ordinal is None:
+            try:
+                ordinal = datetime.strptime(vencimiento, "%Y-%m-%d").date().toordinal()
+            except (TypeError, ValueError):
+                ordinal = FECHA_INVALIDA
+            self._ordinales[vencimiento] = ordinal
+        return ordinal
+
+    def cargar(self):
+        """Lee todos los socios por lotes. El cursor se toma antes: lo que cambie durante la carga se repite al sincronizar."""
+        inicio = time.perf_counter()
+        vencimientos: Dict[str, int] = {}
+        with self.engine.connect() as conn:
+            cursor = conn.execute(select(func.max(_cambio.c.seq))).scalar() or 0
+            resultado = conn.execution_options(yield_per=self.lote).execute(select(_socio.c.id, _socio.c.vencimiento))
+            for socio_id, vencimiento in resultado:
+                vencimientos[socio_id] = self._ordinal(vencimiento)
+        with self._lock:
+            self._vencimientos = vencimientos
+            self._cursor = cursor
+            self._verificado = time.monotonic()
+        self.cargado = datetime.now().isoformat(timespec="seconds")
+        self.duracion_carga_s = round(time.perf_counter() - inicio, 3)
+
+    def actualizar(self, socio_id: str, vencimiento: Optional[str]):
+        """Tras un commit local: alta de socio, pago o renovación"""
+        self._vencimientos[socio_id] = self._ordinal(vencimiento)
+
+    def recargar(self, ids: Iterable[str]):
+        """Vuelve a leer de la base el vencimiento de `ids` (los que ya no existen se quitan)"""
+        ids = list(ids)
+        for i in range(0, len(ids), 500):
+            parte = ids[i:i + 500]
+            with self.engine.connect() as conn:
+                actuales = dict(conn.execute(select(_socio.c.id, _socio.c.vencimiento)
+                                             .where(_socio.c.id.in_(parte))).all())
+            for socio_id in parte:
+                if socio_id in actuales:
+                    self._vencimientos[socio_id] = self._ordinal(actuales[socio_id])
+                else:
+                    self._vencimientos.pop(socio_id, None)
+        self.socios_sincronizados += len(ids)
+
+    def _sincronizar(self):
+        if time.monotonic() - self._verificado < self.intervalo_verificacion:
+            return
+        # Un solo hilo se pone al día; el resto sigue respondiendo con lo que hay
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            with self.engine.connect() as conn:
+                filas = conn.execute(select(_cambio.c.seq, _cambio.c.registro_id)
+                                     .where(_cambio.c.seq > self._cursor, _cambio.c.tabla == "socio")
+                                     .order_by(_cambio.c.seq)).all()
+            if filas:
+                self.recargar({registro_id for _, registro_id in filas})
+                self._cursor = filas[-1].seq
+            self.sincronizaciones += 1
+            self._verificado = time.monotonic()
+        finally:
+            self._lock.release()
+
+    def validar(self, socio_id: str, hoy: Optional[date] = None) -> Dict[str, Any]:
+        """Estado de acceso del socio: vigente, vencido, fecha_invalida o no_encontrado"""
+        self._sincronizar()
+        self.consultas += 1
+        ordinal = self._vencimientos.get(socio_id)
+        if ordinal is None:
+            return {"socio_id": socio_id, "acceso": False, "estado": "no_encontrado", "vencimiento": None}
+        if ordinal == FECHA_INVALIDA:
+            return {"socio_id": socio_id, "acceso": False, "estado": "fecha_invalida", "vencimiento": None}
+        dias = ordinal - (hoy or date.today()).toordinal()
+        return {
+            "socio_id": socio_id,
+            "acceso": dias >= 0,
+            "estado": "vigente" if dias >= 0 else "vencido",
+            "vencimiento": date.fromordinal(ordinal).isoformat(),
+            "dias_restantes": dias,
+        }
+
+    def vigente(self, socio_id: str, hoy_ordinal: Optional[int] = None) -> bool:
+        """Sólo el booleano, para el torniquete"""
+        self._sincronizar()
+        self.consultas += 1
+        return self._vencimientos.get(socio_id, FECHA_INVALIDA) >= (hoy_ordinal or date.today().toordinal())
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "socios": len(self._vencimientos),
+            "fechas_distintas": len(self._ordinales),
+            "cursor": self._cursor,
+            "cargado": self.cargado,
+            "duracion_carga_s": self.duracion_carga_s,
+            "intervalo_verificacion_s": self.intervalo_verificacion,
+            "consultas": self.consultas,
+            "sincronizaciones": self.sincronizaciones,
+            "socios_sincronizados": self.socios_sincronizados,
+        }
@@ -0,0 +1,222 @@
+# instantaneas.py - Instantáneas Parquet de las tablas y resúmenes para el dashboard sin API (manifiesto + versión)
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+from sqlalchemy import func, select
+from sqlmodel import Session
+
+import consultas
+import migraciones
+import series_entradas
+from modelos import Cambio, ResumenEntradasSocio
+from ocupacion_horaria import MapaCalor
+from programador import TareaPeriodica
+
+logger = logging.getLogger(__name__)
+
+ACTUAL = "actual.json"
+MANIFIESTO = "manifiesto.json"
+_LOTE = 50_000
+_TIPOS_ARROW = {str: pa.string(), int: pa.int64(), float: pa.float64(), bool: pa.bool_()}
+
+
+def _esquema(tabla) -> pa.Schema:
+    campos = []
+    for columna in tabla.columns:
+        try:
+            tipo = _TIPOS_ARROW.get(columna.type.python_type, pa.string())
+        except NotImplementedError:
+            tipo = pa.string()
+        campos.append(pa.field(columna.name, tipo))
+    return pa.schema(campos)
+
+
+def _a_arrow(df: pd.DataFrame, esquema: pa.Schema) -> pa.Table:
+    for campo in esquema:
+        # SQLite no impone tipos: un número en una columna de texto se guarda como texto
+        if campo.type == pa.string():
+            df[campo.name] = df[campo.name].where(df[campo.name].isna(), df[campo.name].astype(str))
+    return pa.Table.from_pandas(df, schema=esquema, preserve_index=False)
+
+
+def _escribir_tabla(conn, tabla, ruta: str) -> int:
+    """Copia la tabla por lotes: la memoria no crece con el tamaño de la tabla"""
+    esquema = _esquema(tabla)
+    filas = 0
+    with pq.ParquetWriter(ruta, esquema) as escritor:
+        for lote in pd.read_sql(select(tabla), conn, chunksize=_LOTE):
+            escritor.write_table(_a_arrow(lote, esquema))
+            filas += len(lote)
+    return filas
+
+
+def _escribir_filas(filas: List[Dict[str, Any]], esquema: pa.Schema, ruta: str) -> int:
+    pq.write_table(pa.Table.from_pylist(filas, schema=esquema), ruta)
+    return len(filas)
+
+
+def _entradas_por_hora(conn) -> List[Dict[str, Any]]:
+    """Todo el histórico (tabla activa + resúmenes del archivo) por fecha y hora"""
+    hoy = datetime.now().date()
+    desde = series_entradas.primera_fecha(conn) or hoy
+    conteos = series_entradas.conteos_por_hora(conn, desde, max(desde, hoy))
+    return [{"fecha": dia.isoformat(), "hora": hora, "total": total}
+            for (dia, hora), total in sorted(conteos.items())]
+
+
+def _mapa_calor(conn) -> List[Dict[str, Any]]:
+    """Celdas no vacías de las matrices del mapa de calor; clase_id nulo = todas las clases"""
+    mapa = MapaCalor()
+    with Session(bind=conn) as session:
+        mapa.reconstruir(session)
+    filas = []
+    for tipo, clase_id, valores in (
+        [("entradas", None, mapa.matriz("entradas")["valores"]), ("reservas", None, mapa.matriz("reservas")["valores"])]
+        + [("reservas", clase_id, mapa.matriz(clase_id=clase_id)["valores"]) for clase_id in mapa.clases()]
+    ):
+        filas.extend({"tipo": tipo, "clase_id": clase_id, "dia": dia, "hora": hora, "valor": valor}
+                     for dia, fila in enumerate(valores) for hora, valor in enumerate(fila) if valor)
+    return filas
+
+
+ESQUEMA_ENTRADAS_POR_HORA = pa.schema([("fecha", pa.string()), ("hora", pa.int64()), ("total", pa.int64())])
+ESQUEMA_MAPA_CALOR = pa.schema([("tipo", pa.string()), ("clase_id", pa.int64()), ("dia", pa.int64()),
+                                ("hora", pa.int64()), ("valor", pa.int64())])
+
+
+def exportar(engine, directorio: str) -> Dict[str, Any]:
+    """Escribe una instantánea nueva en `directorio/<version>/` y la publica en `directorio/actual.json`.
+
+    Todas las tablas se leen en una misma transacción, así que la instantánea es
+    coherente. En SQLite hace falta un BEGIN explícito: pysqlite no abre transacción
+    para los SELECT y cada lectura vería la base tal como está en ese momento. La
+    publicación es un os.replace del puntero: los lectores ven la versión
+    anterior entera o la nueva entera, nunca una a medio escribir.
+    """
+    inicio = time.perf_counter()
+    version = datetime.now().strftime("%Y%m%dT%H%M%S%f")
+    destino = os.path.join(directorio, version)
+    os.makedirs(destino, exist_ok=True)
+    conjuntos: Dict[str, Dict[str, Any]] = {}
+    try:
+        with engine.connect() as conn, conn.begin():
+            if engine.dialect.name == "sqlite":
+                conn.exec_driver_sql("BEGIN")
+            cursor = conn.execute(select(func.max(Cambio.seq))).scalar() or 0
+            tablas = dict(consultas.TABLAS, entradas_por_socio=ResumenEntradasSocio.__table__)
+            for nombre, tabla in tablas.items():
+                filas = _escribir_tabla(conn, tabla, os.path.join(destino, f"{nombre}.parquet"))
+                conjuntos[nombre] = {"archivo": f"{nombre}.parquet", "filas": filas}
+            for nombre, filas, esquema in (
+                ("entradas_por_hora", _entradas_por_hora(conn), ESQUEMA_ENTRADAS_POR_HORA),
+                ("mapa_calor", _mapa_calor(conn), ESQUEMA_MAPA_CALOR),
+            ):
+                conjuntos[nombre] = {"archivo": f"{nombre}.parquet",
+                                     "filas": _escribir_filas(filas, esquema, os.path.join(destino, f"{nombre}.parquet"))}
+    except Exception:
+        shutil.rmtree(destino, ignore_errors=True)
+        raise
+    for info in conjuntos.values():
+        info["bytes"] = os.path.getsize(os.path.join(destino, info["archivo"]))
+
+    manifiesto = {
+        "version": version,
+        "generado": datetime.now().isoformat(timespec="seconds"),
+        "esquema": migraciones.estado(engine)["version"],
+        "cursor_cambios": cursor,
+        "conjuntos": conjuntos,
+        "duracion_s": round(time.perf_counter() - inicio, 3),
+    }
+    with open(os.path.join(destino, MANIFIESTO), "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2)
+    temporal = os.path.join(directorio, ACTUAL + ".tmp")
+    with open(temporal, "w", encoding="utf-8") as f:
+        json.dump(manifiesto, f, indent=2)
+    os.replace(temporal, os.path.join(directorio, ACTUAL))
+    return manifiesto
+
+
+def versiones(directorio: str) -> List[str]:
+    if not os.path.isdir(directorio):
+        return []
+    return sorted(d for d in os.listdir(directorio) if os.path.isfile(os.path.join(directorio, d, MANIFIESTO)))
+
+
+def podar(directorio: str, retener: int) -> List[str]:
+    """Borra las versiones más viejas; nunca la publicada"""
+    actual = (manifiesto(directorio) or {}).get("version")
+    borradas = []
+    for version in versiones(directorio)[:-max(1, retener)]:
+        if version != actual:
+            shutil.rmtree(os.path.join(directorio, version), ignore_errors=True)
+            borradas.append(version)
+    return borradas
+
+
+def manifiesto(directorio: str) -> Optional[Dict[str, Any]]:
+    """Manifiesto de la versión publicada, o None si todavía no hay ninguna"""
+    try:
+        with open(os.path.join(directorio, ACTUAL), encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def leer(directorio: str, version: str, conjunto: str, columnas: Optional[List[str]] = None) -> pa.Table:
+    """Lee un conjunto mapeando el archivo en memoria; sólo se decodifican `columnas`"""
+    ruta = os.path.join(directorio, version, f"{conjunto}.parquet")
+    return pq.read_table(ruta, columns=list(columnas) if columnas else None, memory_map=True)
+
+
+class ExportadorInstantaneas:
+    """Tarea periódica que publica una instantánea nueva. Sólo la ejecuta el worker líder."""
+
+    NOMBRE_BLOQUEO = "instantaneas"
+
+    def __init__(self, engine, directorio: Optional[str], intervalo_horas: float = 1.0, retener: int = 3):
+        self.engine = engine
+        self.directorio = directorio
+        self.retener = retener
+        # Sin directorio la tarea no arranca (TareaPeriodica ignora intervalos <= 0)
+        self.intervalo_horas = intervalo_horas if directorio else 0
+        self.tarea = TareaPeriodica(engine, self.NOMBRE_BLOQUEO, self.ejecutar_ahora, self.intervalo_horas)
+        self.ultima_ejecucion: Optional[Dict[str, Any]] = None
+        self._en_curso = threading.Lock()
+
+    def ejecutar_ahora(self) -> Dict[str, Any]:
+        with self._en_curso:
+            return self._exportar()
+
+    def _exportar(self) -> Dict[str, Any]:
+        resumen: Dict[str, Any] = {"inicio": datetime.now().isoformat()}
+        try:
+            publicado = exportar(self.engine, self.directorio)
+            resumen.update(estado="ok", version=publicado["version"], duracion_s=publicado["duracion_s"],
+                           filas={n: c["filas"] for n, c in publicado["conjuntos"].items()},
+                           podadas=podar(self.directorio, self.retener))
+        except Exception as e:
+            logger.error(f" Error exportando la instantánea: {e}")
+            resumen.update({"estado": "error", "error": str(e)})
+        self.ultima_ejecucion = resumen
+        logger.info(f" Instantánea del dashboard: {resumen}")
+        return resumen
+
+    def estado(self) -> Dict[str, Any]:
+        return {
+            "activo": self.tarea.activa,
+            "directorio": self.directorio,
+            "intervalo_horas": self.intervalo_horas,
+            "retener": self.retener,
+            "versiones": versiones(self.directorio) if self.directorio else [],
+            "publicada": manifiesto(self.directorio) if self.directorio else None,
+            "ultima_ejecucion": self.ultima_ejecucion,
+        }
@@ -1,14 +1,35 @@
 ﻿# main_completo.py - SISTEMA COMPLETO RESTAURADO
-from fastapi import FastAPI, Depends, HTTPException, Request
+from fastapi import FastAPI, Depends, File, HTTPException, Request, UploadFile, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import Response
-from sqlmodel import SQLModel, Field, create_engine, Session, select
+from fastapi.responses import FileResponse, Response, StreamingResponse
+from sqlmodel import SQLModel, Field, create_engine, Session, select, func
 from typing import Optional, List
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 import os
 import uvicorn
 import logging
 import json
+import asyncio
+import threading
+
+from cache_socios import CacheSocios
+from eventos import BusEventos, FIN, generar_sse
+from programador import ProgramadorRecordatorios, TareaPeriodica, adquirir_bloqueo, liberar_bloqueo
+from ocupacion_horaria import MapaCalor
+from ocupacion_actual import OcupacionActual
+import archivo_entradas
+import reportes_ingresos
+import series_entradas
+from importacion import Importador, TIPOS as TIPOS_IMPORTACION
+import catalogo
+import migraciones
+from catalogo import CatalogoReferencia
+from estadisticas_bd import EstadisticasBD
+from indice_vigencia import IndiceVigencia
+from archivo_entradas import ArchivadorEntradas
+from mantenimiento_db import MantenimientoDB, ruta_sqlite
+from admision import ControlAdmision, ReglaAdmision
+from contextlib import asynccontextmanager
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -18,53 +39,14 @@ DATABASE_URL = os.environ.get("DATABASE_URL", "sqlite:///./temp.db")
 engine = create_engine(DATABASE_URL, echo=True)
 
 # === MODELOS COMPLETOS ===
-class Socio(SQLModel, table=True):
-    id: str = Field(primary_key=True)
-    nombre: str
-    vencimiento: str
-    email: Optional[str] = None
-    telefono: Optional[str] = None
-
-class Entrada(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    socio_id: str = Field(foreign_key="socio.id")
-    nombre_socio: str
-    fecha_hora: str
-
-class Clase(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    nombre: str
-    dia_semana: str
-    hora_inicio: str
-    duracion_min: int = 60
-    capacidad_max: int = 20
-    instructor: str = Field(default="Instructor Por Definir")
-
-class Reserva(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    socio_id: str = Field(foreign_key="socio.id")
-    clase_id: int = Field(foreign_key="clase.id")
-    fecha_reserva: str
-    estado: str = "confirmada"
-
-class PlanMembresia(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    nombre: str = Field(index=True)
-    precio: float
-    duracion_dias: int
-    descripcion: str
-    activo: bool = Field(default=True)
-
-class Pago(SQLModel, table=True):
-    id: Optional[int] = Field(default=None, primary_key=True)
-    socio_id: str = Field(foreign_key="socio.id")
-    plan_id: int = Field(foreign_key="planmembresia.id")
-    monto: float
-    fecha_pago: str = Field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d"))
-    fecha_vencimiento: str
-    estado: str = Field(default="pendiente")
-    metodo_pago: Optional[str] = None
-    referencia: Optional[str] = None
+from modelos import Socio, Entrada, Salida, Clase, Reserva, PlanMembresia, Pago, Cambio
+import cambios
+import consultas
+
+# Registro de cambios para la sincronización incremental (/cambios)
+cambios.registrar_seguimiento(Socio, Entrada, Reserva, Pago)
+# ocupacion_actual lee entradas y salidas con id > cursor: ids en orden de commit
+cambios.ordenar_inserciones(Entrada, Salida)
 
 # Crear tablas
 SQLModel.metadata.create_all(engine)
@@ -73,10 +55,199 @@ def get_session():
     with Session(engine) as session:
         yield session
 
+def columnas_pedidas(tabla, campos: Optional[str]):
+    """`campos=id,nombre` → esas columnas de la tabla (None = todas); 400 si alguna no existe"""
+    try:
+        return consultas.columnas_pedidas(tabla, campos)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+def proyectar(objetos, columnas):
+    """Proyección en memoria para listados servidos desde cache (planes, clases)"""
+    if columnas is None:
+        return objetos
+    return [{c.name: getattr(o, c.name) for c in columnas} for o in objetos]
+
+# Cache de socios por id (check-in, recordatorios, consultas individuales)
+cache_socios = CacheSocios(
+    max_elementos=int(os.environ.get("CACHE_SOCIOS_MAX", 5000)),
+    ttl_segundos=float(os.environ.get("CACHE_SOCIOS_TTL", 300)),
+    engine=engine,
+    intervalo_verificacion=float(os.environ.get("CACHE_SOCIOS_VERIFICACION_S", 1.0)),
+)
+
+def buscar_socio(session: Session, id_socio: str) -> Optional[Socio]:
+    """Busca un socio por id pasando por la cache LRU"""
+    def cargar(clave):
+        socio = session.exec(select(Socio).where(Socio.id == clave)).first()
+        if socio is not None:
+            # Se desvincula de la sesión para poder reutilizarlo entre peticiones
+            session.expunge(socio)
+        return socio
+    return cache_socios.obtener(id_socio, cargar)
+
+# Bus de eventos en vivo (entradas y reservas)
+bus_eventos = BusEventos(max_pendientes=int(os.environ.get("EVENTOS_MAX_PENDIENTES", 100)))
+
+# Recordatorios de vencimiento programados: envían WhatsApp reales, así que están
+# desactivados salvo que se configure RECORDATORIOS_HORAS="09:00,18:00"
+programador_recordatorios = ProgramadorRecordatorios(
+    engine,
+    horas=os.environ.get("RECORDATORIOS_HORAS", "").split(","),
+    dias=int(os.environ.get("RECORDATORIOS_DIAS", 3)),
+)
+
+# Mapa de calor día × hora: suma las altas locales y se reconstruye ante cancelaciones,
+# clases editadas o cada MAPA_CALOR_RECONSTRUIR_S (altas de otros workers)
+mapa_calor = MapaCalor(
+    engine,
+    intervalo_verificacion=float(os.environ.get("MAPA_CALOR_VERIFICACION_S", 1.0)),
+    intervalo_reconstruccion=float(os.environ.get("MAPA_CALOR_RECONSTRUIR_S", 60)),
+)
+
+def reconstruir_mapa_calor():
+    with Session(engine) as session:
+        mapa_calor.reconstruir(session)
+
+# Personas dentro ahora por sede; la foto se guarda en `ocupacionsede` cada OCUPACION_PERSISTIR_S
+ocupacion_actual = OcupacionActual(
+    engine,
+    estancia_max_horas=float(os.environ.get("OCUPACION_ESTANCIA_MAX_HORAS", 4)),
+    intervalo_verificacion=float(os.environ.get("OCUPACION_VERIFICACION_S", 1.0)),
+)
+tarea_ocupacion = TareaPeriodica(
+    engine, "ocupacion", ocupacion_actual.persistir,
+    intervalo_horas=float(os.environ.get("OCUPACION_PERSISTIR_S", 30)) / 3600,
+)
+
+# Retención del registro de cambios: los clientes con un cursor más viejo reciben 410 y descargan todo
+CAMBIOS_RETENER_DIAS = int(os.environ.get("CAMBIOS_RETENER_DIAS", 30))
+
+def podar_cambios():
+    resumen = cambios.podar(engine, CAMBIOS_RETENER_DIAS)
+    logger.info(f" Poda del registro de cambios: {resumen}")
+    return resumen
+
+tarea_poda_cambios = TareaPeriodica(
+    engine, "poda_cambios", podar_cambios,
+    intervalo_horas=float(os.environ.get("CAMBIOS_PODA_INTERVALO_HORAS", 24)),
+)
+
+# Archivo mensual de entradas: opcional (ARCHIVO_MESES_ACTIVOS=3 deja 3 meses en la tabla
+# caliente y mueve el resto); sin configurar no se archiva nada
+archivador_entradas = ArchivadorEntradas(
+    engine,
+    meses_activos=int(os.environ.get("ARCHIVO_MESES_ACTIVOS", 0)),
+    intervalo_horas=float(os.environ.get("ARCHIVO_INTERVALO_HORAS", 24)),
+)
+
+# Instantáneas Parquet para el dashboard sin API (sólo si INSTANTANEA_DIRECTORIO está definido).
+# instantaneas importa pandas y pyarrow: sin directorio la API no los carga.
+INSTANTANEA_DIRECTORIO = os.environ.get("INSTANTANEA_DIRECTORIO") or None
+exportador_instantaneas = None
+if INSTANTANEA_DIRECTORIO:
+    from instantaneas import ExportadorInstantaneas
+    exportador_instantaneas = ExportadorInstantaneas(
+        engine,
+        directorio=INSTANTANEA_DIRECTORIO,
+        intervalo_horas=float(os.environ.get("INSTANTANEA_INTERVALO_HORAS", 1)),
+        retener=int(os.environ.get("INSTANTANEA_RETENER", 3)),
+    )
+
+# Backups en línea + VACUUM incremental + ANALYZE (MANTENIMIENTO_BDS añade otras bases SQLite)
+mantenimiento_db = MantenimientoDB(
+    engine,
+    rutas=[ruta_sqlite(engine)] + [r.strip() for r in os.environ.get("MANTENIMIENTO_BDS", "").split(",")],
+    directorio_backups=os.environ.get("MANTENIMIENTO_DIR_BACKUPS", "./backups"),
+    intervalo_horas=float(os.environ.get("MANTENIMIENTO_INTERVALO_HORAS", 24)),
+    retener=int(os.environ.get("MANTENIMIENTO_RETENER", 7)),
+    convertir_auto_vacuum=os.environ.get("MANTENIMIENTO_CONVERTIR_AUTO_VACUUM", "0") == "1",
+)
+
+catalogo_referencia = CatalogoReferencia(
+    engine, intervalo_verificacion=float(os.environ.get("CATALOGO_VERIFICACION_S", 2.0))
+)
+
+estadisticas_bd = EstadisticasBD(engine, ttl_segundos=float(os.environ.get("STATS_TTL_S", 30)))
+
+# Vencimientos de todos los socios en memoria para /acceso/validar (torniquete)
+indice_vigencia = IndiceVigencia(
+    engine, intervalo_verificacion=float(os.environ.get("VIGENCIA_VERIFICACION_S", 1.0))
+)
+
+def al_confirmar_importacion(tipo: str, ids: list):
+    if tipo == "socios":
+        cache_socios.invalidar(*ids)
+        indice_vigencia.recargar(ids)
+    else:
+        reportes_ingresos.invalidar_cache()
+
+importador = Importador(
+    engine,
+    directorio=os.environ.get("IMPORTACION_DIRECTORIO"),
+    lote=int(os.environ.get("IMPORTACION_LOTE", 1000)),
+    al_confirmar=al_confirmar_importacion,
+)
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Columnas y reconstrucciones antes de servir; los índices grandes siguen en segundo plano
+    pendientes = await asyncio.to_thread(migraciones.migrar, engine, True)
+    if pendientes:
+        threading.Thread(target=migraciones.migrar, args=(engine,), daemon=True, name="migraciones").start()
+    await asyncio.to_thread(archivo_entradas.preparar, engine)
+    await asyncio.to_thread(indice_vigencia.cargar)
+    await asyncio.to_thread(ocupacion_actual.cargar)
+    estadisticas_bd.refrescar_tamanos()
+    await asyncio.to_thread(reconstruir_mapa_calor)
+    programador_recordatorios.iniciar()
+    archivador_entradas.tarea.iniciar()
+    if exportador_instantaneas:
+        exportador_instantaneas.tarea.iniciar()
+    mantenimiento_db.tarea.iniciar()
+    tarea_ocupacion.iniciar()
+    tarea_poda_cambios.iniciar()
+    yield
+    await tarea_poda_cambios.detener()
+    await tarea_ocupacion.detener()
+    await mantenimiento_db.tarea.detener()
+    if exportador_instantaneas:
+        await exportador_instantaneas.tarea.detener()
+    await archivador_entradas.tarea.detener()
+    await programador_recordatorios.detener()
+
 app = FastAPI(
     title="Gimnasio Inteligente API - RESTAURADO",
     description="Sistema completo restaurado después de daño por Qwen",
-    version="3.0.0"
+    version="3.0.0",
+    lifespan=lifespan
+)
+
+# Control de admisión para endpoints caros; health, check-in y escrituras puntuales no tienen regla
+REGLAS_ADMISION = [
+    ReglaAdmision("/socios/", max_concurrencia=2, max_cola=8, espera_max_s=2.0, tasa_por_s=2.0, rafaga=10),
+    ReglaAdmision("/entradas/", max_concurrencia=2, max_cola=8, espera_max_s=2.0, tasa_por_s=2.0, rafaga=10),
+    ReglaAdmision("/entradas/ultimas", max_concurrencia=2, max_cola=8, espera_max_s=2.0, tasa_por_s=2.0, rafaga=10),
+    ReglaAdmision("/reservas/", max_concurrencia=2, max_cola=8, espera_max_s=2.0, tasa_por_s=2.0, rafaga=10),
+    ReglaAdmision("/reservas/detalle", max_concurrencia=4, max_cola=8, espera_max_s=2.0, tasa_por_s=5.0, rafaga=10),
+    ReglaAdmision("/pagos/", max_concurrencia=2, max_cola=8, espera_max_s=2.0, tasa_por_s=2.0, rafaga=10),
+    ReglaAdmision("/notificaciones/*", max_concurrencia=2, max_cola=4, espera_max_s=2.0, tasa_por_s=0.5, rafaga=3),
+    # Un render del dashboard pide tres reportes seguidos (dos series y el mapa de calor) y todas las
+    # sesiones de Streamlit comparten clave: la ráfaga alcanza para un par de renders simultáneos
+    ReglaAdmision("/reportes/*", max_concurrencia=2, max_cola=4, espera_max_s=5.0, tasa_por_s=1.0, rafaga=8),
+    ReglaAdmision("/cambios", max_concurrencia=4, max_cola=8, espera_max_s=2.0, tasa_por_s=5.0, rafaga=10),
+    ReglaAdmision("/stats", max_concurrencia=2, max_cola=8, espera_max_s=5.0, tasa_por_s=2.0, rafaga=10),
+    ReglaAdmision("/create-tables", max_concurrencia=1, max_cola=0, tasa_por_s=1 / 60, rafaga=1),
+    ReglaAdmision("/admin/*", metodos=("POST",), max_concurrencia=1, max_cola=0, tasa_por_s=1 / 60, rafaga=2),
+    ReglaAdmision("/importar/*", metodos=("POST",), max_concurrencia=1, max_cola=2, espera_max_s=30.0, tasa_por_s=0.1, rafaga=3),
+]
+# ADMISION_CLAVES: claves X-API-Key con cubo propio (p. ej. la del dashboard); el resto se limita por IP.
+# ADMISION_PROXIES_CONFIABLES: proxies delante de la API (1 en Render); con 0 se ignora X-Forwarded-For.
+app.add_middleware(
+    ControlAdmision,
+    reglas=REGLAS_ADMISION,
+    claves=[c.strip() for c in os.environ.get("ADMISION_CLAVES", "").split(",")],
+    proxies_confiables=int(os.environ.get("ADMISION_PROXIES_CONFIABLES", 0)),
 )
 
 app.add_middleware(
@@ -92,6 +263,10 @@ app.add_middleware(
 def home():
     return {"mensaje": " Sistema completo RESTAURADO y funcionando", "status": "active"}
 
+@app.get("/health")
+def health_check():
+    return {"status": "running", "timestamp": datetime.now().isoformat()}
+
 @app.get("/debug-routes")
 def debug_routes():
     routes = []
@@ -103,6 +278,12 @@ def debug_routes():
         })
     return {"routes": routes}
 
+@app.get("/stats")
+def estadisticas(exacto: bool = False):
+    """Filas, índices, bytes y última escritura por tabla, con agregados y estadísticas
+    de páginas cacheadas. `exacto=true` fuerza COUNT(*) también en las tablas grandes."""
+    return estadisticas_bd.obtener(exacto)
+
 @app.get("/create-tables")
 def create_tables():
     try:
@@ -114,14 +295,18 @@ def create_tables():
 # === SOCIOS - COMPLETO ===
 @app.get("/socios/{id_socio}")
 def obtener_socio(id_socio: str, session: Session = Depends(get_session)):
-    socio = session.exec(select(Socio).where(Socio.id == id_socio)).first()
+    socio = buscar_socio(session, id_socio)
     if socio:
         return socio
     raise HTTPException(status_code=404, detail="Socio no encontrado")
 
 @app.get("/socios/")
-def listar_socios(session: Session = Depends(get_session)):
+def listar_socios(campos: Optional[str] = None, session: Session = Depends(get_session)):
+    """campos=id,nombre devuelve sólo esas columnas"""
+    columnas = columnas_pedidas(Socio.__table__, campos)
     try:
+        if columnas:
+            return session.execute(select(*columnas)).mappings().all()
         socios = session.exec(select(Socio)).all()
         return socios
     except Exception as e:
@@ -135,8 +320,216 @@ def crear_socio(socio: Socio, session: Session = Depends(get_session)):
     session.add(socio)
     session.commit()
     session.refresh(socio)
+    cache_socios.invalidar(socio.id)
+    indice_vigencia.actualizar(socio.id, socio.vencimiento)
     return socio
 
+# === ENTRADAS (CHECK-IN) ===
+@app.get("/acceso/validar")
+def validar_acceso(socio_id: str):
+    """Respuesta del torniquete desde memoria, sin consultar la base"""
+    return indice_vigencia.validar(socio_id)
+
+@app.post("/entradas/")
+def registrar_entrada(socio_id: str, sede: str = "principal", session: Session = Depends(get_session)):
+    socio = buscar_socio(session, socio_id)
+    if not socio:
+        raise HTTPException(status_code=404, detail="Socio no encontrado")
+    try:
+        vencimiento = datetime.strptime(socio.vencimiento, "%Y-%m-%d").date()
+    except ValueError:
+        raise HTTPException(status_code=422, detail="Fecha de vencimiento inválida")
+    if vencimiento < datetime.now().date():
+        raise HTTPException(status_code=403, detail="Membresía vencida")
+
+    entrada = Entrada(
+        socio_id=socio.id,
+        nombre_socio=socio.nombre,
+        fecha_hora=datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        sede=sede
+    )
+    session.add(entrada)
+    session.commit()
+    session.refresh(entrada)
+    mapa_calor.registrar_entrada(entrada.fecha_hora)
+    ocupacion_actual.registrar_entrada(entrada.socio_id, entrada.sede, entrada.fecha_hora)
+    bus_eventos.publicar("entrada", entrada.model_dump())
+    return entrada
+
+@app.post("/salidas/")
+def registrar_salida(socio_id: str, sede: str = "principal", session: Session = Depends(get_session)):
+    socio = buscar_socio(session, socio_id)
+    if not socio:
+        raise HTTPException(status_code=404, detail="Socio no encontrado")
+    salida = Salida(socio_id=socio.id, sede=sede, fecha_hora=datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+    session.add(salida)
+    session.commit()
+    session.refresh(salida)
+    ocupacion_actual.registrar_salida(salida.socio_id, salida.sede, salida.fecha_hora)
+    bus_eventos.publicar("salida", salida.model_dump())
+    return salida
+
+@app.get("/ocupacion/actual")
+def ocupacion_ahora(sede: Optional[str] = None):
+    """Personas dentro por sede, desde memoria (pensado para consultarlo cada segundo)"""
+    return ocupacion_actual.ocupacion(sede)
+
+@app.get("/entradas/")
+def listar_entradas(historico: bool = False, campos: Optional[str] = None, session: Session = Depends(get_session)):
+    """Entradas de los meses activos; historico=true incluye los meses archivados"""
+    tabla = archivo_entradas.tabla_historica() if historico else Entrada.__table__
+    columnas = columnas_pedidas(tabla, campos)
+    if columnas:
+        return session.execute(select(*columnas)).mappings().all()
+    if historico:
+        return session.execute(select(tabla)).mappings().all()
+    return session.exec(select(Entrada)).all()
+
+@app.get("/entradas/ultimas")
+def ultimas_entradas(session: Session = Depends(get_session)):
+    """Última entrada de cada socio en todo el histórico, incluidos los meses archivados"""
+    return session.execute(consultas.ultimas_entradas()).mappings().all()
+
+# === RESERVAS ===
+@app.post("/reservas/")
+def crear_reserva(socio_id: str, clase_id: int, session: Session = Depends(get_session)):
+    if not buscar_socio(session, socio_id):
+        raise HTTPException(status_code=404, detail="Socio no encontrado")
+    clase = catalogo_referencia.clase(clase_id)
+    if not clase:
+        raise HTTPException(status_code=404, detail="Clase no encontrada")
+    # Cupos de la próxima sesión: reservas confirmadas desde el día de la última
+    # (fecha_reserva no guarda hora, así que el mismo día cuenta por prudencia)
+    desde = catalogo.ultima_sesion(clase)
+    if desde and clase.capacidad_max:
+        ocupados = session.exec(select(func.count()).select_from(Reserva).where(
+            Reserva.clase_id == clase_id, Reserva.estado == "confirmada", Reserva.fecha_reserva >= desde)).one()
+        if ocupados >= clase.capacidad_max:
+            raise HTTPException(status_code=409, detail="Clase completa")
+
+    reserva = Reserva(
+        socio_id=socio_id,
+        clase_id=clase_id,
+        fecha_reserva=datetime.now().strftime("%Y-%m-%d")
+    )
+    session.add(reserva)
+    session.commit()
+    session.refresh(reserva)
+    mapa_calor.registrar_reserva(clase)
+    bus_eventos.publicar("reserva", reserva.model_dump())
+    return reserva
+
+@app.get("/reservas/")
+def listar_reservas(campos: Optional[str] = None, nombres: bool = False, session: Session = Depends(get_session)):
+    """nombres=true añade socio_nombre y clase_nombre con un join en la base"""
+    columnas = columnas_pedidas(Reserva.__table__, campos)
+    if not nombres:
+        if columnas:
+            return session.execute(select(*columnas)).mappings().all()
+        return session.exec(select(Reserva)).all()
+    return session.execute(consultas.reservas_con_nombres(columnas)).mappings().all()
+
+@app.get("/reservas/detalle")
+def detalle_reservas(clase_id: Optional[int] = None, estado: Optional[str] = None,
+                     desde: Optional[date] = None, hasta: Optional[date] = None,
+                     antes_de: Optional[int] = None, limite: int = 100,
+                     session: Session = Depends(get_session)):
+    """Reservas con nombre y horario de la clase y nombre del socio, de la más nueva a la más vieja.
+
+    Paginación por cursor: `siguiente` es el `antes_de` de la página siguiente
+    (None en la última). `total` y `por_estado` cuentan todas las reservas que
+    cumplen los filtros, no sólo las de la página.
+    """
+    return consultas.detalle_reservas(session, clase_id, estado, desde, hasta, antes_de, limite)
+
+# === EVENTOS EN VIVO ===
+def _tipos_evento(tipos: Optional[str]):
+    return {t.strip() for t in tipos.split(",") if t.strip()} if tipos else None
+
+@app.get("/eventos/stream")
+async def stream_eventos(request: Request, tipos: Optional[str] = None):
+    """Server-Sent Events con las nuevas entradas y reservas (tipos=entrada,reserva)"""
+    suscripcion = bus_eventos.suscribir(_tipos_evento(tipos))
+    return StreamingResponse(
+        generar_sse(suscripcion, request),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.websocket("/eventos/ws")
+async def websocket_eventos(websocket: WebSocket, tipos: Optional[str] = None):
+    await websocket.accept()
+    suscripcion = bus_eventos.suscribir(_tipos_evento(tipos))
+
+    async def esperar_desconexion():
+        while (await websocket.receive())["type"] != "websocket.disconnect":
+            pass
+
+    desconexion = asyncio.create_task(esperar_desconexion())
+    try:
+        while not desconexion.done():
+            try:
+                evento = await suscripcion.siguiente(timeout=1.0)
+            except asyncio.TimeoutError:
+                continue
+            if evento is FIN:
+                await websocket.close(code=1013, reason="cliente lento")
+                break
+            await websocket.send_json(evento)
+    except WebSocketDisconnect:
+        pass
+    finally:
+        desconexion.cancel()
+        bus_eventos.cancelar(suscripcion)
+
+@app.get("/eventos/estadisticas")
+def estadisticas_eventos():
+    return bus_eventos.estadisticas()
+
+# === PAGOS ===
+@app.post("/pagos/")
+def registrar_pago(socio_id: str, plan_id: int, metodo_pago: Optional[str] = None,
+                   referencia: Optional[str] = None, session: Session = Depends(get_session)):
+    socio = session.exec(select(Socio).where(Socio.id == socio_id)).first()
+    if not socio:
+        raise HTTPException(status_code=404, detail="Socio no encontrado")
+    plan = catalogo_referencia.plan(plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan no encontrado")
+
+    # La renovación se suma a partir del vencimiento actual si sigue vigente
+    hoy = datetime.now().date()
+    try:
+        inicio = max(hoy, datetime.strptime(socio.vencimiento, "%Y-%m-%d").date())
+    except ValueError:
+        inicio = hoy
+    nuevo_vencimiento = (inicio + timedelta(days=plan.duracion_dias)).strftime("%Y-%m-%d")
+
+    pago = Pago(
+        socio_id=socio.id,
+        plan_id=plan.id,
+        monto=plan.precio,
+        fecha_vencimiento=nuevo_vencimiento,
+        estado="pagado",
+        metodo_pago=metodo_pago,
+        referencia=referencia
+    )
+    socio.vencimiento = nuevo_vencimiento
+    session.add(pago)
+    session.add(socio)
+    session.commit()
+    session.refresh(pago)
+    cache_socios.invalidar(socio.id)
+    indice_vigencia.actualizar(socio.id, nuevo_vencimiento)
+    return pago
+
+@app.get("/pagos/")
+def listar_pagos(campos: Optional[str] = None, session: Session = Depends(get_session)):
+    columnas = columnas_pedidas(Pago.__table__, campos)
+    if columnas:
+        return session.execute(select(*columnas)).mappings().all()
+    return session.exec(select(Pago)).all()
+
 # === SISTEMA DE NOTIFICACIONES - COMPLETO ===
 @app.get("/notificaciones/vencimientos-proximos")
 def obtener_vencimientos_proximos(dias: int = 3, session: Session = Depends(get_session)):
@@ -198,7 +591,7 @@ def obtener_socios_morosos(session: Session = Depends(get_session)):
 
 @app.post("/notificaciones/enviar-recordatorio")
 def enviar_recordatorio_vencimiento(socio_id: str, session: Session = Depends(get_session)):
-    socio = session.exec(select(Socio).where(Socio.id == socio_id)).first()
+    socio = buscar_socio(session, socio_id)
     if not socio:
         raise HTTPException(status_code=404, detail="Socio no encontrado")
     
@@ -228,6 +621,18 @@ def enviar_recordatorio_vencimiento(socio_id: str, session: Session = Depends(ge
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error: {str(e)}")
 
+@app.get("/cache/socios")
+def estadisticas_cache_socios():
+    return cache_socios.estadisticas()
+
+@app.get("/cache/catalogo")
+def estadisticas_catalogo():
+    return catalogo_referencia.estadisticas()
+
+@app.get("/cache/vigencia")
+def estadisticas_vigencia():
+    return indice_vigencia.estadisticas()
+
 @app.get("/sistema-notificaciones/status")
 def status_notificaciones():
     return {
@@ -237,6 +642,11 @@ def status_notificaciones():
         "timestamp": datetime.now().isoformat()
     }
 
+@app.get("/sistema-notificaciones/programador")
+def estado_programador():
+    """Próxima ejecución, duración y throughput de la última corrida"""
+    return programador_recordatorios.estado()
+
 @app.post("/datos-prueba/notificaciones")
 def crear_datos_prueba_notificaciones(session: Session = Depends(get_session)):
     try:
@@ -253,6 +663,9 @@ def crear_datos_prueba_notificaciones(session: Session = Depends(get_session)):
             session.merge(socio)
         
         session.commit()
+        cache_socios.invalidar(*[socio.id for socio in socios])
+        for socio in socios:
+            indice_vigencia.actualizar(socio.id, socio.vencimiento)
         
         return {
             "status": "success",
@@ -263,22 +676,245 @@ def crear_datos_prueba_notificaciones(session: Session = Depends(get_session)):
         session.rollback()
         return {"error": f"Error: {str(e)}"}
 
+# === REPORTES ===
+@app.get("/reportes/mapa-calor")
+def obtener_mapa_calor(tipo: str = "total", clase_id: Optional[int] = None):
+    """Matriz 7×24 (lunes..domingo × 0..23h) de entradas, reservas o ambas"""
+    if tipo not in ("total", "entradas", "reservas"):
+        raise HTTPException(status_code=400, detail="tipo debe ser total, entradas o reservas")
+    return mapa_calor.matriz(tipo, clase_id)
+
+@app.get("/reportes/entradas/serie")
+def serie_entradas(desde: Optional[date] = None, hasta: Optional[date] = None,
+                   resolucion: str = "auto", max_puntos: int = 120):
+    """Entradas por hora, día, semana o mes (activas y archivadas), con a lo sumo max_puntos puntos.
+
+    Con resolucion=auto se usa la más fina que entra en max_puntos; una
+    resolución explícita se engrosa si no entra. La usada viene en `resolucion`.
+    """
+    try:
+        return series_entradas.serie_entradas(engine, desde, hasta, resolucion, max(2, min(max_puntos, 2000)))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/reportes/entradas/por-hora")
+def entradas_por_hora(desde: Optional[date] = None, hasta: Optional[date] = None):
+    """Entradas por hora del día (24 puntos) en el rango; por defecto, todo el histórico"""
+    return series_entradas.perfil_horario(engine, desde, hasta)
+
+@app.get("/reportes/ingresos")
+def obtener_reporte_ingresos(desde: Optional[str] = None, hasta: Optional[str] = None,
+                             incluir_pendientes: bool = False, gracia_renovacion_dias: int = 30,
+                             usar_cache: bool = True):
+    """Ingresos diarios y mensuales, por plan y método de pago, MRR y tasa de renovación.
+
+    Por defecto los últimos 12 meses. Los periodos cerrados se sirven desde caché.
+    """
+    hoy = datetime.now()
+    hasta = hasta or hoy.strftime("%Y-%m-%d")
+    desde = desde or (hoy - timedelta(days=365)).strftime("%Y-%m-01")
+    try:
+        datetime.strptime(desde, "%Y-%m-%d")
+        datetime.strptime(hasta, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(status_code=400, detail="desde y hasta deben tener formato YYYY-MM-DD")
+    if desde > hasta:
+        raise HTTPException(status_code=400, detail="desde debe ser anterior a hasta")
+    if not 0 <= gracia_renovacion_dias <= 365:
+        raise HTTPException(status_code=400, detail="gracia_renovacion_dias debe estar entre 0 y 365")
+    return reportes_ingresos.reporte_ingresos(engine, desde, hasta, incluir_pendientes,
+                                              gracia_renovacion_dias, usar_cache)
+
+# === IMPORTACIÓN MASIVA ===
+@app.post("/importar/{tipo}", status_code=202)
+def importar(tipo: str, archivo: UploadFile = File(...)):
+    """Sube un CSV o XLSX de socios o pagos. Se procesa en segundo plano;
+    el avance se consulta en /importar/{id} y las filas rechazadas en /importar/{id}/errores.
+
+    Socios: id, nombre, vencimiento, email, telefono (se actualiza si el id existe).
+    Pagos: socio_id, plan_id y opcionales id, monto, fecha_pago, fecha_vencimiento,
+    estado, metodo_pago, referencia (monto y vencimiento se toman del plan si faltan).
+    """
+    if tipo not in TIPOS_IMPORTACION:
+        raise HTTPException(status_code=400, detail="tipo debe ser socios o pagos")
+    try:
+        trabajo = importador.iniciar(tipo, archivo.file, archivo.filename)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return trabajo.resumen()
+
+@app.get("/importar/")
+def listar_importaciones():
+    return importador.listar()
+
+@app.get("/importar/{trabajo_id}")
+def estado_importacion(trabajo_id: str):
+    trabajo = importador.obtener(trabajo_id)
+    if not trabajo:
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return trabajo.resumen()
+
+@app.get("/importar/{trabajo_id}/errores")
+def errores_importacion(trabajo_id: str):
+    trabajo = importador.obtener(trabajo_id)
+    if not trabajo or not os.path.exists(trabajo.ruta_errores):
+        raise HTTPException(status_code=404, detail="Importación no encontrada")
+    return FileResponse(trabajo.ruta_errores, media_type="text/csv",
+                        filename=f"errores_{trabajo.id}.csv")
+
+# === ADMINISTRACIÓN ===
+@app.get("/admin/archivo")
+def estado_archivo():
+    return archivador_entradas.estado()
+
+@app.post("/admin/archivo/ejecutar")
+def ejecutar_archivo():
+    if not archivador_entradas.habilitado:
+        raise HTTPException(status_code=400, detail="ARCHIVO_MESES_ACTIVOS no está configurado")
+    if not adquirir_bloqueo(engine, ArchivadorEntradas.NOMBRE_BLOQUEO, 3600):
+        raise HTTPException(status_code=409, detail="Otro worker está archivando entradas")
+    return archivador_entradas.ejecutar_ahora()
+
+@app.post("/admin/recordatorios/ejecutar")
+def ejecutar_programador():
+    """Lanza el pipeline de recordatorios ahora mismo (envía WhatsApp reales); sólo con RECORDATORIOS_HORAS"""
+    if not programador_recordatorios.horas:
+        raise HTTPException(status_code=400, detail="RECORDATORIOS_HORAS no está configurado")
+    if not adquirir_bloqueo(engine, ProgramadorRecordatorios.NOMBRE_BLOQUEO, programador_recordatorios.duracion_bloqueo):
+        raise HTTPException(status_code=409, detail="Otro worker está ejecutando los recordatorios")
+    try:
+        return programador_recordatorios.ejecutar_ahora()
+    finally:
+        liberar_bloqueo(engine, ProgramadorRecordatorios.NOMBRE_BLOQUEO)
+
+@app.get("/admin/instantanea")
+def estado_instantanea():
+    """Versiones en disco y manifiesto de la instantánea publicada"""
+    if exportador_instantaneas is None:
+        return {"activo": False, "directorio": None, "versiones": [], "publicada": None, "ultima_ejecucion": None}
+    return exportador_instantaneas.estado()
+
+@app.post("/admin/instantanea/ejecutar")
+def ejecutar_instantanea():
+    if exportador_instantaneas is None:
+        raise HTTPException(status_code=400, detail="INSTANTANEA_DIRECTORIO no está configurado")
+    if not adquirir_bloqueo(engine, exportador_instantaneas.NOMBRE_BLOQUEO, 3600):
+        raise HTTPException(status_code=409, detail="Otro worker está exportando la instantánea")
+    return exportador_instantaneas.ejecutar_ahora()
+
+@app.get("/admin/mantenimiento")
+def estado_mantenimiento():
+    """Tamaño, páginas libres y último backup/VACUUM/ANALYZE de cada base"""
+    return mantenimiento_db.estado()
+
+@app.post("/admin/mantenimiento/ejecutar")
+def ejecutar_mantenimiento():
+    if not adquirir_bloqueo(engine, MantenimientoDB.NOMBRE_BLOQUEO, 3600):
+        raise HTTPException(status_code=409, detail="Otro worker está ejecutando el mantenimiento")
+    return mantenimiento_db.ejecutar_ahora()
+
+@app.get("/admin/admision")
+def estadisticas_admision():
+    """Peticiones admitidas y rechazadas (429/503) por regla"""
+    return {"reglas": [regla.estadisticas() for regla in REGLAS_ADMISION]}
+
+@app.get("/admin/migraciones")
+def estado_migraciones():
+    """Versión del esquema, revisiones aplicadas y pendientes"""
+    return migraciones.estado(engine)
+
+@app.post("/admin/mantenimiento/backup")
+def backup_base_datos():
+    """Backup en línea de la base principal, sin detener los check-ins"""
+    ruta = ruta_sqlite(engine)
+    if ruta is None:
+        raise HTTPException(status_code=400, detail="La base principal no es un archivo SQLite")
+    return mantenimiento_db.backup(ruta)
+
+# === SINCRONIZACIÓN INCREMENTAL ===
+TABLAS_SINCRONIZADAS = ["socio", "entrada", "reserva", "pago"]
+
+@app.get("/cambios")
+def listar_cambios(since: int = 0, limite: int = 500, tablas: Optional[str] = None,
+                   session: Session = Depends(get_session)):
+    """Inserts, updates y deletes posteriores al cursor `since`, en páginas acotadas"""
+    limite = max(1, min(limite, 5000))
+    filtro = [t.strip() for t in tablas.split(",") if t.strip()] if tablas else None
+    if filtro and any(t not in TABLAS_SINCRONIZADAS for t in filtro):
+        raise HTTPException(status_code=400, detail=f"Tablas válidas: {', '.join(TABLAS_SINCRONIZADAS)}")
+    try:
+        return cambios.obtener_cambios(session, since, limite, filtro)
+    except cambios.CursorVencido as e:
+        raise HTTPException(status_code=410, detail=str(e))
+
+@app.get("/cambios/cursor")
+def cursor_cambios(session: Session = Depends(get_session)):
+    """Cursor actual: tras una descarga completa, los clientes continúan desde aquí"""
+    return {"cursor": cambios.cursor_actual(session)}
+
 # === MANTENER ENDPOINTS EXISTENTES ===
 @app.get("/planes/")
-def listar_planes(session: Session = Depends(get_session)):
-    return session.exec(select(PlanMembresia)).all()
+def listar_planes(campos: Optional[str] = None):
+    return proyectar(catalogo_referencia.planes(), columnas_pedidas(PlanMembresia.__table__, campos))
+
+@app.post("/planes/")
+def crear_plan(plan: PlanMembresia, session: Session = Depends(get_session)):
+    plan.id = None
+    session.add(plan)
+    catalogo.marcar_cambio(session, "planes")
+    session.commit()
+    session.refresh(plan)
+    catalogo_referencia.invalidar("planes")
+    return plan
+
+@app.put("/planes/{plan_id}")
+def actualizar_plan(plan_id: int, datos: PlanMembresia, session: Session = Depends(get_session)):
+    plan = session.get(PlanMembresia, plan_id)
+    if not plan:
+        raise HTTPException(status_code=404, detail="Plan no encontrado")
+    for campo, valor in datos.model_dump(exclude={"id"}, exclude_unset=True).items():
+        setattr(plan, campo, valor)
+    catalogo.marcar_cambio(session, "planes")
+    session.commit()
+    session.refresh(plan)
+    catalogo_referencia.invalidar("planes")
+    return plan
 
 @app.get("/clases/")
-def listar_clases(session: Session = Depends(get_session)):
-    if session.exec(select(Clase)).first() is None:
-        clases = [
-            Clase(nombre="Yoga", dia_semana="lunes", hora_inicio="18:00", instructor="María Silva"),
-            Clase(nombre="Spinning", dia_semana="martes", hora_inicio="19:30", instructor="Carlos Ruiz"),
-        ]
-        for clase in clases:
-            session.add(clase)
+def listar_clases(campos: Optional[str] = None, session: Session = Depends(get_session)):
+    columnas = columnas_pedidas(Clase.__table__, campos)
+    clases = catalogo_referencia.clases()
+    if not clases:
+        session.add(Clase(nombre="Yoga", dia_semana="lunes", hora_inicio="18:00", instructor="María Silva"))
+        session.add(Clase(nombre="Spinning", dia_semana="martes", hora_inicio="19:30", instructor="Carlos Ruiz"))
+        catalogo.marcar_cambio(session, "clases")
         session.commit()
-    return session.exec(select(Clase)).all()
+        catalogo_referencia.invalidar("clases")
+        clases = catalogo_referencia.clases()
+    return proyectar(clases, columnas)
+
+@app.post("/clases/")
+def crear_clase(clase: Clase, session: Session = Depends(get_session)):
+    clase.id = None
+    session.add(clase)
+    catalogo.marcar_cambio(session, "clases")
+    session.commit()
+    session.refresh(clase)
+    catalogo_referencia.invalidar("clases")
+    return clase
+
+@app.put("/clases/{clase_id}")
+def actualizar_clase(clase_id: int, datos: Clase, session: Session = Depends(get_session)):
+    clase = session.get(Clase, clase_id)
+    if not clase:
+        raise HTTPException(status_code=404, detail="Clase no encontrada")
+    for campo, valor in datos.model_dump(exclude={"id"}, exclude_unset=True).items():
+        setattr(clase, campo, valor)
+    catalogo.marcar_cambio(session, "clases")
+    session.commit()
+    session.refresh(clase)
+    catalogo_referencia.invalidar("clases")
+    return clase
 
 if __name__ == "__main__":
     port = int(os.environ.get("PORT", 8000))
@@ -1,6 +1,6 @@
 ﻿# main_ultra_robusto.py - VERSIÓN CON MANEJO DE ERRORES MEJORADO
 from fastapi import FastAPI, Depends, HTTPException
-from sqlmodel import SQLModel, Field, create_engine, Session, select
+from sqlmodel import SQLModel, Field, create_engine, Session, select, func
 from typing import Optional
 from datetime import datetime, timedelta
 import os
@@ -175,10 +175,10 @@ def listar_clases(session: Session = Depends(get_session)):
 def debug_database():
     try:
         with Session(engine) as session:
-            # Probar diferentes consultas
-            socios_count = len(session.exec(select(Socio)).all())
-            clases_count = len(session.exec(select(Clase)).all())
-            planes_count = len(session.exec(select(PlanMembresia)).all())
+            # COUNT(*) en la base, sin traer las filas
+            socios_count = session.exec(select(func.count()).select_from(Socio)).one()
+            clases_count = session.exec(select(func.count()).select_from(Clase)).one()
+            planes_count = session.exec(select(func.count()).select_from(PlanMembresia)).one()
             
         return {
             "database_url": DATABASE_URL,
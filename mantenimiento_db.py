@@ -0,0 +1,237 @@
+# mantenimiento_db.py - Backups en línea, VACUUM incremental y ANALYZE de las bases SQLite
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from programador import TareaPeriodica
+
+logger = logging.getLogger(__name__)
+
+AUTO_VACUUM = {0: "none", 1: "full", 2: "incremental"}
+
+
+def ruta_sqlite(engine) -> Optional[str]:
+    """Ruta del archivo si el engine es SQLite en disco"""
+    if engine.url.get_backend_name() != "sqlite":
+        return None
+    base = engine.url.database
+    if not base or base == ":memory:":
+        return None
+    return os.path.abspath(base)
+
+
+def info_bd(ruta: str) -> Dict[str, Any]:
+    """Tamaño, páginas libres y modo de auto_vacuum, sin bloquear a los escritores"""
+    with sqlite3.connect(f"file:{ruta}?mode=ro", uri=True) as conn:
+        page_size = conn.execute("PRAGMA page_size").fetchone()[0]
+        page_count = conn.execute("PRAGMA page_count").fetchone()[0]
+        freelist = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        auto_vacuum = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+    return {
+        "archivo": ruta,
+        "tamano_bytes": os.path.getsize(ruta),
+        "page_size": page_size,
+        "paginas": page_count,
+        "paginas_libres": freelist,
+        "bytes_libres": freelist * page_size,
+        "auto_vacuum": AUTO_VACUUM.get(auto_vacuum, auto_vacuum),
+    }
+
+
+def backups_de(nombre: str, directorio: str) -> List[str]:
+    """Backups de la base `nombre` en `directorio`, del más viejo al más nuevo.
+
+    Sólo `nombre_YYYYMMDD_HHMMSS.db`: un glob `nombre_*.db` de gimnasio.db
+    también tomaría los de gimnasio_limpio.db.
+    """
+    patron = re.compile(rf"{re.escape(nombre)}_\d{{8}}_\d{{6}}\.db")
+    try:
+        archivos = os.listdir(directorio)
+    except FileNotFoundError:
+        return []
+    return sorted(os.path.join(directorio, a) for a in archivos if patron.fullmatch(a))
+
+
+class _CopiaReiniciada(Exception):
+    """La copia por tramos no avanza: cada escritura concurrente la hace empezar de nuevo"""
+
+
+def backup_en_linea(ruta: str, directorio: str, paginas_por_paso: int = 256,
+                    pausa: float = 0.005, retener: int = 7, max_reinicios: int = 20,
+                    max_duracion_s: float = 300.0) -> Dict[str, Any]:
+    """Copia consistente con la API de backup de SQLite, por tramos de páginas.
+
+    Entre tramos se libera el bloqueo de lectura, así que los check-ins siguen
+    escribiendo durante la copia. Pero cada escritura de otra conexión reinicia
+    la copia desde la primera página: con escrituras seguidas no terminaría
+    nunca. Pasados `max_reinicios` tramos sin avanzar o `max_duracion_s`, se
+    copia con VACUUM INTO, que lee todo en una sola transacción de lectura.
+    Se conservan los `retener` backups más recientes.
+    """
+    os.makedirs(directorio, exist_ok=True)
+    nombre = os.path.splitext(os.path.basename(ruta))[0]
+    destino = os.path.join(directorio, f"{nombre}_{datetime.now():%Y%m%d_%H%M%S}.db")
+    temporal = destino + ".parcial"
+    pasos = [0]
+    reinicios = [0]
+    anterior = [None]
+    inicio = time.perf_counter()
+
+    def progreso(estado, restantes, total):
+        pasos[0] += 1
+        if anterior[0] is not None and restantes >= anterior[0]:
+            reinicios[0] += 1
+        anterior[0] = restantes
+        if reinicios[0] > max_reinicios or time.perf_counter() - inicio > max_duracion_s:
+            raise _CopiaReiniciada()
+
+    metodo = "backup"
+    origen = sqlite3.connect(ruta)
+    try:
+        copia = sqlite3.connect(temporal)
+        try:
+            origen.backup(copia, pages=paginas_por_paso, progress=progreso, sleep=pausa)
+        except _CopiaReiniciada:
+            metodo = "vacuum_into"
+        finally:
+            copia.close()
+        if metodo == "vacuum_into":
+            logger.warning(f" Backup de {ruta}: {reinicios[0]} reinicios por escrituras concurrentes, se usa VACUUM INTO")
+            os.remove(temporal)
+            origen.execute("VACUUM INTO ?", (temporal,))
+    finally:
+        origen.close()
+    os.replace(temporal, destino)
+
+    anteriores = backups_de(nombre, directorio)
+    for viejo in anteriores[:-retener] if retener > 0 else []:
+        if viejo == destino:
+            continue
+        try:
+            os.remove(viejo)
+        except OSError as e:
+            logger.warning(f" No se pudo borrar el backup viejo {viejo}: {e}")
+
+    return {
+        "archivo": destino,
+        "tamano_bytes": os.path.getsize(destino),
+        "pasos": pasos[0],
+        "reinicios": reinicios[0],
+        "metodo": metodo,
+        "duracion_s": round(time.perf_counter() - inicio, 4),
+    }
+
+
+def vacuum_incremental(ruta: str, paginas_por_paso: int = 500, max_pasos: int = 200,
+                       convertir: bool = False) -> Dict[str, Any]:
+    """Devuelve páginas libres al sistema de archivos en transacciones cortas.
+
+    Requiere auto_vacuum=INCREMENTAL. Pasar a ese modo exige un VACUUM completo
+    (que sí bloquea), así que sólo se hace si `convertir` es True.
+    """
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    try:
+        modo = conn.execute("PRAGMA auto_vacuum").fetchone()[0]
+        libres_antes = conn.execute("PRAGMA freelist_count").fetchone()[0]
+        if modo != 2:
+            if not convertir:
+                return {"estado": "omitido", "motivo": f"auto_vacuum={AUTO_VACUUM.get(modo, modo)}",
+                        "duracion_s": round(time.perf_counter() - inicio, 4)}
+            conn.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            conn.execute("VACUUM")
+        pasos = 0
+        while pasos < max_pasos and conn.execute("PRAGMA freelist_count").fetchone()[0] > 0:
+            conn.execute(f"PRAGMA incremental_vacuum({int(paginas_por_paso)})")
+            pasos += 1
+        libres_despues = conn.execute("PRAGMA freelist_count").fetchone()[0]
+    finally:
+        conn.close()
+    return {
+        "estado": "ok",
+        "paginas_liberadas": libres_antes - libres_despues,
+        "paginas_libres": libres_despues,
+        "pasos": pasos,
+        "duracion_s": round(time.perf_counter() - inicio, 4),
+    }
+
+
+def analizar(ruta: str, limite_analisis: int = 1000) -> Dict[str, Any]:
+    """ANALYZE acotado con analysis_limit para que no recorra tablas enteras"""
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(ruta, isolation_level=None)
+    try:
+        conn.execute(f"PRAGMA analysis_limit = {int(limite_analisis)}")
+        conn.execute("ANALYZE")
+    finally:
+        conn.close()
+    return {"estado": "ok", "duracion_s": round(time.perf_counter() - inicio, 4)}
+
+
+class MantenimientoDB:
+    """Backup + VACUUM incremental + ANALYZE periódicos de una o varias bases SQLite."""
+
+    NOMBRE_BLOQUEO = "mantenimiento_db"
+
+    def __init__(self, engine, rutas: List[str], directorio_backups: str = "./backups",
+                 intervalo_horas: float = 24.0, retener: int = 7, convertir_auto_vacuum: bool = False):
+        self.engine = engine
+        self.rutas = [os.path.abspath(r) for r in rutas if r]
+        self.directorio_backups = directorio_backups
+        self.retener = retener
+        self.convertir_auto_vacuum = convertir_auto_vacuum
+        self.tarea = TareaPeriodica(engine, self.NOMBRE_BLOQUEO, self.ejecutar_ahora, intervalo_horas)
+        self.ultimas: Dict[str, Dict[str, Any]] = {}
+        self._en_curso = threading.Lock()
+
+    def backup(self, ruta: str) -> Dict[str, Any]:
+        resultado = backup_en_linea(ruta, self.directorio_backups, retener=self.retener)
+        self.ultimas.setdefault(ruta, {})["backup"] = {**resultado, "fecha": datetime.now().isoformat()}
+        return resultado
+
+    def ejecutar_ahora(self) -> Dict[str, Any]:
+        with self._en_curso:
+            resumen = {}
+            for ruta in self.rutas:
+                if not os.path.exists(ruta):
+                    resumen[ruta] = {"estado": "error", "error": "archivo no encontrado"}
+                    continue
+                inicio = time.perf_counter()
+                try:
+                    resultado = {
+                        "backup": backup_en_linea(ruta, self.directorio_backups, retener=self.retener),
+                        "vacuum": vacuum_incremental(ruta, convertir=self.convertir_auto_vacuum),
+                        "analyze": analizar(ruta),
+                        "estado": "ok",
+                    }
+                except (sqlite3.Error, OSError) as e:
+                    # Una base con problemas no detiene el mantenimiento de las demás
+                    logger.error(f" Error en mantenimiento de {ruta}: {e}")
+                    resultado = {"estado": "error", "error": str(e)}
+                resultado["duracion_s"] = round(time.perf_counter() - inicio, 4)
+                resultado["fecha"] = datetime.now().isoformat()
+                self.ultimas[ruta] = resultado
+                resumen[ruta] = resultado
+            logger.info(f" Mantenimiento de bases de datos: {resumen}")
+            return resumen
+
+    def estado(self) -> Dict[str, Any]:
+        bases = []
+        for ruta in self.rutas:
+            try:
+                info = info_bd(ruta)
+            except (sqlite3.Error, OSError) as e:
+                info = {"archivo": ruta, "error": str(e)}
+            info["ultimo_mantenimiento"] = self.ultimas.get(ruta)
+            bases.append(info)
+        return {
+            "activo": self.tarea.activa,
+            "intervalo_horas": self.tarea.intervalo_horas,
+            "directorio_backups": os.path.abspath(self.directorio_backups),
+            "bases": bases,
+        }
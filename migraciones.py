@@ -0,0 +1,426 @@
+# migraciones.py - Revisiones ordenadas del esquema, con índices y reconstrucciones de tablas por lotes
+import logging
+import re
+import sqlite3
+import sys
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy import inspect, text
+from sqlalchemy.schema import CreateTable
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from mantenimiento_db import ruta_sqlite
+from modelos import ArchivoMes, Clase, Entrada, Pago, PlanMembresia, Reserva, Salida, Socio, VersionEsquema
+from programador import adquirir_bloqueo, liberar_bloqueo
+
+logger = logging.getLogger(__name__)
+
+NOMBRE_BLOQUEO = "migraciones"
+# Cada cuánto mira un worker sin el lease si el que migra ya terminó
+ESPERA_LEASE_S = 1.0
+INSTRUCTOR_POR_DEFECTO = Clase.__table__.c.instructor.default.arg
+# A partir de estas filas un índice nuevo se construye copiando la tabla por lotes
+UMBRAL_INDICE_EN_LINEA = 200_000
+
+
+@dataclass
+class Revision:
+    id: str
+    descripcion: str
+    aplicar: Callable[[Any], None]
+    # Las revisiones en línea no bloquean el arranque: corren en un hilo ya con la API sirviendo
+    en_linea: bool = False
+
+
+def _columnas(engine, tabla: str) -> Dict[str, Dict[str, Any]]:
+    inspector = inspect(engine)
+    if not inspector.has_table(tabla):
+        return {}
+    return {c["name"]: c for c in inspector.get_columns(tabla)}
+
+
+def _indices(engine, tabla: str) -> List[str]:
+    return [i["name"] for i in inspect(engine).get_indexes(tabla)]
+
+
+def agregar_columna(engine, tabla: str, columna: str, tipo_sql: str, defecto_sql: Optional[str] = None) -> bool:
+    """ADD COLUMN si falta. En SQLite sólo cambia el esquema: no reescribe las filas."""
+    columnas = _columnas(engine, tabla)
+    if not columnas or columna in columnas:
+        return False
+    ddl = f'ALTER TABLE "{tabla}" ADD COLUMN "{columna}" {tipo_sql}'
+    if defecto_sql is not None:
+        ddl += f" DEFAULT {defecto_sql}"
+    with engine.begin() as conn:
+        conn.execute(text(ddl))
+    logger.info(f" Migración: columna {tabla}.{columna} añadida")
+    return True
+
+
+def rellenar_por_lotes(engine, tabla: str, asignacion_sql: str, condicion_sql: str,
+                       lote: int = 5000, pausa: float = 0.01) -> int:
+    """UPDATE en transacciones de `lote` filas. La condición debe dejar de cumplirse tras la asignación."""
+    if engine.dialect.name != "sqlite":
+        with engine.begin() as conn:
+            return conn.execute(text(f'UPDATE "{tabla}" SET {asignacion_sql} WHERE {condicion_sql}')).rowcount
+    total = 0
+    while True:
+        with engine.begin() as conn:
+            filas = conn.execute(text(
+                f'UPDATE "{tabla}" SET {asignacion_sql} WHERE rowid IN '
+                f'(SELECT rowid FROM "{tabla}" WHERE {condicion_sql} LIMIT {int(lote)})')).rowcount
+        total += filas
+        if filas < lote:
+            return total
+        time.sleep(pausa)
+
+
+def _renombrar_tabla_ddl(ddl: str, tabla: str, nueva: str) -> str:
+    return re.sub(r'^\s*CREATE TABLE\s+(["`]?)' + re.escape(tabla) + r'\1', f'CREATE TABLE "{nueva}"',
+                  ddl, count=1, flags=re.IGNORECASE)
+
+
+def _renombrar_indice_ddl(ddl: str, tabla: str, nueva: str) -> str:
+    return re.sub(r'\bON\s+(["`]?)' + re.escape(tabla) + r'\1\s*\(', f'ON "{nueva}" (',
+                  ddl, count=1, flags=re.IGNORECASE)
+
+
+def reconstruir_tabla(ruta: str, tabla: str, ddl_tabla: Optional[str] = None, indices_extra: Sequence[str] = (),
+                      rellenos: Optional[Dict[str, str]] = None, lote: int = 1000, pausa: float = 0.01) -> Dict[str, Any]:
+    """Rehace una tabla SQLite sin bloquear a los escritores más que unos milisegundos seguidos.
+
+    1. Crea `<tabla>__nueva` con `ddl_tabla` (o el DDL actual), sus índices y los de `indices_extra`.
+       Los índices de la tabla vieja se pasan a la nueva: durante la copia las lecturas
+       sobre la tabla vieja van sin índices, las escrituras siguen igual.
+    2. Triggers en la tabla vieja replican en la nueva cada insert/update/delete.
+    3. Copia por rangos de rowid, cada lote en su propia transacción.
+    4. En una transacción corta: aparta la vieja y renombra la nueva.
+    5. Vacía la vieja por lotes y la borra.
+
+    `rellenos` da la expresión SQL para columnas nuevas que la tabla vieja no tiene.
+    """
+    nueva = f"{tabla}__nueva"
+    rellenos = rellenos or {}
+    inicio = time.perf_counter()
+    conn = sqlite3.connect(ruta, timeout=30, isolation_level=None)
+    try:
+        ddl_actual = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (tabla,)).fetchone()
+        if ddl_actual is None:
+            raise ValueError(f"No existe la tabla {tabla}")
+        indices_viejos = conn.execute(
+            "SELECT name, sql FROM sqlite_master WHERE type = 'index' AND tbl_name = ? AND sql IS NOT NULL",
+            (tabla,)).fetchall()
+        nombres = {nombre for nombre, _ in indices_viejos}
+        indices_sql = [sql for _, sql in indices_viejos] + [
+            sql for sql in indices_extra if re.search(r'INDEX\s+(?:IF NOT EXISTS\s+)?"?(\w+)', sql).group(1) not in nombres]
+
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute(f'DROP TABLE IF EXISTS "{nueva}"')  # restos de un intento interrumpido
+        conn.execute(_renombrar_tabla_ddl(ddl_tabla or ddl_actual[0], tabla, nueva))
+        viejas = [fila[1] for fila in conn.execute(f'PRAGMA table_info("{tabla}")')]
+        info_nueva = conn.execute(f'PRAGMA table_info("{nueva}")').fetchall()
+        destino = [fila[1] for fila in info_nueva if fila[1] in viejas or fila[1] in rellenos]
+        clave = [fila[1] for fila in sorted(info_nueva, key=lambda f: f[5]) if fila[5] > 0] or ["rowid"]
+        for nombre in nombres:
+            conn.execute(f'DROP INDEX "{nombre}"')
+        for sql in indices_sql:
+            conn.execute(_renombrar_indice_ddl(sql, tabla, nueva))
+
+        columnas = ", ".join(f'"{c}"' for c in destino)
+        origen = ", ".join(f'"{c}"' if c in viejas else f"({rellenos[c]})" for c in destino)
+        desde_new = ", ".join(f'NEW."{c}"' if c in viejas else f"({rellenos[c]})" for c in destino)
+        misma_clave = " AND ".join(f'"{c}" = OLD."{c}"' for c in clave)
+        conn.execute(f'CREATE TRIGGER "{tabla}__espejo_ins" AFTER INSERT ON "{tabla}" BEGIN '
+                     f'INSERT OR REPLACE INTO "{nueva}" ({columnas}) VALUES ({desde_new}); END')
+        conn.execute(f'CREATE TRIGGER "{tabla}__espejo_upd" AFTER UPDATE ON "{tabla}" BEGIN '
+                     f'DELETE FROM "{nueva}" WHERE {misma_clave}; '
+                     f'INSERT OR REPLACE INTO "{nueva}" ({columnas}) VALUES ({desde_new}); END')
+        conn.execute(f'CREATE TRIGGER "{tabla}__espejo_del" AFTER DELETE ON "{tabla}" BEGIN '
+                     f'DELETE FROM "{nueva}" WHERE {misma_clave}; END')
+        # Las filas posteriores a `maximo` ya las copian los triggers
+        ultimo, maximo = conn.execute(f'SELECT MIN(rowid) - 1, MAX(rowid) FROM "{tabla}"').fetchone()
+        conn.execute("COMMIT")
+
+        lotes = copiadas = 0
+        while maximo is not None and ultimo < maximo:
+            conn.execute("BEGIN IMMEDIATE")
+            hasta = conn.execute(f'SELECT rowid FROM "{tabla}" WHERE rowid > ? ORDER BY rowid LIMIT 1 OFFSET ?',
+                                 (ultimo, lote - 1)).fetchone()
+            hasta = min(hasta[0], maximo) if hasta else maximo
+            # Lo que ya escribieron los triggers es más reciente: OR IGNORE lo respeta
+            copiadas += conn.execute(f'INSERT OR IGNORE INTO "{nueva}" ({columnas}) SELECT {origen} '
+                                     f'FROM "{tabla}" WHERE rowid > ? AND rowid <= ?', (ultimo, hasta)).rowcount
+            lotes += 1
+            conn.execute("COMMIT")
+            ultimo = hasta
+            time.sleep(pausa)
+
+        inicio_cambio = time.perf_counter()
+        conn.execute("BEGIN IMMEDIATE")
+        # Con legacy_alter_table no se revalidan las vistas que apuntan a la tabla (entrada_historica)
+        conn.execute("PRAGMA legacy_alter_table = ON")
+        for sufijo in ("ins", "upd", "del"):
+            conn.execute(f'DROP TRIGGER "{tabla}__espejo_{sufijo}"')
+        vieja = f"{tabla}__vieja"
+        conn.execute(f'DROP TABLE IF EXISTS "{vieja}"')
+        conn.execute(f'ALTER TABLE "{tabla}" RENAME TO "{vieja}"')
+        conn.execute(f'ALTER TABLE "{nueva}" RENAME TO "{tabla}"')
+        conn.execute("COMMIT")
+        conn.execute("PRAGMA legacy_alter_table = OFF")
+        bloqueo_final_ms = (time.perf_counter() - inicio_cambio) * 1000
+
+        # Un DROP de la tabla llena libera todas sus páginas de una vez: se vacía por lotes antes
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            borradas = conn.execute(f'DELETE FROM "{vieja}" WHERE rowid IN '
+                                    f'(SELECT rowid FROM "{vieja}" LIMIT {int(lote)})').rowcount
+            conn.execute("COMMIT")
+            if borradas < lote:
+                break
+            time.sleep(pausa)
+        conn.execute(f'DROP TABLE "{vieja}"')
+    except Exception:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        raise
+    finally:
+        conn.close()
+    logger.info(f" Migración: tabla {tabla} reconstruida ({copiadas} filas en {lotes} lotes)")
+    return {"tabla": tabla, "filas_copiadas": copiadas, "lotes": lotes,
+            "bloqueo_final_ms": round(bloqueo_final_ms, 2), "duracion_s": round(time.perf_counter() - inicio, 3)}
+
+
+def crear_indice(engine, nombre: str, tabla: str, columnas: Sequence[str],
+                 umbral_en_linea: int = UMBRAL_INDICE_EN_LINEA) -> bool:
+    """Crea el índice si falta sin dejar la tabla bloqueada durante toda la construcción.
+
+    SQLite construye un CREATE INDEX de una vez con la base bloqueada para escribir,
+    así que en tablas grandes se reconstruye la tabla por lotes con el índice ya puesto.
+    En PostgreSQL se usa CREATE INDEX CONCURRENTLY.
+    """
+    if not _columnas(engine, tabla) or nombre in _indices(engine, tabla):
+        return False
+    lista = ", ".join(f'"{c}"' for c in columnas)
+    ddl = f'CREATE INDEX "{nombre}" ON "{tabla}" ({lista})'
+    if engine.dialect.name == "postgresql":
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text(f'CREATE INDEX CONCURRENTLY IF NOT EXISTS "{nombre}" ON "{tabla}" ({lista})'))
+        return True
+    with engine.connect() as conn:
+        filas = conn.execute(text(f'SELECT COUNT(*) FROM "{tabla}"')).scalar()
+    ruta = ruta_sqlite(engine)
+    if filas <= umbral_en_linea or ruta is None:
+        with engine.begin() as conn:
+            conn.execute(text(ddl))
+    else:
+        reconstruir_tabla(ruta, tabla, indices_extra=[ddl])
+    logger.info(f" Migración: índice {nombre} creado en {tabla} ({filas} filas)")
+    return True
+
+
+# === REVISIONES ===
+
+def _r001_columnas(engine):
+    for tabla, columna, tipo, defecto in [
+        ("socio", "email", "VARCHAR", None),
+        ("socio", "telefono", "VARCHAR", None),
+        ("clase", "duracion_min", "INTEGER NOT NULL", "60"),
+        ("clase", "capacidad_max", "INTEGER NOT NULL", "20"),
+        ("clase", "instructor", "VARCHAR", f"'{INSTRUCTOR_POR_DEFECTO}'"),
+        ("reserva", "fecha_reserva", "VARCHAR NOT NULL", "''"),
+        ("reserva", "estado", "VARCHAR NOT NULL", "'confirmada'"),
+        ("planmembresia", "descripcion", "VARCHAR NOT NULL", "''"),
+        ("planmembresia", "activo", "BOOLEAN NOT NULL", "1"),
+        ("pago", "estado", "VARCHAR NOT NULL", "'pendiente'"),
+        ("pago", "metodo_pago", "VARCHAR", None),
+        ("pago", "referencia", "VARCHAR", None),
+    ]:
+        agregar_columna(engine, tabla, columna, tipo, defecto)
+
+
+def _defecto_sql(columna) -> str:
+    """Literal SQL del valor por defecto del modelo (NULL si no tiene uno fijo)"""
+    valor = getattr(columna.default, "arg", None)
+    if valor is None or callable(valor):
+        return "NULL"
+    if isinstance(valor, str):
+        return "'" + valor.replace("'", "''") + "'"
+    return str(int(valor)) if isinstance(valor, bool) else str(valor)
+
+
+def _r002_opcionales_sin_not_null(engine):
+    """Algunas bases crearon como NOT NULL columnas que el modelo declara Optional
+    (pago.metodo_pago en gimnasio_limpio.db): los pagos registrados sin método fallaban."""
+    for modelo in (Socio, Clase, Reserva, PlanMembresia, Pago, Entrada):
+        tabla = modelo.__table__
+        columnas = _columnas(engine, tabla.name)
+        a_relajar = [c.name for c in tabla.columns
+                     if c.nullable and not c.primary_key and c.name in columnas and not columnas[c.name]["nullable"]]
+        if not a_relajar:
+            continue
+        if engine.dialect.name == "postgresql":
+            with engine.begin() as conn:
+                for columna in a_relajar:
+                    conn.execute(text(f'ALTER TABLE "{tabla.name}" ALTER COLUMN "{columna}" DROP NOT NULL'))
+            continue
+        ruta = ruta_sqlite(engine)
+        if ruta is None:
+            continue
+        ddl = str(CreateTable(tabla).compile(dialect=engine.dialect))
+        faltantes = {c.name: _defecto_sql(c) for c in tabla.columns if c.name not in columnas}
+        reconstruir_tabla(ruta, tabla.name, ddl_tabla=ddl, rellenos=faltantes)
+
+
+def _r003_indices_reservas_y_entradas(engine):
+    # Cupos de la próxima sesión (crear_reserva) y asistencia por socio
+    crear_indice(engine, "ix_reserva_clase_fecha", "reserva", ["clase_id", "estado", "fecha_reserva"])
+    crear_indice(engine, "ix_entrada_socio_fecha", "entrada", ["socio_id", "fecha_hora"])
+
+
+def _r004_sede_en_entradas(engine):
+    agregar_columna(engine, "entrada", "sede", "VARCHAR NOT NULL", "'principal'")
+
+
+def _r005_indice_reservas_fecha(engine):
+    # Filtro por rango de fechas de /reservas/detalle sin clase_id
+    crear_indice(engine, "ix_reserva_fecha", "reserva", ["fecha_reserva"])
+
+
+def _r006_indice_entradas_fecha(engine):
+    # Rangos por mes del archivo de entradas (archivar_mes) y series por fecha
+    crear_indice(engine, "ix_entrada_fecha_hora", "entrada", ["fecha_hora"])
+
+
+def _r007_indices_pagos(engine):
+    # Los reportes de ingresos leen todo de estos índices, sin tocar la tabla
+    crear_indice(engine, "ix_pago_fecha_pago", "pago",
+                 ["fecha_pago", "estado", "monto", "plan_id", "metodo_pago", "socio_id", "fecha_vencimiento"])
+    crear_indice(engine, "ix_pago_socio_fecha", "pago", ["socio_id", "fecha_pago", "estado", "fecha_vencimiento"])
+    crear_indice(engine, "ix_pago_fecha_vencimiento", "pago", ["fecha_vencimiento", "fecha_pago"])
+
+
+def _r008_instructor_por_defecto(engine):
+    """Las bases migradas antes de que la 001 diera un valor por defecto a clase.instructor lo tienen en NULL"""
+    rellenar_por_lotes(engine, "clase", f"instructor = '{INSTRUCTOR_POR_DEFECTO}'", "instructor IS NULL")
+
+
+def _r009_ids_sin_reutilizar(engine):
+    """Entrada y salida con AUTOINCREMENT. Sin él, SQLite reparte ids desde max(id) + 1: si el
+    archivo vacía `entrada` vuelven a empezar y chocan con las tablas de archivo y con `cambio`."""
+    ruta = ruta_sqlite(engine)
+    if engine.dialect.name != "sqlite" or ruta is None:
+        return  # las secuencias de PostgreSQL no retroceden
+    for modelo in (Entrada, Salida):
+        tabla = modelo.__table__
+        with engine.connect() as conn:
+            ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = :tabla"),
+                               {"tabla": tabla.name}).scalar()
+        if ddl is None or "AUTOINCREMENT" in ddl.upper():
+            continue
+        columnas = _columnas(engine, tabla.name)
+        faltantes = {c.name: _defecto_sql(c) for c in tabla.columns if c.name not in columnas}
+        reconstruir_tabla(ruta, tabla.name, ddl_tabla=str(CreateTable(tabla).compile(dialect=engine.dialect)),
+                          rellenos=faltantes)
+
+    # El contador arranca en el mayor id ya usado, incluidas las entradas archivadas
+    with engine.begin() as conn:
+        archivos = conn.execute(select(ArchivoMes.tabla)).scalars().all()
+        maximo = max([conn.execute(text(f'SELECT MAX(id) FROM "{t}"')).scalar() or 0
+                      for t in ["entrada", *archivos]])
+        actual = conn.execute(text("SELECT seq FROM sqlite_sequence WHERE name = 'entrada'")).scalar()
+        if actual is None:
+            conn.execute(text("INSERT INTO sqlite_sequence (name, seq) VALUES ('entrada', :seq)"), {"seq": maximo})
+        elif actual < maximo:
+            conn.execute(text("UPDATE sqlite_sequence SET seq = :seq WHERE name = 'entrada'"), {"seq": maximo})
+
+
+REVISIONES: List[Revision] = [
+    Revision("001", "Columnas añadidas a los modelos después de crear las bases", _r001_columnas),
+    Revision("002", "Quitar NOT NULL de columnas opcionales reconstruyendo la tabla por lotes", _r002_opcionales_sin_not_null),
+    Revision("003", "Índices de reserva (clase, estado, fecha) y entrada (socio, fecha_hora)",
+             _r003_indices_reservas_y_entradas, en_linea=True),
+    Revision("004", "Sede de cada entrada (ocupación por sede)", _r004_sede_en_entradas),
+    Revision("005", "Índice de reserva por fecha", _r005_indice_reservas_fecha, en_linea=True),
+    Revision("006", "Índice de entrada por fecha_hora", _r006_indice_entradas_fecha, en_linea=True),
+    Revision("007", "Índices de pago para los reportes de ingresos", _r007_indices_pagos, en_linea=True),
+    Revision("008", "Instructor por defecto en clases sin instructor", _r008_instructor_por_defecto),
+    Revision("009", "Ids de entrada y salida sin reutilizar (AUTOINCREMENT)", _r009_ids_sin_reutilizar),
+]
+
+
+def _aplicadas(engine) -> set:
+    with Session(engine) as session:
+        return set(session.exec(select(VersionEsquema.revision)).all())
+
+
+def estado(engine, revisiones: Sequence[Revision] = REVISIONES) -> Dict[str, Any]:
+    aplicadas = {}
+    if inspect(engine).has_table(VersionEsquema.__tablename__):
+        with Session(engine) as session:
+            aplicadas = {v.revision: v for v in session.exec(select(VersionEsquema)).all()}
+    return {
+        "version": max(aplicadas) if aplicadas else None,
+        "aplicadas": [aplicadas[r].model_dump() for r in sorted(aplicadas)],
+        "pendientes": [{"revision": r.id, "descripcion": r.descripcion, "en_linea": r.en_linea}
+                       for r in revisiones if r.id not in aplicadas],
+    }
+
+
+def migrar(engine, solo_arranque: bool = False, revisiones: Sequence[Revision] = REVISIONES) -> List[str]:
+    """Aplica en orden las revisiones pendientes y devuelve las que quedan.
+
+    Con `solo_arranque` se saltan las revisiones `en_linea` (sólo índices, de
+    las que no depende el código) para que las aplique un hilo con la API ya
+    atendiendo. Un lease evita que dos workers migren a la vez; el que no lo
+    obtiene espera a que el otro termine las que necesita, para no atender con
+    el esquema viejo.
+    """
+    SQLModel.metadata.create_all(engine)
+    avisado = False
+    while not adquirir_bloqueo(engine, NOMBRE_BLOQUEO, 3600):
+        aplicadas = _aplicadas(engine)
+        faltan = [r for r in revisiones if r.id not in aplicadas]
+        if all(solo_arranque and r.en_linea for r in faltan):
+            # Lo que queda son índices que está construyendo el otro worker
+            return [r.id for r in faltan]
+        if not avisado:
+            logger.info(f" Migraciones: otro worker las está aplicando, esperando {[r.id for r in faltan]}")
+            avisado = True
+        time.sleep(ESPERA_LEASE_S)
+    try:
+        aplicadas = _aplicadas(engine)
+        pendientes = []
+        for revision in revisiones:
+            if revision.id in aplicadas:
+                continue
+            if solo_arranque and revision.en_linea:
+                pendientes.append(revision)
+                continue
+            inicio = time.perf_counter()
+            revision.aplicar(engine)
+            with Session(engine) as session:
+                session.add(VersionEsquema(revision=revision.id, descripcion=revision.descripcion,
+                                           aplicada=datetime.now().isoformat(timespec="seconds"),
+                                           duracion_s=round(time.perf_counter() - inicio, 3)))
+                session.commit()
+            logger.info(f" Migración {revision.id} aplicada: {revision.descripcion}")
+        return [r.id for r in pendientes]
+    finally:
+        liberar_bloqueo(engine, NOMBRE_BLOQUEO)
+
+
+if __name__ == "__main__":
+    # python migraciones.py [--estado] gimnasio.db temp.db ...
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    argumentos = sys.argv[1:]
+    solo_estado = "--estado" in argumentos
+    for ruta in [a for a in argumentos if a != "--estado"]:
+        engine = create_engine(f"sqlite:///{ruta}")
+        if not solo_estado:
+            migrar(engine)
+        resumen = estado(engine)
+        print(f"{ruta}: versión {resumen['version']}, pendientes {[p['revision'] for p in resumen['pendientes']]}")
+        engine.dispose()
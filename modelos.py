@@ -0,0 +1,115 @@
+# modelos.py - Modelos SQLModel compartidos por la API y los módulos auxiliares
+from sqlmodel import SQLModel, Field
+from typing import Optional
+from datetime import datetime
+
+class Socio(SQLModel, table=True):
+    id: str = Field(primary_key=True)
+    nombre: str
+    vencimiento: str
+    email: Optional[str] = None
+    telefono: Optional[str] = None
+
+class Entrada(SQLModel, table=True):
+    # AUTOINCREMENT: archivar puede vaciar la tabla y los ids no deben volver a empezar
+    __table_args__ = {"sqlite_autoincrement": True}
+    id: Optional[int] = Field(default=None, primary_key=True)
+    socio_id: str = Field(foreign_key="socio.id")
+    nombre_socio: str
+    fecha_hora: str
+    sede: str = "principal"
+
+class Salida(SQLModel, table=True):
+    """Paso por el torniquete de salida; junto con Entrada da la ocupación actual"""
+    __table_args__ = {"sqlite_autoincrement": True}
+    id: Optional[int] = Field(default=None, primary_key=True)
+    socio_id: str = Field(foreign_key="socio.id")
+    sede: str = "principal"
+    fecha_hora: str = Field(index=True)
+
+class Clase(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    nombre: str
+    dia_semana: str
+    hora_inicio: str
+    duracion_min: int = 60
+    capacidad_max: int = 20
+    instructor: str = Field(default="Instructor Por Definir")
+
+class Reserva(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    socio_id: str = Field(foreign_key="socio.id")
+    clase_id: int = Field(foreign_key="clase.id")
+    fecha_reserva: str
+    estado: str = "confirmada"
+
+class PlanMembresia(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    nombre: str = Field(index=True)
+    precio: float
+    duracion_dias: int
+    descripcion: str
+    activo: bool = Field(default=True)
+
+class Pago(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    socio_id: str = Field(foreign_key="socio.id")
+    plan_id: int = Field(foreign_key="planmembresia.id")
+    monto: float
+    fecha_pago: str = Field(default_factory=lambda: datetime.now().strftime("%Y-%m-%d"))
+    fecha_vencimiento: str
+    estado: str = Field(default="pendiente")
+    metodo_pago: Optional[str] = None
+    referencia: Optional[str] = None
+
+class Cambio(SQLModel, table=True):
+    """Registro de cambios: una fila por insert/update/delete, en orden de seq"""
+    seq: Optional[int] = Field(default=None, primary_key=True)
+    tabla: str = Field(index=True)
+    registro_id: str
+    operacion: str
+    fecha: str
+
+class BloqueoLider(SQLModel, table=True):
+    """Lease para que sólo un worker ejecute las tareas programadas"""
+    nombre: str = Field(primary_key=True)
+    propietario: str
+    expira: float
+
+class ResumenEntradasHora(SQLModel, table=True):
+    """Entradas archivadas agregadas por fecha y hora (gráficos y mapa de calor)"""
+    fecha: str = Field(primary_key=True)
+    hora: int = Field(primary_key=True)
+    total: int
+
+class ResumenEntradasSocio(SQLModel, table=True):
+    """Entradas archivadas agregadas por mes y socio (asistencia e inactividad)"""
+    mes: str = Field(primary_key=True)
+    socio_id: str = Field(primary_key=True)
+    total: int
+    ultima_entrada: str
+
+class ArchivoMes(SQLModel, table=True):
+    """Meses de entradas movidos a su tabla de archivo"""
+    mes: str = Field(primary_key=True)
+    tabla: str
+    filas: int
+    archivado: str
+
+class VersionDatos(SQLModel, table=True):
+    """Versión de los datos de referencia (planes, clases); cada escritura la incrementa"""
+    nombre: str = Field(primary_key=True)
+    version: int = 0
+
+class VersionEsquema(SQLModel, table=True):
+    """Revisiones de migraciones.py ya aplicadas a esta base"""
+    revision: str = Field(primary_key=True)
+    descripcion: str
+    aplicada: str
+    duracion_s: float = 0.0
+
+class OcupacionSede(SQLModel, table=True):
+    """Última foto persistida de las personas dentro de cada sede"""
+    sede: str = Field(primary_key=True)
+    dentro: int
+    actualizado: str
@@ -4,7 +4,7 @@ import pandas as pd
 from datetime import datetime, timedelta
 from twilio.rest import Client
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class SistemaNotificaciones:
     def __init__(self, api_url: str = "https://gimnasio-2-0-1.onrender.com"):
@@ -63,25 +63,41 @@ class SistemaNotificaciones:
         else:
             return f"🔔 Hola {nombre}, tu membresía vence en {dias_restantes} días ({socio['vencimiento']}). ¡Aprovecha!"
     
-    def enviar_recordatorios_vencimiento(self, dias: int = 3) -> Dict[str, Any]:
-        """Envía recordatorios de vencimiento a todos los socios afectados"""
-        socios = self.obtener_socios_vencimiento_proximo(dias)
+    def enviar_recordatorios_vencimiento(self, dias: int = 3, socios: Optional[List[Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Envía recordatorios de vencimiento a todos los socios afectados.
+
+        Si se pasa `socios` (p. ej. desde el programador de la API, que ya los
+        leyó de la base de datos) no se consulta la API por HTTP.
+        """
+        if socios is None:
+            socios = self.obtener_socios_vencimiento_proximo(dias)
         
         resultados = {
             "enviados": 0,
             "fallidos": 0,
+            "sin_telefono": 0,
             "total_procesados": len(socios),
             "detalles": []
         }
         
         for socio in socios:
-            # En tu sistema actual, asumiremos que el teléfono está en el campo 'telefono'
-            # Si no está en la API, podrías extender el modelo Socio para incluirlo
-            telefono = socio.get("telefono", "+1234567890")  # Valor por defecto para pruebas
+            telefono = (socio.get("telefono") or "").strip()
+            if not telefono:
+                # Sin teléfono no se envía nada (nunca a un número de relleno)
+                resultados["sin_telefono"] += 1
+                resultados["detalles"].append({
+                    "socio_id": socio["socio_id"],
+                    "nombre": socio["nombre"],
+                    "telefono": None,
+                    "mensaje": None,
+                    "estado": "sin_telefono"
+                })
+                continue
             
             mensaje = self.generar_mensaje_vencimiento(socio)
             
-            if self.enviar_notificacion_whatsapp(telefono, mensaje):
+            enviado = self.enviar_notificacion_whatsapp(telefono, mensaje)
+            if enviado:
                 resultados["enviados"] += 1
             else:
                 resultados["fallidos"] += 1
@@ -91,7 +107,7 @@ class SistemaNotificaciones:
                 "nombre": socio["nombre"],
                 "telefono": telefono,
                 "mensaje": mensaje,
-                "estado": "enviado" if self.enviar_notificacion_whatsapp(telefono, mensaje) else "fallido"
+                "estado": "enviado" if enviado else "fallido"
             })
         
         return resultados
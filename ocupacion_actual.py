@@ -0,0 +1,182 @@
+# ocupacion_actual.py - Personas dentro ahora por sede, a partir de entradas y salidas
+import heapq
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+from sqlalchemy import delete, func, select
+
+from modelos import Entrada, OcupacionSede, Salida
+
+_entrada = Entrada.__table__
+_salida = Salida.__table__
+
+# A igual fecha_hora se aplica antes la entrada que la salida
+ORDEN_ENTRADA, ORDEN_SALIDA = 0, 1
+
+
+def _ahora() -> str:
+    return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+
+
+class OcupacionActual:
+    """Contador en memoria de socios dentro de cada sede.
+
+    Cada entrada o salida cuesta O(1) y leer el contador no toca la base. Quien
+    no marca la salida se da por fuera tras `estancia_max_horas`. Al arrancar se
+    rehace reproduciendo las entradas y salidas de esa ventana; después se pone
+    al día con las filas nuevas (las de otros workers) como mucho cada
+    `intervalo_verificacion` segundos. Aplicar dos veces un mismo evento no
+    cambia nada: se ignora todo evento anterior al último aplicado del socio.
+
+    `persistir` guarda la foto en `ocupacionsede` para quien lee la base sin
+    pasar por la API.
+    """
+
+    def __init__(self, engine, estancia_max_horas: float = 4.0, intervalo_verificacion: float = 1.0,
+                 intervalo_barrido: float = 60.0):
+        self.engine = engine
+        self.estancia_max = timedelta(hours=estancia_max_horas)
+        self.intervalo_verificacion = intervalo_verificacion
+        self.intervalo_barrido = intervalo_barrido
+        # socio_id -> (sede, fecha_hora de la entrada)
+        self._presentes: Dict[str, Tuple[str, str]] = {}
+        # socio_id -> (fecha_hora, orden) del último evento aplicado
+        self._ultimo: Dict[str, Tuple[str, int]] = {}
+        self._por_sede: Dict[str, int] = {}
+        self._cursor_entrada = 0
+        self._cursor_salida = 0
+        self._verificado = 0.0
+        self._barrido = 0.0
+        self._lock = threading.Lock()
+        self._sincronizando = threading.Lock()
+        self.actualizado: Optional[str] = None
+        self.eventos = 0
+        self.expirados = 0
+
+    def _aplicar(self, orden: int, socio_id: str, sede: str, fecha_hora: str):
+        clave = (fecha_hora, orden)
+        if self._ultimo.get(socio_id, ("", -1)) >= clave:
+            return
+        self._ultimo[socio_id] = clave
+        self.eventos += 1
+        previo = self._presentes.pop(socio_id, None)
+        if previo is not None:
+            self._por_sede[previo[0]] -= 1
+        if orden == ORDEN_ENTRADA:
+            self._presentes[socio_id] = (sede, fecha_hora)
+            self._por_sede[sede] = self._por_sede.get(sede, 0) + 1
+        self.actualizado = datetime.now().isoformat(timespec="seconds")
+
+    def registrar_entrada(self, socio_id: str, sede: str, fecha_hora: str):
+        with self._lock:
+            self._aplicar(ORDEN_ENTRADA, socio_id, sede, fecha_hora)
+
+    def registrar_salida(self, socio_id: str, sede: str, fecha_hora: str):
+        with self._lock:
+            self._aplicar(ORDEN_SALIDA, socio_id, sede, fecha_hora)
+
+    def _leer_eventos(self, conn, desde_entrada: int, desde_salida: int,
+                      corte: Optional[str] = None) -> Tuple[Iterable[tuple], int, int]:
+        """Entradas y salidas posteriores a los cursores, mezcladas por (fecha_hora, orden).
+
+        Los cursores son ids: sirven porque los INSERT de entrada y salida toman el
+        bloqueo de cambios._serializar (cambios.ordenar_inserciones) y los ids quedan
+        en orden de commit.
+        """
+        consultas = []
+        for tabla, desde, orden in ((_entrada, desde_entrada, ORDEN_ENTRADA), (_salida, desde_salida, ORDEN_SALIDA)):
+            consulta = select(tabla.c.fecha_hora, tabla.c.id, tabla.c.socio_id, tabla.c.sede).where(tabla.c.id > desde)
+            if corte is not None:
+                consulta = consulta.where(tabla.c.fecha_hora >= corte)
+            filas = conn.execute(consulta.order_by(tabla.c.fecha_hora)).all()
+            consultas.append([(f, orden, socio_id, sede, i) for f, i, socio_id, sede in filas])
+        cursor_entrada = max((e[4] for e in consultas[0]), default=desde_entrada)
+        cursor_salida = max((e[4] for e in consultas[1]), default=desde_salida)
+        return heapq.merge(*consultas), cursor_entrada, cursor_salida
+
+    def cargar(self):
+        """Reproduce las entradas y salidas de las últimas `estancia_max_horas`"""
+        corte = (datetime.now() - self.estancia_max).strftime("%Y-%m-%d %H:%M:%S")
+        with self._sincronizando, self.engine.connect() as conn:
+            # Los cursores parten del máximo actual aunque la ventana no llegue a esas filas
+            maximo_entrada = conn.execute(select(func.max(_entrada.c.id))).scalar() or 0
+            maximo_salida = conn.execute(select(func.max(_salida.c.id))).scalar() or 0
+            eventos, cursor_entrada, cursor_salida = self._leer_eventos(conn, 0, 0, corte)
+            cursor_entrada, cursor_salida = max(cursor_entrada, maximo_entrada), max(cursor_salida, maximo_salida)
+            with self._lock:
+                self._presentes, self._ultimo, self._por_sede = {}, {}, {}
+                for fecha_hora, orden, socio_id, sede, _ in eventos:
+                    self._aplicar(orden, socio_id, sede, fecha_hora)
+                self._cursor_entrada, self._cursor_salida = cursor_entrada, cursor_salida
+                self._verificado = self._barrido = time.monotonic()
+
+    def _barrer(self):
+        """Da por fuera a quien entró hace más de `estancia_max_horas` sin marcar salida"""
+        corte = (datetime.now() - self.estancia_max).strftime("%Y-%m-%d %H:%M:%S")
+        with self._lock:
+            for socio_id, (sede, desde) in list(self._presentes.items()):
+                if desde < corte:
+                    del self._presentes[socio_id]
+                    self._por_sede[sede] -= 1
+                    self.expirados += 1
+            for socio_id, (fecha_hora, _) in list(self._ultimo.items()):
+                if fecha_hora < corte and socio_id not in self._presentes:
+                    del self._ultimo[socio_id]
+        self._barrido = time.monotonic()
+
+    def _sincronizar(self):
+        if time.monotonic() - self._verificado < self.intervalo_verificacion:
+            return
+        # Un solo hilo se pone al día; el resto sigue respondiendo con lo que hay
+        if not self._sincronizando.acquire(blocking=False):
+            return
+        try:
+            with self.engine.connect() as conn:
+                eventos, cursor_entrada, cursor_salida = self._leer_eventos(
+                    conn, self._cursor_entrada, self._cursor_salida)
+                with self._lock:
+                    for fecha_hora, orden, socio_id, sede, _ in eventos:
+                        self._aplicar(orden, socio_id, sede, fecha_hora)
+            self._cursor_entrada, self._cursor_salida = cursor_entrada, cursor_salida
+            if time.monotonic() - self._barrido >= self.intervalo_barrido:
+                self._barrer()
+            self._verificado = time.monotonic()
+        finally:
+            self._sincronizando.release()
+
+    def ocupacion(self, sede: Optional[str] = None) -> Dict[str, Any]:
+        self._sincronizar()
+        with self._lock:
+            sedes = {nombre: total for nombre, total in self._por_sede.items() if total > 0}
+        if sede is not None:
+            sedes = {sede: sedes.get(sede, 0)}
+        return {
+            "sedes": sedes,
+            "total": sum(sedes.values()),
+            "actualizado": self.actualizado,
+            "estancia_max_horas": self.estancia_max.total_seconds() / 3600,
+        }
+
+    def persistir(self) -> Dict[str, Any]:
+        """Reemplaza la foto de `ocupacionsede` por la del contador"""
+        self._sincronizar()
+        with self._lock:
+            filas = [{"sede": sede, "dentro": total, "actualizado": _ahora()} for sede, total in self._por_sede.items()]
+        with self.engine.begin() as conn:
+            conn.execute(delete(OcupacionSede))
+            if filas:
+                conn.execute(OcupacionSede.__table__.insert(), filas)
+        return {"sedes": len(filas), "persistido": _ahora()}
+
+    def estadisticas(self) -> Dict[str, Any]:
+        return {
+            "presentes": len(self._presentes),
+            "socios_con_eventos": len(self._ultimo),
+            "cursor_entrada": self._cursor_entrada,
+            "cursor_salida": self._cursor_salida,
+            "eventos_aplicados": self.eventos,
+            "expirados": self.expirados,
+            "intervalo_verificacion_s": self.intervalo_verificacion,
+        }
@@ -0,0 +1,196 @@
+# ocupacion_horaria.py - Mapa de calor día de la semana × hora (entradas y reservas), mantenido en memoria
+import threading
+import time
+import unicodedata
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func
+from sqlmodel import Session, select
+
+from modelos import Cambio, Clase, Entrada, Reserva, ResumenEntradasHora, VersionDatos
+
+_cambio = Cambio.__table__
+_version = VersionDatos.__table__
+
+DIAS_SEMANA = ["lunes", "martes", "miércoles", "jueves", "viernes", "sábado", "domingo"]
+_INDICE_DIAS = {unicodedata.normalize("NFKD", d).encode("ascii", "ignore").decode(): i
+                for i, d in enumerate(DIAS_SEMANA)}
+
+
+def _matriz_vacia() -> List[List[int]]:
+    return [[0] * 24 for _ in range(7)]
+
+
+def indice_dia(dia_semana: str) -> Optional[int]:
+    """'Miércoles', 'miercoles' y 'MIÉRCOLES' son el mismo día"""
+    texto = unicodedata.normalize("NFKD", (dia_semana or "").strip().lower()).encode("ascii", "ignore").decode()
+    return _INDICE_DIAS.get(texto)
+
+
+def horas_clase(clase: Clase) -> List[int]:
+    """Horas del día que ocupa una clase según hora_inicio y duracion_min"""
+    try:
+        inicio = datetime.strptime(clase.hora_inicio, "%H:%M")
+    except (TypeError, ValueError):
+        return []
+    duracion = getattr(clase, "duracion_min", None) or 60
+    fin_minutos = inicio.hour * 60 + inicio.minute + duracion
+    return list(range(inicio.hour, min(24, (fin_minutos - 1) // 60 + 1)))
+
+
+class MapaCalor:
+    """Matriz 7×24 de entradas y reservas confirmadas, más una por clase.
+
+    Se reconstruye al arrancar con consultas agregadas y las altas del propio
+    worker se suman al instante. Sumar no alcanza para todo: una reserva
+    cancelada, una clase que cambia de día u hora o las altas hechas en otro
+    worker no pasan por aquí. Con `engine`, al leer se consulta como mucho cada
+    `intervalo_verificacion` segundos la tabla `cambio` y la versión de clases
+    (como IndiceVigencia y el catálogo), y se reconstruye si hubo updates o
+    deletes de entradas/reservas o clases editadas; además se reconstruye cada
+    `intervalo_reconstruccion` segundos para incorporar las altas de otros
+    workers y corregir cualquier deriva.
+    """
+
+    def __init__(self, engine=None, intervalo_verificacion: float = 1.0, intervalo_reconstruccion: float = 60.0):
+        self.engine = engine
+        self.intervalo_verificacion = intervalo_verificacion
+        self.intervalo_reconstruccion = intervalo_reconstruccion
+        self._lock = threading.Lock()
+        self._lock_reconstruccion = threading.Lock()
+        self._entradas = _matriz_vacia()
+        self._reservas = _matriz_vacia()
+        self._por_clase: Dict[int, List[List[int]]] = {}
+        self._cursor = 0
+        self._version_clases = 0
+        self._verificado = 0.0
+        self._reconstruido = 0.0
+        self.actualizado: Optional[str] = None
+        self.reconstrucciones = 0
+
+    def _sumar_entrada(self, fecha_hora: str, cantidad: int = 1):
+        try:
+            momento = datetime.strptime(fecha_hora[:13], "%Y-%m-%d %H")
+        except (TypeError, ValueError):
+            try:
+                momento = datetime.fromisoformat(fecha_hora)
+            except (TypeError, ValueError):
+                return
+        self._entradas[momento.weekday()][momento.hour] += cantidad
+
+    def _sumar_reserva(self, clase: Clase, cantidad: int = 1):
+        dia = indice_dia(clase.dia_semana)
+        if dia is None:
+            return
+        matriz_clase = self._por_clase.setdefault(clase.id, _matriz_vacia())
+        for hora in horas_clase(clase):
+            self._reservas[dia][hora] += cantidad
+            matriz_clase[dia][hora] += cantidad
+
+    def registrar_entrada(self, fecha_hora: str):
+        with self._lock:
+            self._sumar_entrada(fecha_hora)
+            self.actualizado = datetime.now().isoformat()
+
+    def registrar_reserva(self, clase: Clase):
+        with self._lock:
+            self._sumar_reserva(clase)
+            self.actualizado = datetime.now().isoformat()
+
+    def reconstruir(self, session: Session):
+        """Recalcula desde cero agrupando por fecha+hora en SQL (máx. días×24 filas).
+
+        Las entradas ya archivadas se leen de su resumen por hora. El cursor de
+        cambios y la versión de clases se toman antes: lo que cambie durante la
+        reconstrucción vuelve a disparar otra.
+        """
+        cursor = session.exec(select(func.max(_cambio.c.seq))).one() or 0
+        version_clases = session.exec(select(_version.c.version).where(_version.c.nombre == "clases")).first() or 0
+        hora = func.substr(Entrada.fecha_hora, 1, 13)
+        filas_entradas = session.exec(select(hora, func.count()).group_by(hora)).all()
+        filas_entradas += [
+            (f"{r.fecha} {r.hora:02d}", r.total) for r in session.exec(select(ResumenEntradasHora)).all()
+        ]
+        filas_reservas = session.exec(
+            select(Reserva.clase_id, func.count())
+            .where(Reserva.estado == "confirmada")
+            .group_by(Reserva.clase_id)
+        ).all()
+        clases = {c.id: c for c in session.exec(select(Clase)).all()}
+
+        with self._lock:
+            self._entradas = _matriz_vacia()
+            self._reservas = _matriz_vacia()
+            self._por_clase = {}
+            for fecha_hora, total in filas_entradas:
+                self._sumar_entrada(fecha_hora, total)
+            for clase_id, total in filas_reservas:
+                if clase_id in clases:
+                    self._sumar_reserva(clases[clase_id], total)
+            self.actualizado = datetime.now().isoformat()
+            self._cursor = cursor
+            self._version_clases = version_clases
+            self._reconstruido = self._verificado = time.monotonic()
+            self.reconstrucciones += 1
+
+    def _hay_que_reconstruir(self) -> bool:
+        """Updates/deletes de entradas o reservas y clases editadas desde la última reconstrucción"""
+        with self.engine.connect() as conn:
+            version_clases = conn.execute(select(_version.c.version).where(_version.c.nombre == "clases")).scalar() or 0
+            if version_clases != self._version_clases:
+                return True
+            tope = conn.execute(select(func.max(_cambio.c.seq))).scalar() or 0
+            relevante = conn.execute(select(_cambio.c.seq).where(
+                _cambio.c.seq > self._cursor, _cambio.c.seq <= tope,
+                _cambio.c.tabla.in_(["entrada", "reserva"]),
+                _cambio.c.operacion.in_(["update", "delete"])).limit(1)).first()
+        if relevante is not None:
+            return True
+        self._cursor = tope
+        return False
+
+    def _al_dia(self):
+        if self.engine is None:
+            return
+        ahora = time.monotonic()
+        if ahora - self._verificado < self.intervalo_verificacion:
+            return
+        # Un solo hilo verifica o reconstruye; el resto responde con la matriz actual
+        if not self._lock_reconstruccion.acquire(blocking=False):
+            return
+        try:
+            if ahora - self._reconstruido >= self.intervalo_reconstruccion or self._hay_que_reconstruir():
+                with Session(self.engine) as session:
+                    self.reconstruir(session)
+            self._verificado = time.monotonic()
+        finally:
+            self._lock_reconstruccion.release()
+
+    def clases(self) -> List[int]:
+        """Clases con reservas confirmadas (las que tienen matriz propia)"""
+        with self._lock:
+            return list(self._por_clase)
+
+    def matriz(self, tipo: str = "total", clase_id: Optional[int] = None) -> Dict[str, Any]:
+        self._al_dia()
+        with self._lock:
+            if clase_id is not None:
+                valores = [fila[:] for fila in self._por_clase.get(clase_id, _matriz_vacia())]
+                tipo = "reservas"
+            elif tipo == "entradas":
+                valores = [fila[:] for fila in self._entradas]
+            elif tipo == "reservas":
+                valores = [fila[:] for fila in self._reservas]
+            else:
+                valores = [[e + r for e, r in zip(fe, fr)] for fe, fr in zip(self._entradas, self._reservas)]
+            actualizado = self.actualizado
+        return {
+            "tipo": tipo,
+            "clase_id": clase_id,
+            "dias": DIAS_SEMANA,
+            "horas": list(range(24)),
+            "valores": valores,
+            "total": sum(map(sum, valores)),
+            "actualizado": actualizado,
+        }
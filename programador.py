@@ -0,0 +1,229 @@
+# programador.py - Tareas programadas dentro del proceso de la API (recordatorios de vencimiento)
+import asyncio
+import logging
+import os
+import socket
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import or_, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+
+from modelos import BloqueoLider, Socio
+
+logger = logging.getLogger(__name__)
+
+PROPIETARIO = f"{socket.gethostname()}:{os.getpid()}"
+_tabla_bloqueo = BloqueoLider.__table__
+
+
+def adquirir_bloqueo(engine, nombre: str, segundos: float, propietario: str = PROPIETARIO) -> bool:
+    """Toma (o renueva) el lease `nombre`. Sólo un worker lo tiene a la vez."""
+    ahora = time.time()
+    with engine.begin() as conn:
+        resultado = conn.execute(
+            update(_tabla_bloqueo)
+            .where(_tabla_bloqueo.c.nombre == nombre)
+            .where(or_(_tabla_bloqueo.c.expira < ahora, _tabla_bloqueo.c.propietario == propietario))
+            .values(propietario=propietario, expira=ahora + segundos)
+        )
+        if resultado.rowcount:
+            return True
+    try:
+        with engine.begin() as conn:
+            conn.execute(_tabla_bloqueo.insert().values(nombre=nombre, propietario=propietario, expira=ahora + segundos))
+        return True
+    except IntegrityError:
+        return False
+
+
+def liberar_bloqueo(engine, nombre: str, propietario: str = PROPIETARIO):
+    """Suelta el lease antes de que expire (sólo si sigue siendo nuestro)"""
+    with engine.begin() as conn:
+        conn.execute(
+            update(_tabla_bloqueo)
+            .where(_tabla_bloqueo.c.nombre == nombre)
+            .where(_tabla_bloqueo.c.propietario == propietario)
+            .values(expira=0)
+        )
+
+
+def socios_por_vencer(session: Session, dias: int = 3) -> List[Dict[str, Any]]:
+    """Misma lista que /notificaciones/vencimientos-proximos, filtrada en SQL"""
+    hoy = datetime.now().date()
+    limite = hoy + timedelta(days=dias)
+    # vencimiento se guarda como YYYY-MM-DD, así que el orden de texto es el de fechas
+    socios = session.exec(
+        select(Socio)
+        .where(Socio.vencimiento >= hoy.strftime("%Y-%m-%d"))
+        .where(Socio.vencimiento <= limite.strftime("%Y-%m-%d"))
+    ).all()
+    resultado = []
+    for socio in socios:
+        try:
+            vencimiento = datetime.strptime(socio.vencimiento, "%Y-%m-%d").date()
+        except ValueError:
+            continue
+        resultado.append({
+            "socio_id": socio.id,
+            "nombre": socio.nombre,
+            "vencimiento": socio.vencimiento,
+            "telefono": socio.telefono,
+            "dias_restantes": (vencimiento - hoy).days,
+        })
+    return resultado
+
+
+def _enviar_con_twilio(socios: List[Dict[str, Any]], dias: int) -> Dict[str, Any]:
+    # Import diferido: twilio sólo hace falta si realmente se envían mensajes
+    from notificaciones import SistemaNotificaciones
+    return SistemaNotificaciones().enviar_recordatorios_vencimiento(dias, socios=socios)
+
+
+class ProgramadorRecordatorios:
+    """Ejecuta el envío de recordatorios a las horas configuradas (HH:MM)."""
+
+    NOMBRE_BLOQUEO = "recordatorios_vencimiento"
+
+    def __init__(self, engine, horas: List[str], dias: int = 3,
+                 enviar: Callable[[List[Dict[str, Any]], int], Dict[str, Any]] = _enviar_con_twilio,
+                 duracion_bloqueo: float = 600.0):
+        self.engine = engine
+        self.horas = sorted(datetime.strptime(h.strip(), "%H:%M").time() for h in horas if h.strip())
+        self.dias = dias
+        self.enviar = enviar
+        self.duracion_bloqueo = duracion_bloqueo
+        self._tarea: Optional[asyncio.Task] = None
+        self._ultima_ranura: Optional[datetime] = None
+        self.ejecuciones = 0
+        self.omitidas_sin_liderazgo = 0
+        self.ultima_ejecucion: Optional[Dict[str, Any]] = None
+
+    def proxima_ejecucion(self, desde: Optional[datetime] = None) -> Optional[datetime]:
+        if not self.horas:
+            return None
+        desde = desde or datetime.now()
+        for dia in range(2):
+            fecha = desde.date() + timedelta(days=dia)
+            for hora in self.horas:
+                ranura = datetime.combine(fecha, hora)
+                if ranura > desde and ranura != self._ultima_ranura:
+                    return ranura
+        return None
+
+    def ejecutar_ahora(self) -> Dict[str, Any]:
+        """Corre el pipeline completo contra la base de datos y guarda sus métricas"""
+        inicio = time.perf_counter()
+        resumen: Dict[str, Any] = {"inicio": datetime.now().isoformat(), "worker": PROPIETARIO}
+        try:
+            with Session(self.engine) as session:
+                socios = socios_por_vencer(session, self.dias)
+            consulta = time.perf_counter() - inicio
+            # Los socios sin teléfono se cuentan pero no llegan al envío
+            con_telefono = [s for s in socios if (s.get("telefono") or "").strip()]
+            resultado = self.enviar(con_telefono, self.dias) if con_telefono else {"enviados": 0, "fallidos": 0}
+            resumen.update({
+                "estado": "ok",
+                "procesados": len(socios),
+                "enviados": resultado.get("enviados", 0),
+                "fallidos": resultado.get("fallidos", 0),
+                "sin_telefono": len(socios) - len(con_telefono),
+                "duracion_consulta_s": round(consulta, 4),
+            })
+        except Exception as e:
+            logger.error(f" Error en recordatorios programados: {e}")
+            resumen.update({"estado": "error", "error": str(e), "procesados": 0})
+
+        duracion = time.perf_counter() - inicio
+        resumen["duracion_s"] = round(duracion, 4)
+        resumen["socios_por_segundo"] = round(resumen["procesados"] / duracion, 2) if duracion > 0 else 0.0
+        self.ejecuciones += 1
+        self.ultima_ejecucion = resumen
+        logger.info(f" Recordatorios programados: {resumen}")
+        return resumen
+
+    async def _bucle(self):
+        while True:
+            ranura = self.proxima_ejecucion()
+            if ranura is None:
+                return
+            # Se duerme por tramos para tolerar cambios de hora del sistema
+            while (espera := (ranura - datetime.now()).total_seconds()) > 0:
+                await asyncio.sleep(min(espera, 60))
+            self._ultima_ranura = ranura
+            try:
+                lider = await asyncio.to_thread(adquirir_bloqueo, self.engine, self.NOMBRE_BLOQUEO, self.duracion_bloqueo)
+            except Exception as e:
+                logger.error(f" No se pudo consultar el bloqueo de líder: {e}")
+                continue
+            if not lider:
+                self.omitidas_sin_liderazgo += 1
+                continue
+            await asyncio.to_thread(self.ejecutar_ahora)
+
+    def iniciar(self):
+        if self.horas and self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+
+    def estado(self) -> Dict[str, Any]:
+        proxima = self.proxima_ejecucion()
+        return {
+            "activo": self._tarea is not None and not self._tarea.done(),
+            "horas": [h.strftime("%H:%M") for h in self.horas],
+            "dias_anticipacion": self.dias,
+            "worker": PROPIETARIO,
+            "proxima_ejecucion": proxima.isoformat() if proxima else None,
+            "ejecuciones": self.ejecuciones,
+            "omitidas_sin_liderazgo": self.omitidas_sin_liderazgo,
+            "ultima_ejecucion": self.ultima_ejecucion,
+        }
+
+
+class TareaPeriodica:
+    """Ejecuta `funcion` cada `intervalo_horas` (la primera vez al arrancar) en el worker líder."""
+
+    def __init__(self, engine, nombre_bloqueo: str, funcion: Callable[[], Any], intervalo_horas: float):
+        self.engine = engine
+        self.nombre_bloqueo = nombre_bloqueo
+        self.funcion = funcion
+        self.intervalo_horas = intervalo_horas
+        self._tarea: Optional[asyncio.Task] = None
+
+    async def _bucle(self):
+        intervalo = self.intervalo_horas * 3600
+        while True:
+            try:
+                # El lease dura medio intervalo: si el líder cae, otro worker toma el relevo
+                if await asyncio.to_thread(adquirir_bloqueo, self.engine, self.nombre_bloqueo, intervalo / 2):
+                    await asyncio.to_thread(self.funcion)
+            except Exception as e:
+                logger.error(f" Error en la tarea periódica {self.nombre_bloqueo}: {e}")
+            await asyncio.sleep(intervalo)
+
+    @property
+    def activa(self) -> bool:
+        return self._tarea is not None and not self._tarea.done()
+
+    def iniciar(self):
+        if self.intervalo_horas > 0 and self._tarea is None:
+            self._tarea = asyncio.create_task(self._bucle())
+
+    async def detener(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
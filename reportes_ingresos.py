@@ -0,0 +1,225 @@
+# reportes_ingresos.py - Analítica de ingresos sobre Pago con agregados y funciones ventana en SQL
+import threading
+import time
+from collections import OrderedDict
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select, text
+
+from modelos import Cambio, VersionDatos
+
+# Pagos que no son ingreso
+ESTADOS_EXCLUIDOS = ("cancelado", "anulado", "rechazado")
+
+_cache: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+_cache_lock = threading.Lock()
+_CACHE_MAX = 128
+# Cada invalidación sube la generación: un cálculo empezado antes no se guarda
+_generacion = [0]
+
+_cambio = Cambio.__table__
+_version = VersionDatos.__table__
+# Cada cuánto se mira `cambio` por pagos escritos en otros workers
+VERIFICACION_S = 1.0
+_sincronizacion: Dict[str, Any] = {"cursor": None, "planes": None, "verificado": 0.0}
+_lock_sincronizacion = threading.Lock()
+
+
+def invalidar_cache():
+    """Llamar tras cargas que escriban pagos con fecha pasada"""
+    with _cache_lock:
+        _cache.clear()
+        _generacion[0] += 1
+
+
+def _sincronizar(engine):
+    """Vacía la caché si hay pagos en `cambio` después del cursor o cambió la versión de los planes"""
+    if time.monotonic() - _sincronizacion["verificado"] < VERIFICACION_S:
+        return
+    if not _lock_sincronizacion.acquire(blocking=False):
+        return
+    try:
+        with engine.connect() as conn:
+            planes = conn.execute(select(_version.c.version).where(_version.c.nombre == "planes")).scalar() or 0
+            # El tope se lee primero: lo que llegue después entra en la próxima vuelta
+            tope = conn.execute(select(func.max(_cambio.c.seq))).scalar() or 0
+            cursor = _sincronizacion["cursor"]
+            hubo_cambios = cursor is not None and (planes != _sincronizacion["planes"] or (
+                tope > cursor and conn.execute(select(_cambio.c.seq).where(
+                    _cambio.c.seq > cursor, _cambio.c.seq <= tope, _cambio.c.tabla == "pago").limit(1)).first() is not None))
+        if hubo_cambios:
+            invalidar_cache()
+        _sincronizacion.update(cursor=tope, planes=planes, verificado=time.monotonic())
+    finally:
+        _lock_sincronizacion.release()
+
+
+def periodo_cerrado(hasta: str, gracia_renovacion_dias: int, hoy: Optional[date] = None) -> bool:
+    """La renovación de lo que vence hasta `hasta` depende de pagos hechos hasta `hasta` + gracia"""
+    hoy = hoy or date.today()
+    return date.fromisoformat(hasta) + timedelta(days=max(0, gracia_renovacion_dias)) < hoy
+
+
+def _mas_dias(dialecto: str, columna: str, dias: int) -> str:
+    if dialecto == "sqlite":
+        return f"date({columna}, '+{int(dias)} days')"
+    return f"to_char(CAST({columna} AS date) + {int(dias)}, 'YYYY-MM-DD')"
+
+
+def _filtro_estado(incluir_pendientes: bool) -> str:
+    excluidos = list(ESTADOS_EXCLUIDOS) + ([] if incluir_pendientes else ["pendiente"])
+    return "estado NOT IN (" + ", ".join(f"'{e}'" for e in excluidos) + ")"
+
+
+def _filas(conn, sql: str, **params) -> List[Dict[str, Any]]:
+    return [dict(fila) for fila in conn.execute(text(sql), params).mappings()]
+
+
+def calcular_ingresos(conn, desde: str, hasta: str, incluir_pendientes: bool = False,
+                      gracia_renovacion_dias: int = 30) -> Dict[str, Any]:
+    dialecto = conn.dialect.name
+    estado = _filtro_estado(incluir_pendientes)
+    rango = f"fecha_pago >= :desde AND fecha_pago <= :hasta AND {estado}"
+    # fecha_pago puede traer hora; el día son siempre los 10 primeros caracteres
+    params = {"desde": desde, "hasta": hasta + " 99"}
+    # Pagos anteriores a este no pueden estar vigentes en el rango: acota MRR y renovación
+    params["inicio_vigentes"] = conn.execute(text(
+        "SELECT MIN(fecha_pago) FROM pago WHERE fecha_vencimiento >= :desde"), params).scalar() or desde
+
+    # Día, plan y método salen de un único recorrido del rango agrupado a nivel fino
+    desglose = _filas(conn, f"""
+        WITH fino AS (
+            SELECT substr(fecha_pago, 1, 10) AS dia, plan_id,
+                   COALESCE(metodo_pago, 'sin especificar') AS metodo_pago,
+                   COUNT(*) AS pagos, SUM(monto) AS ingresos
+            FROM pago WHERE {rango}
+            GROUP BY substr(fecha_pago, 1, 10), plan_id, COALESCE(metodo_pago, 'sin especificar')
+        )
+        SELECT 'dia' AS dimension, dia AS clave, SUM(pagos) AS pagos, SUM(ingresos) AS ingresos,
+               SUM(SUM(ingresos)) OVER (ORDER BY dia) AS extra
+        FROM fino GROUP BY dia
+        UNION ALL
+        SELECT 'plan', CAST(plan_id AS TEXT), SUM(pagos), SUM(ingresos),
+               100.0 * SUM(ingresos) / SUM(SUM(ingresos)) OVER ()
+        FROM fino GROUP BY plan_id
+        UNION ALL
+        SELECT 'metodo', metodo_pago, SUM(pagos), SUM(ingresos),
+               100.0 * SUM(ingresos) / SUM(SUM(ingresos)) OVER ()
+        FROM fino GROUP BY metodo_pago""", **params)
+    nombres_planes = {str(id_plan): nombre for id_plan, nombre in conn.execute(text("SELECT id, nombre FROM planmembresia"))}
+    diario, por_plan, por_metodo = [], [], []
+    for fila in desglose:
+        base = {"pagos": fila["pagos"], "ingresos": fila["ingresos"]}
+        if fila["dimension"] == "dia":
+            diario.append({"dia": fila["clave"], **base, "acumulado": fila["extra"]})
+        elif fila["dimension"] == "plan":
+            por_plan.append({"plan_id": int(fila["clave"]), "plan": nombres_planes.get(fila["clave"], f"Plan {fila['clave']}"),
+                             **base, "porcentaje": round(fila["extra"], 2)})
+        else:
+            por_metodo.append({"metodo_pago": fila["clave"], **base, "porcentaje": round(fila["extra"], 2)})
+    diario.sort(key=lambda f: f["dia"])
+    por_plan.sort(key=lambda f: -f["ingresos"])
+    por_metodo.sort(key=lambda f: -f["ingresos"])
+
+    mensual = _filas(conn, f"""
+        WITH m AS (
+            SELECT substr(fecha_pago, 1, 7) AS mes, COUNT(*) AS pagos, SUM(monto) AS ingresos,
+                   COUNT(DISTINCT socio_id) AS socios_pagadores
+            FROM pago WHERE {rango}
+            GROUP BY substr(fecha_pago, 1, 7)
+        )
+        SELECT mes, pagos, ingresos, socios_pagadores,
+               LAG(ingresos) OVER (ORDER BY mes) AS ingresos_mes_anterior,
+               SUM(ingresos) OVER (ORDER BY mes) AS acumulado
+        FROM m ORDER BY mes""", **params)
+    for fila in mensual:
+        anterior = fila["ingresos_mes_anterior"]
+        fila["variacion_pct"] = round((fila["ingresos"] - anterior) / anterior * 100, 2) if anterior else None
+
+    # MRR: cada pago aporta su valor mensualizado desde el mes en que se paga hasta
+    # el mes anterior a su vencimiento. Se suman altas y bajas por mes y se acumulan
+    # con una ventana; agrupar antes por (mes de pago, mes de vencimiento, plan)
+    # deja el cruce con los planes en unas pocas filas.
+    mrr = _filas(conn, f"""
+        WITH grupos AS (
+            SELECT substr(fecha_pago, 1, 7) AS mes_pago, substr(fecha_vencimiento, 1, 7) AS mes_vencimiento,
+                   plan_id, SUM(monto) AS monto
+            FROM pago
+            WHERE fecha_pago >= :inicio_vigentes AND fecha_pago <= :hasta
+              AND fecha_vencimiento >= :desde AND {estado}
+            GROUP BY substr(fecha_pago, 1, 7), substr(fecha_vencimiento, 1, 7), plan_id
+        ), valor AS (
+            SELECT g.mes_pago, g.mes_vencimiento,
+                   g.monto * 30.0 / CASE WHEN pl.duracion_dias > 0 THEN pl.duracion_dias ELSE 30 END AS mensual
+            FROM grupos g LEFT JOIN planmembresia pl ON pl.id = g.plan_id
+        ), eventos AS (
+            SELECT mes_pago AS mes, mensual AS delta FROM valor
+            UNION ALL
+            SELECT mes_vencimiento AS mes, -mensual AS delta FROM valor
+        ), por_mes AS (
+            SELECT mes, SUM(delta) AS delta FROM eventos GROUP BY mes
+        )
+        SELECT mes, SUM(delta) OVER (ORDER BY mes) AS mrr FROM por_mes ORDER BY mes""", **params)
+    mrr = [f for f in mrr if desde[:7] <= f["mes"] <= hasta[:7]]
+
+    # Renovación: de los pagos que vencen en cada mes, cuántos tienen un pago
+    # siguiente del mismo socio antes de vencimiento + gracia
+    limite = _mas_dias(dialecto, "fecha_vencimiento", gracia_renovacion_dias)
+    renovacion = _filas(conn, f"""
+        WITH secuencia AS (
+            SELECT fecha_vencimiento,
+                   LEAD(fecha_pago) OVER (PARTITION BY socio_id ORDER BY fecha_pago) AS siguiente_pago
+            FROM pago WHERE fecha_pago >= :inicio_vigentes AND {estado}
+        )
+        SELECT substr(fecha_vencimiento, 1, 7) AS mes,
+               COUNT(*) AS vencimientos,
+               SUM(CASE WHEN siguiente_pago <= {limite} THEN 1 ELSE 0 END) AS renovados
+        FROM secuencia
+        WHERE fecha_vencimiento >= :desde AND fecha_vencimiento <= :hasta
+        GROUP BY substr(fecha_vencimiento, 1, 7)
+        ORDER BY mes""", **params)
+    for fila in renovacion:
+        fila["tasa_renovacion"] = round(fila["renovados"] / fila["vencimientos"], 4) if fila["vencimientos"] else None
+
+    return {
+        "desde": desde,
+        "hasta": hasta,
+        "total_ingresos": sum(f["ingresos"] or 0 for f in mensual),
+        "total_pagos": sum(f["pagos"] for f in mensual),
+        "diario": diario,
+        "mensual": mensual,
+        "por_plan": por_plan,
+        "por_metodo_pago": por_metodo,
+        "mrr": mrr,
+        "renovacion": renovacion,
+    }
+
+
+def reporte_ingresos(engine, desde: str, hasta: str, incluir_pendientes: bool = False,
+                     gracia_renovacion_dias: int = 30, usar_cache: bool = True) -> Dict[str, Any]:
+    """Como `calcular_ingresos`, cacheando los periodos ya cerrados (ver `periodo_cerrado`).
+
+    Los pagos escritos después en cualquier worker invalidan la caché vía `cambio`.
+    """
+    cerrado = periodo_cerrado(hasta, gracia_renovacion_dias)
+    clave = (desde, hasta, incluir_pendientes, gracia_renovacion_dias)
+    if usar_cache and cerrado:
+        _sincronizar(engine)
+        with _cache_lock:
+            if clave in _cache:
+                _cache.move_to_end(clave)
+                return {**_cache[clave], "cache": True}
+            generacion = _generacion[0]
+
+    with engine.connect() as conn:
+        resultado = calcular_ingresos(conn, desde, hasta, incluir_pendientes, gracia_renovacion_dias)
+
+    if usar_cache and cerrado:
+        with _cache_lock:
+            if _generacion[0] != generacion:
+                return {**resultado, "cache": False}
+            _cache[clave] = resultado
+            while len(_cache) > _CACHE_MAX:
+                _cache.popitem(last=False)
+    return {**resultado, "cache": False}
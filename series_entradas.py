@@ -0,0 +1,169 @@
+# series_entradas.py - Entradas agregadas por hora, día, semana o mes para los gráficos, con tope de puntos
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+from sqlalchemy import func, select
+
+from modelos import Entrada, ResumenEntradasHora
+
+# De la más fina a la más gruesa; "auto" elige la primera que entra en max_puntos
+RESOLUCIONES = ["hora", "dia", "semana", "mes"]
+_entrada = Entrada.__table__
+_resumen = ResumenEntradasHora.__table__
+
+
+def inicio_cubeta(dia: date, resolucion: str) -> date:
+    if resolucion == "semana":
+        return dia - timedelta(days=dia.weekday())
+    if resolucion == "mes":
+        return dia.replace(day=1)
+    return dia
+
+
+def _siguiente(dia: date, resolucion: str) -> date:
+    if resolucion == "semana":
+        return dia + timedelta(days=7)
+    if resolucion == "mes":
+        return date(dia.year + dia.month // 12, dia.month % 12 + 1, 1)
+    return dia + timedelta(days=1)
+
+
+def cantidad_cubetas(desde: date, hasta: date, resolucion: str) -> int:
+    if resolucion == "hora":
+        return ((hasta - desde).days + 1) * 24
+    if resolucion == "mes":
+        return (hasta.year - desde.year) * 12 + hasta.month - desde.month + 1
+    return (inicio_cubeta(hasta, resolucion) - inicio_cubeta(desde, resolucion)).days // (
+        7 if resolucion == "semana" else 1) + 1
+
+
+def elegir_resolucion(desde: date, hasta: date, max_puntos: int, pedida: str = "auto") -> str:
+    """La pedida (o la más fina si es "auto") si entra en max_puntos; si no, la siguiente más gruesa.
+    El mes es el tope: un rango de décadas devuelve más de max_puntos meses."""
+    candidatas = RESOLUCIONES if pedida == "auto" else RESOLUCIONES[RESOLUCIONES.index(pedida):]
+    for resolucion in candidatas:
+        if cantidad_cubetas(desde, hasta, resolucion) <= max_puntos:
+            return resolucion
+    return "mes"
+
+
+def primera_fecha(conn) -> Optional[date]:
+    """Día de la entrada más vieja, archivada o no (ambos MIN usan índice)"""
+    fechas = [conn.execute(select(func.min(_entrada.c.fecha_hora))).scalar(),
+              conn.execute(select(func.min(_resumen.c.fecha))).scalar()]
+    fechas = [_dia(f) for f in fechas if f]
+    fechas = [f for f in fechas if f]
+    return min(fechas) if fechas else None
+
+
+def _dia(texto: str) -> Optional[date]:
+    try:
+        return date.fromisoformat(texto[:10])
+    except (TypeError, ValueError):
+        return None
+
+
+def _conteos(conn, desde: date, hasta: date, por_hora: bool) -> Dict[tuple, int]:
+    """{(dia, hora)} o {(dia,)} → total, sumando la tabla activa y los resúmenes del archivo.
+    Las entradas archivadas ya no están en `entrada`, así que no se cuentan dos veces."""
+    largo = 13 if por_hora else 10
+    clave = func.substr(_entrada.c.fecha_hora, 1, largo)
+    rango_activo = (_entrada.c.fecha_hora >= desde.isoformat()) & (
+        _entrada.c.fecha_hora < (hasta + timedelta(days=1)).isoformat())
+    conteos: Dict[tuple, int] = {}
+    for texto, total in conn.execute(select(clave, func.count()).where(rango_activo).group_by(clave)):
+        dia = _dia(texto)
+        if dia is None:
+            continue
+        try:
+            k = (dia, int(texto[11:13])) if por_hora else (dia,)
+        except (TypeError, ValueError):
+            continue
+        conteos[k] = conteos.get(k, 0) + total
+
+    rango_archivo = (_resumen.c.fecha >= desde.isoformat()) & (_resumen.c.fecha <= hasta.isoformat())
+    columnas = [_resumen.c.fecha, _resumen.c.hora] if por_hora else [_resumen.c.fecha]
+    for fila in conn.execute(select(*columnas, func.sum(_resumen.c.total)).where(rango_archivo).group_by(*columnas)):
+        dia = _dia(fila[0])
+        if dia is None:
+            continue
+        k = (dia, int(fila[1])) if por_hora else (dia,)
+        conteos[k] = conteos.get(k, 0) + int(fila[-1])
+    return conteos
+
+
+def armar_serie(conteos: Dict[tuple, int], desde: date, hasta: date, resolucion: str) -> Dict[str, Any]:
+    """Serie continua a partir de conteos {(dia, hora)} (resolución "hora") o {(dia,)} (el resto)"""
+    if resolucion == "hora":
+        puntos = []
+        dia = desde
+        while dia <= hasta:
+            puntos.extend({"inicio": f"{dia.isoformat()} {h:02d}:00", "total": conteos.get((dia, h), 0)}
+                          for h in range(24))
+            dia += timedelta(days=1)
+    else:
+        totales: Dict[date, int] = {}
+        for (dia,), total in conteos.items():
+            cubeta = inicio_cubeta(dia, resolucion)
+            totales[cubeta] = totales.get(cubeta, 0) + total
+        puntos = []
+        cubeta = inicio_cubeta(desde, resolucion)
+        while cubeta <= hasta:
+            puntos.append({"inicio": cubeta.isoformat(), "total": totales.get(cubeta, 0)})
+            cubeta = _siguiente(cubeta, resolucion)
+    return {
+        "desde": desde.isoformat(),
+        "hasta": hasta.isoformat(),
+        "resolucion": resolucion,
+        "puntos": puntos,
+        "total": sum(p["total"] for p in puntos),
+    }
+
+
+def validar_resolucion(resolucion: str):
+    if resolucion != "auto" and resolucion not in RESOLUCIONES:
+        raise ValueError(f"resolucion debe ser auto o una de: {', '.join(RESOLUCIONES)}")
+
+
+def serie_entradas(engine, desde: Optional[date] = None, hasta: Optional[date] = None,
+                   resolucion: str = "auto", max_puntos: int = 120) -> Dict[str, Any]:
+    """Serie continua (las cubetas sin entradas valen 0) lista para graficar.
+
+    Sin `desde` se toma la primera entrada registrada; sin `hasta`, hoy. Cada punto
+    lleva el inicio de su cubeta: el día, el lunes de la semana, el 1 del mes o
+    'YYYY-MM-DD HH:00' para horas.
+    """
+    validar_resolucion(resolucion)
+    max_puntos = max(2, max_puntos)
+    hasta = hasta or datetime.now().date()
+    with engine.connect() as conn:
+        desde = desde or primera_fecha(conn) or hasta
+        if desde > hasta:
+            desde, hasta = hasta, desde
+        elegida = elegir_resolucion(desde, hasta, max_puntos, resolucion)
+        conteos = _conteos(conn, desde, hasta, elegida == "hora")
+    return armar_serie(conteos, desde, hasta, elegida)
+
+
+def conteos_por_hora(conn, desde: date, hasta: date) -> Dict[tuple, int]:
+    """{(dia, hora)} → total en el rango, activas y archivadas"""
+    return _conteos(conn, desde, hasta, por_hora=True)
+
+
+def perfil_horario(engine, desde: Optional[date] = None, hasta: Optional[date] = None) -> Dict[str, Any]:
+    """Entradas por hora del día (0..23) sumadas sobre el rango; siempre 24 puntos"""
+    hasta = hasta or datetime.now().date()
+    with engine.connect() as conn:
+        desde = desde or primera_fecha(conn) or hasta
+        conteos = _conteos(conn, min(desde, hasta), max(desde, hasta), por_hora=True)
+    horas: List[int] = [0] * 24
+    for (_, hora), total in conteos.items():
+        if 0 <= hora < 24:
+            horas[hora] += total
+    return {
+        "desde": min(desde, hasta).isoformat(),
+        "hasta": max(desde, hasta).isoformat(),
+        "resolucion": "hora_del_dia",
+        "puntos": [{"hora": h, "total": t} for h, t in enumerate(horas)],
+        "total": sum(horas),
+    }
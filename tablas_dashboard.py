@@ -0,0 +1,67 @@
+# tablas_dashboard.py - JSON de la API a DataFrames con tipos compactos: fechas parseadas una vez, categorías, enteros chicos
+from dataclasses import dataclass
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import pandas as pd
+
+
+@dataclass(frozen=True)
+class Esquema:
+    fechas: Tuple[str, ...] = ()
+    # Pocas variantes repetidas en muchas filas (estado, día, socio_id en tablas de hechos)
+    categorias: Tuple[str, ...] = ()
+    enteros: Tuple[str, ...] = ()
+    decimales: Tuple[str, ...] = ()
+    booleanos: Tuple[str, ...] = ()
+    # Columna datetime de la que se deriva `fecha` (el día, sin hora)
+    fecha_de: Optional[str] = None
+
+
+ESQUEMAS: Dict[str, Esquema] = {
+    "socios": Esquema(fechas=("vencimiento",)),
+    "entradas": Esquema(fechas=("fecha_hora",), enteros=("id",),
+                        categorias=("socio_id", "nombre_socio", "sede"), fecha_de="fecha_hora"),
+    "clases": Esquema(enteros=("id", "duracion_min", "capacidad_max"),
+                      categorias=("dia_semana", "hora_inicio", "instructor")),
+    "reservas": Esquema(fechas=("fecha_reserva",), enteros=("id", "clase_id"),
+                        categorias=("socio_id", "estado", "socio_nombre", "clase_nombre")),
+    "planes": Esquema(enteros=("id", "duracion_dias"), decimales=("precio",), booleanos=("activo",)),
+    "ultimas_entradas": Esquema(fechas=("ultima_entrada",)),
+    "pagos": Esquema(fechas=("fecha_pago", "fecha_vencimiento"), enteros=("id", "plan_id"), decimales=("monto",),
+                     categorias=("socio_id", "estado", "metodo_pago")),
+}
+
+
+def tipar(df: pd.DataFrame, esquema: Esquema) -> pd.DataFrame:
+    """Convierte en el sitio las columnas del esquema que traiga `df`; las fechas inválidas quedan NaT"""
+    for columna in esquema.fechas:
+        if columna in df.columns:
+            df[columna] = pd.to_datetime(df[columna], format="ISO8601", errors="coerce")
+    for columna in esquema.categorias:
+        if columna in df.columns:
+            df[columna] = df[columna].astype("category")
+    for columna in esquema.enteros:
+        if columna in df.columns:
+            df[columna] = pd.to_numeric(df[columna], errors="coerce", downcast="integer")
+    for columna in esquema.decimales:
+        if columna in df.columns:
+            df[columna] = pd.to_numeric(df[columna], errors="coerce", downcast="float")
+    for columna in esquema.booleanos:
+        if columna in df.columns:
+            df[columna] = df[columna].astype(bool)
+    if esquema.fecha_de and esquema.fecha_de in df.columns:
+        df["fecha"] = df[esquema.fecha_de].dt.normalize()
+    return df
+
+
+def a_dataframe(conjunto: str, registros: Iterable[Dict[str, Any]]) -> pd.DataFrame:
+    """Lista de dicts de la API → DataFrame tipado según ESQUEMAS[conjunto]"""
+    df = pd.DataFrame.from_records(list(registros))
+    if df.empty:
+        return df
+    return tipar(df, ESQUEMAS.get(conjunto, Esquema()))
+
+
+def memoria_mb(df: pd.DataFrame) -> float:
+    """Memoria real, contando el contenido de las columnas de texto"""
+    return round(float(df.memory_usage(deep=True).sum()) / 1024 / 1024, 2)
@@ -0,0 +1,43 @@
+# conftest.py - Bases SQLite temporales para las pruebas y la API apuntando a una de ellas
+import os
+import tempfile
+
+import pytest
+
+# main_completo lee la configuración al importarse: base y backups en un directorio temporal, instantáneas apagadas
+_DIRECTORIO = tempfile.mkdtemp(prefix="gimnasio_pruebas_")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_DIRECTORIO}/api.db")
+os.environ.setdefault("MANTENIMIENTO_DIR_BACKUPS", os.path.join(_DIRECTORIO, "backups"))
+os.environ.setdefault("MANTENIMIENTO_INTERVALO_HORAS", "0")
+os.environ.setdefault("ARCHIVO_INTERVALO_HORAS", "0")
+os.environ.setdefault("RECORDATORIOS_HORAS", "")
+os.environ.setdefault("IMPORTACION_DIRECTORIO", os.path.join(_DIRECTORIO, "importaciones"))
+os.environ.pop("INSTANTANEA_DIRECTORIO", None)
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlmodel import SQLModel  # noqa: E402
+
+import modelos  # noqa: E402,F401
+
+
+@pytest.fixture
+def engine(tmp_path):
+    """Base vacía con todas las tablas de modelos.py"""
+    engine = create_engine(f"sqlite:///{tmp_path}/prueba.db")
+    SQLModel.metadata.create_all(engine)
+    yield engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="session")
+def api():
+    import main_completo
+    main_completo.engine.echo = False
+    return main_completo
+
+
+@pytest.fixture
+def cliente(api):
+    from fastapi.testclient import TestClient
+    with TestClient(api.app, headers={"X-API-Key": "pruebas"}) as cliente:
+        yield cliente
@@ -0,0 +1,48 @@
+# test_admision.py - Identificación del cliente en el control de admisión
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from admision import ControlAdmision, ReglaAdmision
+
+
+def _cliente(**opciones) -> TestClient:
+    app = FastAPI()
+
+    @app.get("/reportes/x")
+    def reporte():
+        return {"ok": True}
+
+    app.add_middleware(ControlAdmision, reglas=[ReglaAdmision("/reportes/*", tasa_por_s=0.001, rafaga=1)], **opciones)
+    return TestClient(app)
+
+
+def _estado(cliente, **cabeceras) -> int:
+    return cliente.get("/reportes/x", headers=cabeceras).status_code
+
+
+def test_una_clave_inventada_no_abre_un_cubo_nuevo():
+    cliente = _cliente(claves=["dashboard"])
+    assert _estado(cliente, **{"X-API-Key": "inventada-1"}) == 200
+    # Otra clave desconocida cuenta como la misma IP
+    assert _estado(cliente, **{"X-API-Key": "inventada-2"}) == 429
+    # La clave válida tiene su propio cubo
+    assert _estado(cliente, **{"X-API-Key": "dashboard"}) == 200
+    assert _estado(cliente, **{"X-API-Key": "dashboard"}) == 429
+
+
+def test_x_forwarded_for_solo_detras_de_proxies_confiables():
+    sin_proxy = _cliente()
+    assert _estado(sin_proxy, **{"X-Forwarded-For": "10.0.0.1"}) == 200
+    assert _estado(sin_proxy, **{"X-Forwarded-For": "10.0.0.2"}) == 429
+
+    detras = _cliente(proxies_confiables=1)
+    assert _estado(detras, **{"X-Forwarded-For": "10.0.0.1"}) == 200
+    assert _estado(detras, **{"X-Forwarded-For": "10.0.0.2"}) == 200
+    # Lo que el cliente antepone no cuenta: vale la IP que agregó el proxy
+    assert _estado(detras, **{"X-Forwarded-For": "1.2.3.4, 10.0.0.1"}) == 429
+
+
+def test_un_render_del_dashboard_entra_en_la_rafaga_de_reportes(api):
+    regla = next(r for r in api.REGLAS_ADMISION if r.ruta == "/reportes/*")
+    # Dos series y el mapa de calor por render, al menos dos renders a la vez
+    assert regla.rafaga >= 6
@@ -0,0 +1,63 @@
+# test_alertas.py - Alerta de inactividad con entradas archivadas
+from datetime import date
+
+import pandas as pd
+from sqlmodel import Session
+
+import archivo_entradas
+import consultas
+from alertas import calcular_alertas
+from fuente_dashboard import FuenteLocal
+from modelos import Entrada, Socio
+
+HOY = date(2026, 10, 19)
+
+
+def _poblar(engine):
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Archivada", vencimiento="2999-01-01"))
+        session.add(Socio(id="2", nombre="Reciente", vencimiento="2999-01-01"))
+        session.add(Entrada(socio_id="1", nombre_socio="Archivada", fecha_hora="2026-01-10 09:00:00"))
+        session.add(Entrada(socio_id="1", nombre_socio="Archivada", fecha_hora="2026-02-02 19:00:00"))
+        session.add(Entrada(socio_id="2", nombre_socio="Reciente", fecha_hora="2026-10-18 10:00:00"))
+        session.commit()
+    archivo_entradas.preparar(engine)
+    for mes in ("2026-01", "2026-02"):
+        archivo_entradas.archivar_mes(engine, mes)
+
+
+def test_ultimas_entradas_incluye_los_meses_archivados(engine):
+    _poblar(engine)
+    with engine.connect() as conn:
+        ultimas = dict(conn.execute(consultas.ultimas_entradas()).all())
+        activas = conn.execute(consultas.listado(consultas.TABLAS["entradas"])).all()
+    assert [fila.socio_id for fila in activas] == ["2"]
+    assert ultimas == {"1": "2026-02-02 19:00:00", "2": "2026-10-18 10:00:00"}
+
+
+def test_socio_con_todas_sus_entradas_archivadas_sigue_en_la_alerta(engine):
+    _poblar(engine)
+    fuente = FuenteLocal(str(engine.url))
+    socios = fuente.tabla("socios", ["id", "nombre", "vencimiento"])
+    entradas = fuente.tabla("entradas", ["socio_id", "nombre_socio", "fecha_hora"])
+
+    sin_historico = calcular_alertas(socios, pd.DataFrame(), pd.DataFrame(), entradas, hoy=HOY)
+    assert sin_historico.inactivos.empty
+
+    resultado = calcular_alertas(socios, pd.DataFrame(), pd.DataFrame(), entradas, hoy=HOY,
+                                 ultimas_entradas=fuente.ultimas_entradas())
+    assert resultado.inactivos[["id", "dias_inactivo"]].to_dict("records") == [
+        {"id": "1", "dias_inactivo": (HOY - date(2026, 2, 2)).days}]
+
+
+def test_archivo_desactivado_por_defecto(engine):
+    archivador = archivo_entradas.ArchivadorEntradas(engine)
+    assert not archivador.habilitado
+    assert archivador.ejecutar_ahora()["estado"] == "error"
+    assert archivador.estado()["conserva_desde"] is None
+
+
+def test_endpoint_ultimas_entradas(cliente):
+    respuesta = cliente.get("/entradas/ultimas")
+    assert respuesta.status_code == 200
+    assert isinstance(respuesta.json(), list)
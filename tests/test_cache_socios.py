@@ -0,0 +1,62 @@
+# test_cache_socios.py - Cache de socios: invalidación durante una carga y entre workers
+import threading
+
+from sqlmodel import Session
+
+from cache_socios import CacheSocios
+from modelos import Socio
+
+
+def test_invalidar_durante_la_carga_no_guarda_el_valor_viejo():
+    cache = CacheSocios()
+    empezo, seguir = threading.Event(), threading.Event()
+
+    def cargar_lento(clave):
+        empezo.set()
+        seguir.wait(5)
+        return "viejo"
+
+    hilo = threading.Thread(target=cache.obtener, args=("1", cargar_lento))
+    hilo.start()
+    empezo.wait(5)
+    cache.invalidar("1")
+    seguir.set()
+    hilo.join()
+
+    assert cache.obtener("1", lambda clave: "nuevo") == "nuevo"
+    assert cache.estadisticas()["cargas_descartadas"] == 1
+
+
+def test_sin_invalidacion_la_carga_queda_en_cache():
+    cache = CacheSocios()
+    cargas = []
+    cache.obtener("1", lambda clave: cargas.append(clave) or "valor")
+    assert cache.obtener("1", lambda clave: cargas.append(clave) or "otro") == "valor"
+    assert cargas == ["1"]
+
+
+def test_cambio_de_otro_worker_invalida_la_entrada(engine):
+    import cambios
+    cambios.registrar_seguimiento(Socio)
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2020-01-01"))
+        session.commit()
+
+    def cargar(clave):
+        with Session(engine) as session:
+            socio = session.get(Socio, clave)
+            session.expunge(socio)
+            return socio
+
+    cache = CacheSocios(engine=engine, intervalo_verificacion=0)
+    assert cache.obtener("1", cargar).vencimiento == "2020-01-01"
+
+    # Renovación hecha por otro worker: sólo queda rastro en la tabla cambio
+    with Session(engine) as session:
+        socio = session.get(Socio, "1")
+        socio.vencimiento = "2999-01-01"
+        session.add(socio)
+        session.commit()
+
+    assert cache.obtener("1", cargar).vencimiento == "2999-01-01"
+    assert cache.estadisticas()["invalidaciones"] == 1
@@ -0,0 +1,79 @@
+# test_cambios.py - Registro de cambios: archivo de meses, retención, cursor vencido y orden de los inserts
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import func, select, update
+from sqlmodel import Session
+
+import archivo_entradas
+import cambios
+from modelos import Cambio, Entrada, Salida, Socio, VersionDatos
+
+cambios.registrar_seguimiento(Socio, Entrada)
+cambios.ordenar_inserciones(Entrada, Salida)
+
+
+def _poblar(engine):
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2999-01-01"))
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2020-01-15 10:00:00"))
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2020-02-03 18:00:00"))
+        session.commit()
+
+
+def test_archivar_un_mes_queda_en_el_registro(engine):
+    _poblar(engine)
+    with Session(engine) as session:
+        cursor = cambios.cursor_actual(session)
+    archivo_entradas.preparar(engine)
+    assert archivo_entradas.archivar_mes(engine, "2020-01") == 1
+
+    with Session(engine) as session:
+        pagina = cambios.obtener_cambios(session, cursor)
+    assert [(c["tabla"], c["id"], c["operacion"], c["datos"]) for c in pagina["cambios"]] == [
+        ("entrada", "2020-01", cambios.ARCHIVAR, None)]
+
+
+def test_podar_borra_lo_viejo_y_vence_los_cursores_anteriores(engine):
+    _poblar(engine)
+    viejo = (datetime.now() - timedelta(days=40)).strftime("%Y-%m-%d %H:%M:%S")
+    with engine.begin() as conn:
+        conn.execute(update(Cambio.__table__).where(Cambio.__table__.c.seq <= 2).values(fecha=viejo))
+
+    resumen = cambios.podar(engine, retener_dias=30, lote=1)
+    assert resumen["borrados"] == 2
+    assert resumen["podado_hasta"] == 2
+
+    with Session(engine) as session:
+        with pytest.raises(cambios.CursorVencido):
+            cambios.obtener_cambios(session, 1)
+        pagina = cambios.obtener_cambios(session, 2)
+    assert [c["seq"] for c in pagina["cambios"]] == [3]
+    # Una segunda pasada no encuentra nada más que borrar
+    assert cambios.podar(engine, retener_dias=30)["borrados"] == 0
+
+
+def test_cursor_vencido_es_410(cliente, api):
+    with api.engine.begin() as conn:
+        conn.execute(VersionDatos.__table__.insert().prefix_with("OR REPLACE")
+                     .values(nombre=cambios.PODADO, version=10**9))
+    try:
+        assert cliente.get("/cambios", params={"since": 5}).status_code == 410
+    finally:
+        with api.engine.begin() as conn:
+            conn.execute(VersionDatos.__table__.delete().where(VersionDatos.nombre == cambios.PODADO))
+
+
+def test_entradas_y_salidas_toman_el_bloqueo_antes_del_insert(engine, monkeypatch):
+    _poblar(engine)
+    filas_al_bloquear = []
+
+    def serializar(connection):
+        filas_al_bloquear.append(connection.execute(select(func.count()).select_from(Salida.__table__)).scalar())
+
+    monkeypatch.setattr(cambios, "_serializar", serializar)
+    with Session(engine) as session:
+        session.add(Salida(socio_id="1", fecha_hora="2020-02-03 19:00:00"))
+        session.commit()
+    # El bloqueo se pide con la tabla todavía sin la fila: el id se asigna ya con él tomado
+    assert filas_al_bloquear == [0]
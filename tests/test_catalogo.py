@@ -0,0 +1,59 @@
+# test_catalogo.py - Planes y clases en memoria: recarga cuando otro worker marca el cambio
+from sqlmodel import Session
+
+import catalogo
+from modelos import Clase, PlanMembresia
+
+
+def _plan(nombre: str) -> PlanMembresia:
+    return PlanMembresia(nombre=nombre, precio=100.0, duracion_dias=30, descripcion=nombre)
+
+
+def test_recarga_tras_marcar_cambio(engine):
+    with Session(engine) as session:
+        session.add(_plan("Mensual"))
+        session.add(Clase(nombre="Yoga", dia_semana="lunes", hora_inicio="18:00"))
+        catalogo.marcar_cambio(session, "planes")
+        session.commit()
+    referencia = catalogo.CatalogoReferencia(engine, intervalo_verificacion=0)
+    assert [p.nombre for p in referencia.planes()] == ["Mensual"]
+    assert [c.nombre for c in referencia.clases()] == ["Yoga"]
+    assert referencia.estadisticas()["cargas"] == 2
+
+    # Sin cambio de versión sólo se verifica, no se recarga
+    referencia.planes()
+    assert referencia.estadisticas()["cargas"] == 2
+
+    # Otro worker agrega un plan y marca el cambio en la misma transacción
+    with Session(engine) as session:
+        session.add(_plan("Anual"))
+        catalogo.marcar_cambio(session, "planes")
+        session.commit()
+    assert sorted(p.nombre for p in referencia.planes()) == ["Anual", "Mensual"]
+    assert referencia.estadisticas()["versiones"]["planes"] == 2
+    # Las clases no cambiaron de versión
+    referencia.clases()
+    assert referencia.estadisticas()["cargas"] == 3
+
+
+def test_escritura_revertida_no_cambia_la_version(engine):
+    referencia = catalogo.CatalogoReferencia(engine, intervalo_verificacion=0)
+    assert referencia.planes() == []
+    with Session(engine) as session:
+        session.add(_plan("Mensual"))
+        catalogo.marcar_cambio(session, "planes")
+        session.rollback()
+    assert referencia.planes() == []
+    assert referencia.estadisticas()["versiones"]["planes"] == 0
+
+
+def test_dentro_del_intervalo_usa_la_copia_hasta_invalidar(engine):
+    referencia = catalogo.CatalogoReferencia(engine, intervalo_verificacion=3600)
+    assert referencia.planes() == []
+    with Session(engine) as session:
+        session.add(_plan("Mensual"))
+        catalogo.marcar_cambio(session, "planes")
+        session.commit()
+    assert referencia.planes() == []
+    referencia.invalidar("planes")
+    assert [p.nombre for p in referencia.planes()] == ["Mensual"]
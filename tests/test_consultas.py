@@ -0,0 +1,90 @@
+# test_consultas.py - Detalle de reservas: páginas por cursor, filtros y límites de fecha
+from datetime import date
+
+from sqlmodel import Session
+
+import consultas
+from modelos import Clase, Reserva, Socio
+
+
+def _reservas(engine):
+    """Yoga: 5 reservas del 1 al 5 de octubre (la del 3 cancelada); Spinning: 2 del 2 y 4"""
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2999-01-01"))
+        yoga = Clase(nombre="Yoga", dia_semana="lunes", hora_inicio="18:00")
+        spinning = Clase(nombre="Spinning", dia_semana="martes", hora_inicio="07:00")
+        session.add_all([yoga, spinning])
+        session.commit()
+        for dia in range(1, 6):
+            session.add(Reserva(socio_id="1", clase_id=yoga.id, fecha_reserva=f"2026-10-0{dia}",
+                                estado="cancelada" if dia == 3 else "confirmada"))
+            if dia in (2, 4):
+                session.add(Reserva(socio_id="1", clase_id=spinning.id, fecha_reserva=f"2026-10-0{dia}"))
+            session.commit()
+        return yoga.id, spinning.id
+
+
+def _paginas(conn, **filtros):
+    paginas, antes_de = [], None
+    while True:
+        pagina = consultas.detalle_reservas(conn, antes_de=antes_de, **filtros)
+        paginas.append([fila["id"] for fila in pagina["reservas"]])
+        if pagina["siguiente"] is None:
+            return paginas, pagina
+        antes_de = pagina["siguiente"]
+
+
+def test_siguiente_recorre_todas_las_paginas_sin_repetir(engine):
+    _reservas(engine)
+    with engine.connect() as conn:
+        paginas, ultima = _paginas(conn, limite=3)
+    assert [len(p) for p in paginas] == [3, 3, 1]
+    ids = [i for p in paginas for i in p]
+    assert ids == sorted(ids, reverse=True) and len(set(ids)) == 7
+    # Los totales son de todo el filtro, no de la página
+    assert ultima["total"] == 7 and ultima["por_estado"] == {"confirmada": 6, "cancelada": 1}
+
+
+def test_antes_de_respeta_los_filtros(engine):
+    yoga, _ = _reservas(engine)
+    with engine.connect() as conn:
+        paginas, ultima = _paginas(conn, clase_id=yoga, estado="confirmada", limite=2)
+        filas = [consultas.detalle_reservas(conn, clase_id=yoga, estado="confirmada", antes_de=antes_de, limite=2)
+                 for antes_de in (None, paginas[0][-1])]
+    assert [len(p) for p in paginas] == [2, 2]
+    assert ultima["total"] == 4 and ultima["por_estado"] == {"confirmada": 4}
+    assert {(f["clase_nombre"], f["estado"]) for p in filas for f in p["reservas"]} == {("Yoga", "confirmada")}
+    assert [f["fecha_reserva"] for p in filas for f in p["reservas"]] == [
+        "2026-10-05", "2026-10-04", "2026-10-02", "2026-10-01"]
+
+
+def test_desde_y_hasta_incluyen_los_extremos(engine):
+    _reservas(engine)
+    with engine.connect() as conn:
+        pagina = consultas.detalle_reservas(conn, desde=date(2026, 10, 2), hasta=date(2026, 10, 4))
+        solo_desde = consultas.detalle_reservas(conn, desde=date(2026, 10, 5))
+        vacio = consultas.detalle_reservas(conn, desde=date(2026, 10, 5), hasta=date(2026, 10, 4))
+    assert sorted({f["fecha_reserva"] for f in pagina["reservas"]}) == ["2026-10-02", "2026-10-03", "2026-10-04"]
+    assert pagina["total"] == 5 and pagina["siguiente"] is None
+    assert solo_desde["total"] == 1
+    assert vacio == {"reservas": [], "siguiente": None, "total": 0, "por_estado": {}}
+
+
+def test_endpoint_pagina_con_filtros_y_fechas(api, cliente):
+    with Session(api.engine) as session:
+        session.merge(Socio(id="detalle-1", nombre="Eva", vencimiento="2999-01-01"))
+        clase = Clase(nombre="Pilates detalle", dia_semana="jueves", hora_inicio="19:00")
+        session.add(clase)
+        session.commit()
+        for dia in range(1, 4):
+            session.add(Reserva(socio_id="detalle-1", clase_id=clase.id, fecha_reserva=f"2026-11-0{dia}"))
+        session.commit()
+        clase_id = clase.id
+
+    params = {"clase_id": clase_id, "desde": "2026-11-02", "hasta": "2026-11-03", "limite": 1}
+    primera = cliente.get("/reservas/detalle", params=params).json()
+    segunda = cliente.get("/reservas/detalle", params={**params, "antes_de": primera["siguiente"]}).json()
+    assert [r["fecha_reserva"] for r in primera["reservas"] + segunda["reservas"]] == ["2026-11-03", "2026-11-02"]
+    assert primera["reservas"][0]["socio_nombre"] == "Eva" and primera["reservas"][0]["clase_nombre"] == "Pilates detalle"
+    assert primera["total"] == 2 and segunda["siguiente"] is None
+    assert cliente.get("/reservas/detalle", params={"desde": "no-es-fecha"}).status_code == 422
@@ -0,0 +1,58 @@
+# test_datos_dashboard.py - Almacén del dashboard acotado y respaldo anotado por entrada
+from datos_dashboard import AlmacenDatos, Conjunto
+from fuente_dashboard import FuenteConRespaldo
+
+
+def _almacen(**opciones) -> AlmacenDatos:
+    return AlmacenDatos({"pagina": Conjunto(lambda n: f"pagina {n}", ttl=60)}, intervalo=60, **opciones)
+
+
+def test_las_combinaciones_de_argumentos_no_crecen_sin_limite():
+    almacen = _almacen(max_entradas=3)
+    for n in range(10):
+        almacen.obtener("pagina", n)
+    assert len(almacen.estado()["conjuntos"]) == 3
+    # Quedan las usadas más recientemente
+    assert set(almacen.estado()["conjuntos"]) == {"pagina/7", "pagina/8", "pagina/9"}
+    assert almacen.descartadas == 7
+
+
+def test_las_entradas_sin_uso_expiran():
+    almacen = _almacen(expiracion=0.0)
+    almacen.obtener("pagina", 1)
+    almacen._podar()
+    assert almacen.estado()["conjuntos"] == {}
+    assert almacen.obtener("pagina", 1) == "pagina 1"
+
+
+class _Principal:
+    modo = "http"
+
+    def en_paralelo(self, funcion, argumentos):
+        return [funcion(a) for a in argumentos]
+
+    def tabla(self, conjunto, campos=None):
+        if conjunto == "socios":
+            raise ConnectionError("API dormida")
+        return f"{conjunto} de la API"
+
+
+class _Instantanea:
+    version = "20240101_120000"
+
+    def tabla(self, conjunto, campos=None):
+        return f"{conjunto} de la instantánea"
+
+
+def test_el_respaldo_queda_en_la_entrada_y_no_en_la_fuente():
+    fuente = FuenteConRespaldo(_Principal(), _Instantanea())
+    almacen = AlmacenDatos({
+        "socios": Conjunto(lambda: fuente.tabla("socios"), ttl=60),
+        "clases": Conjunto(lambda: fuente.tabla("clases"), ttl=60),
+    }, intervalo=60)
+
+    assert almacen.obtener_varios("socios", "clases") == ["socios de la instantánea", "clases de la API"]
+    assert almacen.respaldo("socios") == "instantánea 20240101_120000"
+    # Una lectura correcta posterior no borra el aviso de otra entrada
+    assert almacen.respaldo("clases") is None
+    assert not hasattr(fuente, "en_respaldo")
@@ -0,0 +1,40 @@
+# test_estadisticas_bd.py - Conteo exacto o estimación de sqlite_stat1 según el umbral
+from sqlalchemy import text
+from sqlmodel import Session
+
+from estadisticas_bd import EstadisticasBD
+from modelos import Entrada, Socio
+
+
+def _poblar_y_analizar(engine, filas_segun_stat: dict):
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2999-01-01"))
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2026-10-19 08:00:00"))
+        session.commit()
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+        # sqlite_stat1 se puede escribir: simula lo que dejaría ANALYZE en una base grande
+        for tabla, filas in filas_segun_stat.items():
+            conn.execute(text("UPDATE sqlite_stat1 SET stat = :stat WHERE tbl = :tabla"),
+                         {"stat": f"{filas} 1", "tabla": tabla})
+
+
+def test_encima_del_umbral_usa_la_estimacion(engine):
+    _poblar_y_analizar(engine, {"entrada": 250_000, "socio": 150_000})
+    tablas = EstadisticasBD(engine).calcular()["tablas"]
+    assert tablas["entrada"]["filas"] == 250_000 and tablas["entrada"]["filas_estimadas"] is True
+    # Por debajo del umbral se cuenta de verdad aunque haya estimación
+    assert tablas["socio"]["filas"] == 1 and tablas["socio"]["filas_estimadas"] is False
+
+
+def test_exacto_ignora_sqlite_stat1(engine):
+    _poblar_y_analizar(engine, {"entrada": 250_000})
+    tablas = EstadisticasBD(engine).calcular(exacto=True)["tablas"]
+    assert tablas["entrada"]["filas"] == 1 and tablas["entrada"]["filas_estimadas"] is False
+
+
+def test_sin_analyze_cuenta_todo(engine):
+    estadisticas = EstadisticasBD(engine, umbral_exacto=0)
+    tablas = estadisticas.calcular()["tablas"]
+    assert not any(t["filas_estimadas"] for t in tablas.values())
+    assert estadisticas.obtener()["cache"] is False and estadisticas.obtener()["cache"] is True
@@ -0,0 +1,97 @@
+# test_eventos.py - Bus de eventos: entrega, filtros, clientes lentos, SSE y WebSocket
+import asyncio
+import threading
+from datetime import datetime, timedelta
+
+from eventos import BusEventos, FIN, formatear_sse, generar_sse
+
+
+def test_publicar_entrega_a_los_suscriptores_del_tipo():
+    async def escenario():
+        bus = BusEventos()
+        todas = bus.suscribir()
+        solo_reservas = bus.suscribir({"reserva"})
+        bus.publicar("entrada", {"socio_id": "1"})
+        bus.publicar("reserva", {"clase_id": 2})
+        recibidos = [(await todas.siguiente(timeout=1))["tipo"], (await todas.siguiente(timeout=1))["tipo"]]
+        reserva = await solo_reservas.siguiente(timeout=1)
+        assert solo_reservas.cola.empty()
+        return recibidos, reserva
+
+    recibidos, reserva = asyncio.run(escenario())
+    assert recibidos == ["entrada", "reserva"]
+    assert reserva["datos"] == {"clase_id": 2}
+
+
+def test_publicar_desde_otro_hilo():
+    async def escenario():
+        bus = BusEventos()
+        suscripcion = bus.suscribir()
+        hilo = threading.Thread(target=bus.publicar, args=("entrada", {"n": 1}))
+        hilo.start()
+        evento = await suscripcion.siguiente(timeout=2)
+        hilo.join()
+        return evento
+
+    assert asyncio.run(escenario())["datos"] == {"n": 1}
+
+
+def test_cliente_lento_se_descarta_con_fin():
+    async def escenario():
+        bus = BusEventos(max_pendientes=3)
+        lento = bus.suscribir()
+        for n in range(4):
+            bus.publicar("entrada", {"n": n})
+        return bus, await lento.siguiente(timeout=1)
+
+    bus, evento = asyncio.run(escenario())
+    assert evento is FIN
+    assert bus.estadisticas()["suscriptores"] == 0
+    assert bus.estadisticas()["clientes_descartados"] == 1
+
+
+def test_cancelar_deja_de_entregar():
+    async def escenario():
+        bus = BusEventos()
+        suscripcion = bus.suscribir()
+        bus.cancelar(suscripcion)
+        bus.publicar("entrada", {})
+        return suscripcion
+
+    assert asyncio.run(escenario()).cola.empty()
+
+
+def test_sse_formato_y_cierre_del_cliente_lento():
+    evento = {"id": 7, "tipo": "entrada", "datos": {"nombre": "Ñandú"}}
+    assert formatear_sse(evento).startswith("id: 7\nevent: entrada\ndata: {")
+    assert "Ñandú" in formatear_sse(evento)
+
+    async def escenario():
+        bus = BusEventos(max_pendientes=1)
+        suscripcion = bus.suscribir()
+        bus.publicar("entrada", {"n": 1})
+        bus.publicar("entrada", {"n": 2})
+        return [trozo async for trozo in generar_sse(suscripcion)], bus
+
+    trozos, bus = asyncio.run(escenario())
+    assert trozos[0].startswith("retry:")
+    assert trozos[-1].startswith("event: desconectado")
+    assert bus.estadisticas()["suscriptores"] == 0
+
+
+def test_websocket_recibe_la_entrada_y_libera_la_suscripcion(api, cliente):
+    vencimiento = (datetime.now() + timedelta(days=30)).strftime("%Y-%m-%d")
+    cliente.post("/socios/", json={"id": "ws-1", "nombre": "Ana WS", "vencimiento": vencimiento})
+
+    with cliente.websocket_connect("/eventos/ws?tipos=entrada") as ws:
+        assert cliente.post("/entradas/", params={"socio_id": "ws-1"}).status_code == 200
+        evento = ws.receive_json()
+    assert evento["tipo"] == "entrada"
+    assert evento["datos"]["socio_id"] == "ws-1"
+
+    # Al cerrar el cliente el servidor cancela la suscripción aunque no lleguen eventos
+    for _ in range(50):
+        if api.bus_eventos.estadisticas()["suscriptores"] == 0:
+            break
+        threading.Event().wait(0.1)
+    assert api.bus_eventos.estadisticas()["suscriptores"] == 0
@@ -0,0 +1,74 @@
+# test_fuente_dashboard.py - FuenteLocal devuelve las mismas columnas y tipos que FuenteHTTP contra la API
+import pandas as pd
+import pytest
+from sqlmodel import Session
+
+from fuente_dashboard import FuenteHTTP, FuenteLocal
+from modelos import Clase, Entrada, Pago, PlanMembresia, Reserva, Socio
+
+
+class _ClientePruebas:
+    """Lo que FuenteHTTP usa de ClienteAPI, sobre el TestClient"""
+
+    def __init__(self, cliente):
+        self.cliente = cliente
+
+    def get(self, ruta, params=None):
+        respuesta = self.cliente.get(ruta, params=params)
+        respuesta.raise_for_status()
+        return respuesta.json()
+
+    def en_paralelo(self, funcion, argumentos):
+        return [funcion(a) for a in argumentos]
+
+
+@pytest.fixture
+def fuentes(api, cliente):
+    with Session(api.engine) as session:
+        session.merge(Socio(id="paridad-1", nombre="Paridad", vencimiento="2999-01-01", telefono="+5491100000000"))
+        clase = Clase(nombre="Paridad", dia_semana="viernes", hora_inicio="20:00")
+        plan = PlanMembresia(nombre="Paridad", precio=1000.5, duracion_dias=30, descripcion="Plan de prueba")
+        session.add_all([clase, plan])
+        session.commit()
+        session.add(Reserva(socio_id="paridad-1", clase_id=clase.id, fecha_reserva="2026-10-16"))
+        session.add(Entrada(socio_id="paridad-1", nombre_socio="Paridad", fecha_hora="2026-10-16 19:45:00"))
+        session.add(Pago(socio_id="paridad-1", plan_id=plan.id, monto=1000.5, fecha_pago="2026-10-01",
+                         fecha_vencimiento="2026-10-31", metodo_pago="efectivo"))
+        session.commit()
+        clase_id = clase.id
+    local = FuenteLocal(str(api.engine.url))
+    yield FuenteHTTP(_ClientePruebas(cliente)), local, clase_id
+    local.engine.dispose()
+
+
+def _tipos(df: pd.DataFrame) -> dict:
+    return {columna: str(tipo) for columna, tipo in df.dtypes.items()}
+
+
+@pytest.mark.parametrize("conjunto", ["socios", "entradas", "clases", "reservas", "planes", "pagos"])
+def test_tabla_mismas_columnas_y_tipos(fuentes, conjunto):
+    http, local, _ = fuentes
+    assert _tipos(local.tabla(conjunto)) == _tipos(http.tabla(conjunto))
+    assert _tipos(local.tabla(conjunto, ["id"])) == _tipos(http.tabla(conjunto, ["id"]))
+
+
+def test_reservas_con_nombres_y_detalle(fuentes):
+    http, local, clase_id = fuentes
+    assert _tipos(local.reservas(nombres=True)) == _tipos(http.reservas(nombres=True))
+
+    argumentos = (clase_id, "confirmada", "2026-10-01", "2026-10-31", None, 50)
+    pagina_local, pagina_http = local.reservas_detalle(*argumentos), http.reservas_detalle(*argumentos)
+    assert _tipos(pagina_local["reservas"]) == _tipos(pagina_http["reservas"])
+    assert pagina_local["reservas"].to_dict("records") == pagina_http["reservas"].to_dict("records")
+    assert {k: v for k, v in pagina_local.items() if k != "reservas"} == {
+        k: v for k, v in pagina_http.items() if k != "reservas"}
+
+
+def test_serie_entradas(fuentes):
+    http, local, _ = fuentes
+    argumentos = ("2026-10-16", "2026-10-16", "auto", 48)
+    serie_local, serie_http = local.serie_entradas(*argumentos), http.serie_entradas(*argumentos)
+    assert _tipos(serie_local["puntos"]) == _tipos(serie_http["puntos"])
+    assert serie_local["puntos"].equals(serie_http["puntos"])
+    assert {k: v for k, v in serie_local.items() if k != "puntos"} == {
+        k: v for k, v in serie_http.items() if k != "puntos"}
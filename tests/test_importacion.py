@@ -0,0 +1,52 @@
+# test_importacion.py - Reimportaciones parciales: sólo se pisan las columnas del archivo
+import io
+import time
+
+from sqlmodel import Session
+
+from importacion import Importador
+from modelos import Pago, PlanMembresia, Socio
+
+
+def _importar(engine, tmp_path, tipo: str, contenido: str):
+    importador = Importador(engine, directorio=str(tmp_path / "importaciones"))
+    trabajo = importador.iniciar(tipo, io.BytesIO(contenido.encode()), f"{tipo}.csv")
+    limite = time.monotonic() + 10
+    while trabajo.estado in ("en_cola", "procesando") and time.monotonic() < limite:
+        time.sleep(0.01)
+    assert trabajo.estado == "completado", trabajo.resumen()
+    return trabajo
+
+
+def test_reimportar_sin_contacto_conserva_email_y_telefono(engine, tmp_path):
+    _importar(engine, tmp_path, "socios",
+              "id,nombre,vencimiento,email,telefono\n"
+              "1,Ana,2025-01-01,ana@example.com,+5491100000001\n")
+
+    trabajo = _importar(engine, tmp_path, "socios",
+                        "id,nombre,vencimiento\n"
+                        "1,Ana María,2026-01-01\n"
+                        "2,Beto,2026-02-01\n")
+
+    assert (trabajo.insertados, trabajo.actualizados) == (1, 1)
+    with Session(engine) as session:
+        ana, beto = session.get(Socio, "1"), session.get(Socio, "2")
+        assert (ana.nombre, ana.vencimiento) == ("Ana María", "2026-01-01")
+        assert (ana.email, ana.telefono) == ("ana@example.com", "+5491100000001")
+        assert (beto.email, beto.telefono) == (None, None)
+
+
+def test_reimportar_pagos_sin_estado_no_lo_pisa(engine, tmp_path):
+    with Session(engine) as session:
+        session.add(PlanMembresia(id=1, nombre="Mensual", precio=100, duracion_dias=30, descripcion=""))
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2999-01-01"))
+        session.add(Pago(id=7, socio_id="1", plan_id=1, monto=100, fecha_pago="2020-01-01",
+                         fecha_vencimiento="2020-01-31", estado="anulado", metodo_pago="efectivo"))
+        session.commit()
+
+    _importar(engine, tmp_path, "pagos", "id,socio_id,plan_id,monto\n7,1,1,120\n")
+
+    with Session(engine) as session:
+        pago = session.get(Pago, 7)
+        assert pago.monto == 120
+        assert (pago.estado, pago.metodo_pago, pago.fecha_pago) == ("anulado", "efectivo", "2020-01-01")
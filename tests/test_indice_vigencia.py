@@ -0,0 +1,54 @@
+# test_indice_vigencia.py - El índice en memoria ve los cambios de socios escritos por otro worker o una importación
+from datetime import date
+
+from sqlalchemy import update
+from sqlmodel import Session
+
+import cambios
+from indice_vigencia import IndiceVigencia
+from modelos import Socio
+
+cambios.registrar_seguimiento(Socio)
+
+HOY = date(2026, 10, 19)
+
+
+def test_validar_ve_los_cambios_que_llegan_por_cambio(engine):
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2026-10-01"))
+        session.add(Socio(id="2", nombre="Luis", vencimiento="2026-12-31"))
+        session.commit()
+    indice = IndiceVigencia(engine, intervalo_verificacion=0)
+    indice.cargar()
+    assert indice.validar("1", HOY)["estado"] == "vencido"
+
+    # Otro worker renueva a Ana y da de baja a Luis por el ORM: quedan filas en `cambio`
+    with Session(engine) as session:
+        session.get(Socio, "1").vencimiento = "2026-11-19"
+        session.delete(session.get(Socio, "2"))
+        session.add(Socio(id="3", nombre="Eva", vencimiento="fecha rota"))
+        session.commit()
+    assert indice.validar("1", HOY) == {"socio_id": "1", "acceso": True, "estado": "vigente",
+                                         "vencimiento": "2026-11-19", "dias_restantes": 31}
+    assert indice.validar("2", HOY)["estado"] == "no_encontrado"
+    assert indice.validar("3", HOY)["estado"] == "fecha_invalida"
+
+    # Una importación escribe con SQL directo y anota el cambio a mano
+    with engine.begin() as conn:
+        conn.execute(update(Socio.__table__).where(Socio.__table__.c.id == "1").values(vencimiento="2026-10-18"))
+        cambios.registrar_cambios(conn, "socio", ["1"], "update")
+    assert not indice.vigente("1", HOY.toordinal())
+    assert indice.estadisticas()["cursor"] > 0
+
+
+def test_sin_pasar_el_intervalo_no_vuelve_a_la_base(engine):
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2026-10-01"))
+        session.commit()
+    indice = IndiceVigencia(engine, intervalo_verificacion=3600)
+    indice.cargar()
+    with Session(engine) as session:
+        session.get(Socio, "1").vencimiento = "2026-11-19"
+        session.commit()
+    assert indice.validar("1", HOY)["estado"] == "vencido"
+    assert indice.estadisticas()["sincronizaciones"] == 0
@@ -0,0 +1,89 @@
+# test_instantaneas.py - Exportar y leer instantáneas; sin INSTANTANEA_DIRECTORIO la API no importa pandas ni pyarrow
+import os
+import shutil
+import subprocess
+import sys
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_la_api_no_importa_pandas_sin_instantaneas(tmp_path):
+    entorno = {k: v for k, v in os.environ.items() if k != "INSTANTANEA_DIRECTORIO"}
+    entorno.update(DATABASE_URL=f"sqlite:///{tmp_path}/api.db", MANTENIMIENTO_DIR_BACKUPS=str(tmp_path / "backups"))
+    salida = subprocess.run(
+        [sys.executable, "-c", "import sys, main_completo; "
+                               "print(sorted(m for m in ('instantaneas', 'pandas', 'pyarrow') if m in sys.modules))"],
+        cwd=RAIZ, env=entorno, capture_output=True, text=True, check=True).stdout
+    assert salida.strip().splitlines()[-1] == "[]"
+
+
+def test_endpoints_de_instantanea_sin_directorio(cliente):
+    assert cliente.get("/admin/instantanea").json()["activo"] is False
+    assert cliente.post("/admin/instantanea/ejecutar").status_code == 400
+
+
+def _datos(engine):
+    from sqlmodel import Session
+
+    from modelos import Clase, Entrada, Reserva, Socio
+
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2999-01-01"))
+        session.add(Socio(id="2", nombre="Luis", vencimiento="2999-01-01"))
+        clase = Clase(nombre="Yoga", dia_semana="lunes", hora_inicio="18:00")
+        session.add(clase)
+        session.commit()
+        for i, socio in enumerate(["1", "2", "1"]):
+            session.add(Reserva(socio_id=socio, clase_id=clase.id, fecha_reserva=f"2026-10-1{i}",
+                                estado="cancelada" if i == 2 else "confirmada"))
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2026-10-19 08:15:00"))
+        session.add(Entrada(socio_id="2", nombre_socio="Luis", fecha_hora="2026-10-19 08:40:00"))
+        session.commit()
+        return clase.id
+
+
+def test_exportar_y_leer_con_fuente_instantanea(engine, tmp_path):
+    import instantaneas
+    from fuente_dashboard import FuenteInstantanea
+
+    clase_id = _datos(engine)
+    directorio = str(tmp_path / "instantaneas")
+    publicado = instantaneas.exportar(engine, directorio)
+    assert instantaneas.manifiesto(directorio)["version"] == publicado["version"]
+    assert publicado["conjuntos"]["socios"]["filas"] == 2
+    assert publicado["conjuntos"]["entradas_por_hora"]["filas"] == 1
+
+    fuente = FuenteInstantanea(directorio)
+    assert fuente.version == publicado["version"]
+    assert sorted(fuente.tabla("socios")["nombre"]) == ["Ana", "Luis"]
+
+    detalle = fuente.reservas_detalle(None, "confirmada", None, None, None, 1)
+    assert detalle["total"] == 2 and detalle["siguiente"] is not None
+    assert detalle["reservas"]["clase_nombre"].tolist() == ["Yoga"]
+    resto = fuente.reservas_detalle(None, "confirmada", None, None, detalle["siguiente"], 1)
+    assert resto["siguiente"] is None and len(resto["reservas"]) == 1
+
+    serie = fuente.serie_entradas("2026-10-19", "2026-10-19", "hora", 100)
+    assert serie["resolucion"] == "hora" and serie["total"] == 2
+    assert serie["puntos"].set_index("inicio")["total"].loc["2026-10-19 08:00"] == 2
+
+    mapa = fuente.mapa_calor("entradas", None)
+    assert mapa["total"] == 2 and mapa["valores"][0][8] == 2  # 2026-10-19 es lunes
+    assert fuente.mapa_calor("reservas", clase_id)["total"] == 2  # sólo las confirmadas
+
+
+def test_podar_no_borra_la_version_publicada(engine, tmp_path):
+    import instantaneas
+
+    directorio = str(tmp_path / "instantaneas")
+    primera = instantaneas.exportar(engine, directorio)["version"]
+    segunda = instantaneas.exportar(engine, directorio)["version"]
+    # Publicada la vieja (p. ej. la nueva se retiró a mano): podar con retener=1 no debe borrarla
+    shutil.copy(os.path.join(directorio, primera, instantaneas.MANIFIESTO),
+                os.path.join(directorio, instantaneas.ACTUAL))
+    assert instantaneas.podar(directorio, 1) == []
+    assert instantaneas.versiones(directorio) == [primera, segunda]
+
+    tercera = instantaneas.exportar(engine, directorio)["version"]
+    assert instantaneas.podar(directorio, 1) == [primera, segunda]
+    assert instantaneas.versiones(directorio) == [tercera]
@@ -0,0 +1,121 @@
+# test_mantenimiento_db.py - Retención de backups (cada base sólo poda los suyos) y copia con escrituras concurrentes
+import os
+import sqlite3
+
+import mantenimiento_db
+from mantenimiento_db import MantenimientoDB, backup_en_linea, backups_de
+
+
+def _crear_bd(ruta):
+    with sqlite3.connect(ruta) as conn:
+        conn.execute("CREATE TABLE t (x INTEGER)")
+        conn.execute("INSERT INTO t VALUES (1)")
+
+
+def _backup_viejo(directorio, nombre, sello):
+    ruta = os.path.join(directorio, f"{nombre}_{sello}.db")
+    open(ruta, "w").close()
+    return ruta
+
+
+def test_bases_con_prefijo_comun_no_se_borran_los_backups(tmp_path):
+    backups = str(tmp_path / "backups")
+    os.makedirs(backups)
+    gimnasio, limpio = str(tmp_path / "gimnasio.db"), str(tmp_path / "gimnasio_limpio.db")
+    _crear_bd(gimnasio)
+    _crear_bd(limpio)
+
+    nuevo_limpio = backup_en_linea(limpio, backups, retener=1)["archivo"]
+    nuevo_gimnasio = backup_en_linea(gimnasio, backups, retener=1)["archivo"]
+
+    assert backups_de("gimnasio", backups) == [nuevo_gimnasio]
+    assert backups_de("gimnasio_limpio", backups) == [nuevo_limpio]
+
+
+def test_la_retencion_ignora_archivos_ajenos(tmp_path):
+    backups = str(tmp_path / "backups")
+    os.makedirs(backups)
+    ruta = str(tmp_path / "gimnasio.db")
+    _crear_bd(ruta)
+    viejo = _backup_viejo(backups, "gimnasio", "20200101_000000")
+    ajeno = _backup_viejo(backups, "gimnasio", "manual")
+
+    nuevo = backup_en_linea(ruta, backups, retener=1)["archivo"]
+
+    assert not os.path.exists(viejo)
+    assert os.path.exists(ajeno)
+    assert os.path.exists(nuevo)
+
+
+def test_un_error_de_archivo_no_detiene_el_resto(tmp_path):
+    buena = str(tmp_path / "buena.db")
+    _crear_bd(buena)
+    rota = str(tmp_path / "rota.db")
+    os.makedirs(rota)  # existe pero no se puede abrir como base
+    mantenimiento = MantenimientoDB(None, [rota, buena], directorio_backups=str(tmp_path / "backups"),
+                                    intervalo_horas=0)
+
+    resumen = mantenimiento.ejecutar_ahora()
+
+    assert resumen[os.path.abspath(rota)]["estado"] == "error"
+    assert resumen[os.path.abspath(buena)]["estado"] == "ok"
+
+
+def _bd_grande(ruta, filas=2000):
+    with sqlite3.connect(ruta) as conn:
+        conn.execute("CREATE TABLE t (x TEXT)")
+        conn.executemany("INSERT INTO t VALUES (?)", [("x" * 500,)] * filas)
+
+
+def _filas(ruta):
+    with sqlite3.connect(ruta) as conn:
+        assert conn.execute("PRAGMA integrity_check").fetchone()[0] == "ok"
+        return conn.execute("SELECT COUNT(*) FROM t").fetchone()[0]
+
+
+class _OrigenConEscrituras:
+    """La conexión de origen del backup, con una escritura de otra conexión antes de cada tramo"""
+
+    def __init__(self, conn, otra):
+        self.conn, self.otra = conn, otra
+
+    def backup(self, copia, progress, **opciones):
+        def con_escritura(*args):
+            self.otra.execute("INSERT INTO t VALUES ('y')")
+            self.otra.commit()
+            progress(*args)
+        self.conn.backup(copia, progress=con_escritura, **opciones)
+
+    def __getattr__(self, nombre):
+        return getattr(self.conn, nombre)
+
+
+def test_escrituras_continuas_no_dejan_el_backup_en_bucle(tmp_path, monkeypatch):
+    ruta, backups = str(tmp_path / "gimnasio.db"), str(tmp_path / "backups")
+    _bd_grande(ruta)
+    conectar = sqlite3.connect
+    otra = conectar(ruta)
+    monkeypatch.setattr(mantenimiento_db.sqlite3, "connect",
+                        lambda destino, *a, **k: _OrigenConEscrituras(conectar(destino, *a, **k), otra)
+                        if destino == ruta else conectar(destino, *a, **k))
+    try:
+        resultado = backup_en_linea(ruta, backups, paginas_por_paso=1, pausa=0, max_reinicios=3)
+    finally:
+        otra.close()
+    monkeypatch.undo()
+
+    assert resultado["metodo"] == "vacuum_into" and resultado["reinicios"] == 4
+    assert _filas(resultado["archivo"]) > 2000
+    assert not os.path.exists(resultado["archivo"] + ".parcial")
+
+
+def test_pasado_el_tiempo_maximo_copia_con_vacuum_into(tmp_path):
+    ruta = str(tmp_path / "gimnasio.db")
+    _bd_grande(ruta)
+    resultado = backup_en_linea(ruta, str(tmp_path / "backups"), paginas_por_paso=1, max_duracion_s=0)
+    assert resultado["metodo"] == "vacuum_into"
+    assert _filas(resultado["archivo"]) == 2000
+
+    sin_escrituras = backup_en_linea(ruta, str(tmp_path / "backups"), paginas_por_paso=64, pausa=0)
+    assert sin_escrituras["metodo"] == "backup" and sin_escrituras["reinicios"] == 0
+    assert _filas(sin_escrituras["archivo"]) == 2000
@@ -0,0 +1,104 @@
+# test_migraciones.py - Revisiones nuevas y espera del lease entre workers
+import threading
+
+from sqlalchemy import create_engine, text
+from sqlmodel import Session
+
+import migraciones
+from modelos import VersionEsquema
+from programador import adquirir_bloqueo, liberar_bloqueo
+
+
+def _revision(revision_id: str):
+    return next(r for r in migraciones.REVISIONES if r.id == revision_id)
+
+
+def test_indices_de_reportes_son_revisiones(engine):
+    migraciones.migrar(engine)
+    assert {"ix_pago_fecha_pago", "ix_pago_socio_fecha", "ix_pago_fecha_vencimiento"} <= set(
+        migraciones._indices(engine, "pago"))
+    assert "ix_entrada_fecha_hora" in migraciones._indices(engine, "entrada")
+
+
+def test_clases_sin_instructor_reciben_el_valor_por_defecto(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/vieja.db")
+    with engine.begin() as conn:
+        # Tabla como la dejaba la 001 original: instructor sin valor por defecto
+        conn.execute(text("CREATE TABLE clase (id INTEGER PRIMARY KEY, nombre VARCHAR NOT NULL, "
+                          "dia_semana VARCHAR NOT NULL, hora_inicio VARCHAR NOT NULL, "
+                          "duracion_min INTEGER NOT NULL DEFAULT 60, capacidad_max INTEGER NOT NULL DEFAULT 20, "
+                          "instructor VARCHAR)"))
+        conn.execute(text("INSERT INTO clase (nombre, dia_semana, hora_inicio) VALUES ('Yoga', 'lunes', '09:00')"))
+
+    migraciones.migrar(engine, revisiones=[_revision("008")])
+
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT instructor FROM clase")).scalar() == migraciones.INSTRUCTOR_POR_DEFECTO
+
+
+def test_sin_lease_espera_a_que_el_otro_worker_termine(engine, monkeypatch):
+    monkeypatch.setattr(migraciones, "ESPERA_LEASE_S", 0.01)
+    aplicadas = []
+    revision = migraciones.Revision("900", "prueba", lambda e: aplicadas.append("900"))
+    migraciones.migrar(engine, revisiones=[])  # crea las tablas
+    assert adquirir_bloqueo(engine, migraciones.NOMBRE_BLOQUEO, 60, propietario="otro-worker")
+
+    resultado = []
+    hilo = threading.Thread(target=lambda: resultado.append(migraciones.migrar(engine, True, [revision])))
+    hilo.start()
+    hilo.join(0.2)
+    assert hilo.is_alive(), "no debe arrancar con el esquema sin migrar"
+
+    # El otro worker aplica la revisión y suelta el lease
+    with Session(engine) as session:
+        session.add(VersionEsquema(revision="900", descripcion="prueba", aplicada="2020-01-01T00:00:00", duracion_s=0))
+        session.commit()
+    liberar_bloqueo(engine, migraciones.NOMBRE_BLOQUEO, propietario="otro-worker")
+    hilo.join(5)
+
+    assert resultado == [[]]
+    assert aplicadas == []
+
+
+def test_sin_lease_no_espera_por_indices_en_linea(engine):
+    indice = migraciones.Revision("901", "índice", lambda e: None, en_linea=True)
+    migraciones.migrar(engine, revisiones=[])
+    assert adquirir_bloqueo(engine, migraciones.NOMBRE_BLOQUEO, 60, propietario="otro-worker")
+    assert migraciones.migrar(engine, True, [indice]) == ["901"]
+
+
+def test_archivar_toda_la_tabla_no_reutiliza_ids(tmp_path):
+    import archivo_entradas
+    from sqlmodel import SQLModel
+
+    engine = create_engine(f"sqlite:///{tmp_path}/ids.db")
+    with engine.begin() as conn:
+        # `entrada` como la creaba el modelo antes de la 009: INTEGER PRIMARY KEY sin AUTOINCREMENT
+        conn.execute(text("CREATE TABLE entrada (id INTEGER NOT NULL PRIMARY KEY, socio_id VARCHAR NOT NULL, "
+                          "nombre_socio VARCHAR NOT NULL, fecha_hora VARCHAR NOT NULL, "
+                          "sede VARCHAR NOT NULL DEFAULT 'principal')"))
+    SQLModel.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(text("INSERT INTO socio (id, nombre, vencimiento) VALUES ('1', 'Ana', '2999-01-01')"))
+        for i in range(3):
+            conn.execute(text("INSERT INTO entrada (socio_id, nombre_socio, fecha_hora) "
+                              "VALUES ('1', 'Ana', :f)"), {"f": f"2020-01-1{i} 10:00:00"})
+    archivo_entradas.preparar(engine)
+    assert archivo_entradas.archivar_mes(engine, "2020-01") == 3
+
+    migraciones.migrar(engine, revisiones=[_revision("009")])
+
+    with engine.begin() as conn:
+        assert "AUTOINCREMENT" in conn.execute(text(
+            "SELECT sql FROM sqlite_master WHERE name = 'entrada'")).scalar().upper()
+        conn.execute(text("INSERT INTO entrada (socio_id, nombre_socio, fecha_hora, sede) "
+                          "VALUES ('1', 'Ana', '2020-02-01 10:00:00', 'principal')"))
+        ids = conn.execute(text(f"SELECT id FROM {archivo_entradas.VISTA_HISTORICA} ORDER BY id")).scalars().all()
+    assert ids == [1, 2, 3, 4]
+
+
+def test_una_base_nueva_ya_crea_entrada_con_autoincrement(engine):
+    with engine.connect() as conn:
+        for tabla in ("entrada", "salida"):
+            ddl = conn.execute(text("SELECT sql FROM sqlite_master WHERE name = :t"), {"t": tabla}).scalar()
+            assert "AUTOINCREMENT" in ddl.upper()
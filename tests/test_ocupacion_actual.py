@@ -0,0 +1,76 @@
+# test_ocupacion_actual.py - Personas dentro por sede: entradas, salidas, caducidad y eventos de otros workers
+from datetime import datetime, timedelta
+
+from sqlalchemy import text
+from sqlmodel import Session
+
+from modelos import Entrada, Salida, Socio
+from ocupacion_actual import OcupacionActual
+
+
+def _hace(**delta) -> str:
+    return (datetime.now() - timedelta(**delta)).strftime("%Y-%m-%d %H:%M:%S")
+
+
+def _socios(engine, *ids):
+    with Session(engine) as session:
+        for socio_id in ids:
+            session.add(Socio(id=socio_id, nombre=f"Socio {socio_id}", vencimiento="2999-01-01"))
+        session.commit()
+
+
+def test_entradas_y_salidas_por_sede(engine):
+    _socios(engine, "1", "2", "3")
+    ocupacion = OcupacionActual(engine, intervalo_verificacion=3600)
+    ocupacion.cargar()
+    ocupacion.registrar_entrada("1", "centro", _hace(minutes=30))
+    ocupacion.registrar_entrada("2", "centro", _hace(minutes=20))
+    ocupacion.registrar_entrada("3", "norte", _hace(minutes=10))
+    assert ocupacion.ocupacion()["sedes"] == {"centro": 2, "norte": 1}
+
+    ocupacion.registrar_salida("1", "centro", _hace(minutes=5))
+    # Entrar en otra sede sin marcar la salida saca al socio de la anterior
+    ocupacion.registrar_entrada("2", "norte", _hace(minutes=4))
+    estado = ocupacion.ocupacion()
+    assert estado["sedes"] == {"norte": 2} and estado["total"] == 2
+    assert ocupacion.ocupacion("centro")["sedes"] == {"centro": 0}
+
+    # Un evento repetido o anterior al último del socio no cambia nada
+    ocupacion.registrar_salida("1", "centro", _hace(minutes=5))
+    ocupacion.registrar_entrada("1", "centro", _hace(minutes=30))
+    assert ocupacion.ocupacion()["total"] == 2
+
+
+def test_cargar_reproduce_la_ventana_y_sigue_las_filas_de_otros_workers(engine):
+    _socios(engine, "1", "2", "3")
+    with Session(engine) as session:
+        session.add(Entrada(socio_id="1", nombre_socio="Socio 1", fecha_hora=_hace(hours=1), sede="centro"))
+        session.add(Entrada(socio_id="2", nombre_socio="Socio 2", fecha_hora=_hace(minutes=50), sede="centro"))
+        session.add(Salida(socio_id="2", fecha_hora=_hace(minutes=40), sede="centro"))
+        # Fuera de la ventana de estancia_max_horas: no cuenta
+        session.add(Entrada(socio_id="3", nombre_socio="Socio 3", fecha_hora=_hace(hours=6), sede="norte"))
+        session.commit()
+
+    ocupacion = OcupacionActual(engine, estancia_max_horas=4, intervalo_verificacion=0)
+    ocupacion.cargar()
+    assert ocupacion.ocupacion()["sedes"] == {"centro": 1}
+
+    # Filas escritas por otro worker: se leen en la siguiente consulta
+    with Session(engine) as session:
+        session.add(Entrada(socio_id="3", nombre_socio="Socio 3", fecha_hora=_hace(minutes=1), sede="norte"))
+        session.add(Salida(socio_id="1", fecha_hora=_hace(minutes=1), sede="centro"))
+        session.commit()
+    assert ocupacion.ocupacion()["sedes"] == {"norte": 1}
+
+
+def test_quien_no_marca_la_salida_caduca(engine):
+    ocupacion = OcupacionActual(engine, estancia_max_horas=1, intervalo_verificacion=0, intervalo_barrido=0)
+    ocupacion.cargar()
+    ocupacion.registrar_entrada("1", "centro", _hace(hours=2))
+    ocupacion.registrar_entrada("2", "centro", _hace(minutes=10))
+    assert ocupacion.ocupacion()["sedes"] == {"centro": 1}
+    assert ocupacion.estadisticas()["expirados"] == 1
+
+    ocupacion.persistir()
+    with engine.connect() as conn:
+        assert conn.execute(text("SELECT sede, dentro FROM ocupacionsede")).all() == [("centro", 1)]
@@ -0,0 +1,75 @@
+# test_ocupacion_horaria.py - Mapa de calor: cancelaciones, clases editadas y altas de otros workers
+from sqlmodel import Session
+
+import cambios
+import catalogo
+from modelos import Clase, Entrada, Reserva, Socio
+from ocupacion_horaria import MapaCalor
+
+cambios.registrar_seguimiento(Socio, Entrada, Reserva)
+
+
+def _poblar(engine):
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2999-01-01"))
+        clase = Clase(nombre="Yoga", dia_semana="lunes", hora_inicio="18:00")
+        session.add(clase)
+        session.commit()
+        session.add(Reserva(socio_id="1", clase_id=clase.id, fecha_reserva="2026-10-19"))
+        session.commit()
+        return clase.id
+
+
+def _mapa(engine, **kwargs):
+    mapa = MapaCalor(engine, intervalo_verificacion=0, **kwargs)
+    with Session(engine) as session:
+        mapa.reconstruir(session)
+    return mapa
+
+
+def test_reserva_cancelada_se_descuenta(engine):
+    clase_id = _poblar(engine)
+    mapa = _mapa(engine)
+    assert mapa.matriz("reservas")["valores"][0][18] == 1
+
+    with Session(engine) as session:
+        reserva = session.get(Reserva, 1)
+        reserva.estado = "cancelada"
+        session.add(reserva)
+        session.commit()
+
+    assert mapa.matriz("reservas")["total"] == 0
+    assert mapa.matriz(clase_id=clase_id)["total"] == 0
+
+
+def test_clase_movida_de_dia_mueve_sus_reservas(engine):
+    clase_id = _poblar(engine)
+    mapa = _mapa(engine)
+    with Session(engine) as session:
+        clase = session.get(Clase, clase_id)
+        clase.dia_semana, clase.hora_inicio = "miércoles", "07:00"
+        session.add(clase)
+        catalogo.marcar_cambio(session, "clases")
+        session.commit()
+
+    valores = mapa.matriz("reservas")["valores"]
+    assert valores[0][18] == 0
+    assert valores[2][7] == 1
+
+
+def test_altas_de_otro_worker_entran_en_la_reconstruccion_periodica(engine):
+    _poblar(engine)
+    mapa = _mapa(engine, intervalo_reconstruccion=0)
+    with Session(engine) as session:
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2026-10-19 08:15:00"))
+        session.commit()
+    # 2026-10-19 es lunes
+    assert mapa.matriz("entradas")["valores"][0][8] == 1
+
+
+def test_sin_cambios_no_reconstruye(engine):
+    _poblar(engine)
+    mapa = _mapa(engine)
+    mapa.registrar_entrada("2026-10-20 10:00:00")
+    assert mapa.matriz("entradas")["valores"][1][10] == 1
+    assert mapa.reconstrucciones == 1
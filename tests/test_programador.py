@@ -0,0 +1,40 @@
+# test_programador.py - Recordatorios programados: desactivados por defecto y sin envíos a socios sin teléfono
+from datetime import datetime, timedelta
+
+from sqlmodel import Session
+
+from modelos import Socio
+from programador import ProgramadorRecordatorios
+
+
+def test_socios_sin_telefono_no_llegan_al_envio(engine):
+    vence = (datetime.now() + timedelta(days=1)).strftime("%Y-%m-%d")
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Con", vencimiento=vence, telefono="+5491100000000"))
+        session.add(Socio(id="2", nombre="Sin", vencimiento=vence))
+        session.add(Socio(id="3", nombre="Vacío", vencimiento=vence, telefono="  "))
+        session.commit()
+    enviados = []
+
+    def enviar(socios, dias):
+        enviados.extend(s["socio_id"] for s in socios)
+        return {"enviados": len(socios), "fallidos": 0}
+
+    resumen = ProgramadorRecordatorios(engine, horas=["09:00"], enviar=enviar).ejecutar_ahora()
+    assert enviados == ["1"]
+    assert resumen["procesados"] == 3
+    assert resumen["sin_telefono"] == 2
+
+
+def test_sin_horas_configuradas_no_hay_ejecuciones(engine):
+    # main_completo usa RECORDATORIOS_HORAS="" por defecto
+    programador = ProgramadorRecordatorios(engine, horas="".split(","))
+    assert programador.proxima_ejecucion() is None
+    programador.iniciar()
+    assert programador.estado()["activo"] is False
+
+
+def test_ejecutar_a_mano_sin_horas_configuradas_es_400(cliente):
+    # Bajo /admin/ para que lo limite el control de admisión; nunca envía si el programador está apagado
+    assert cliente.post("/admin/recordatorios/ejecutar").status_code == 400
+    assert cliente.post("/sistema-notificaciones/programador/ejecutar").status_code in (404, 405)
@@ -0,0 +1,57 @@
+# test_reportes_ingresos.py - Caché de periodos cerrados del reporte de ingresos
+from datetime import date, timedelta
+
+import pytest
+from sqlmodel import Session
+
+import cambios
+import reportes_ingresos
+from modelos import Pago, PlanMembresia, Socio
+
+
+@pytest.fixture(autouse=True)
+def cache_limpia(monkeypatch):
+    monkeypatch.setattr(reportes_ingresos, "VERIFICACION_S", 0.0)
+    monkeypatch.setattr(reportes_ingresos, "_sincronizacion", {"cursor": None, "planes": None, "verificado": 0.0})
+    reportes_ingresos.invalidar_cache()
+
+
+def _poblar(engine):
+    with Session(engine) as session:
+        session.add(PlanMembresia(id=1, nombre="Mensual", precio=100, duracion_dias=30, descripcion=""))
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2999-01-01"))
+        session.add(Pago(socio_id="1", plan_id=1, monto=100, fecha_pago="2020-01-01",
+                         fecha_vencimiento="2020-01-31", estado="pagado"))
+        session.commit()
+
+
+def test_no_se_cachea_mientras_corre_la_gracia():
+    hoy = date(2020, 3, 10)
+    assert not reportes_ingresos.periodo_cerrado("2020-02-29", 30, hoy)
+    assert reportes_ingresos.periodo_cerrado("2020-02-05", 30, hoy)
+
+
+def test_un_pago_de_otro_worker_invalida_la_cache(engine):
+    _poblar(engine)
+    primero = reportes_ingresos.reporte_ingresos(engine, "2020-01-01", "2020-01-31")
+    assert primero["cache"] is False
+    assert reportes_ingresos.reporte_ingresos(engine, "2020-01-01", "2020-01-31")["cache"] is True
+    assert primero["renovacion"][0]["renovados"] == 0
+
+    # Renovación tardía dentro de la gracia, escrita por otro proceso
+    with engine.begin() as conn:
+        id_pago = conn.execute(Pago.__table__.insert().values(
+            socio_id="1", plan_id=1, monto=100, fecha_pago="2020-02-15",
+            fecha_vencimiento="2020-03-16", estado="pagado")).inserted_primary_key[0]
+        cambios.registrar_cambios(conn, "pago", [id_pago], "insert")
+
+    despues = reportes_ingresos.reporte_ingresos(engine, "2020-01-01", "2020-01-31")
+    assert despues["cache"] is False
+    assert despues["renovacion"][0]["renovados"] == 1
+
+
+def test_periodo_reciente_no_usa_cache(engine):
+    _poblar(engine)
+    hasta = (date.today() - timedelta(days=5)).isoformat()
+    reportes_ingresos.reporte_ingresos(engine, "2020-01-01", hasta)
+    assert reportes_ingresos.reporte_ingresos(engine, "2020-01-01", hasta)["cache"] is False
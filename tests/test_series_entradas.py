@@ -0,0 +1,66 @@
+# test_series_entradas.py - Resolución según max_puntos, cubetas y suma de entradas activas con el archivo
+from datetime import date
+
+import pytest
+from sqlmodel import Session
+
+import series_entradas
+from modelos import Entrada, ResumenEntradasHora, Socio
+
+
+@pytest.mark.parametrize("desde, hasta, resolucion, esperado", [
+    (date(2026, 10, 19), date(2026, 10, 19), "hora", 24),
+    (date(2026, 10, 19), date(2026, 10, 25), "dia", 7),
+    # Lunes a lunes: dos semanas aunque sólo sean 8 días
+    (date(2026, 10, 19), date(2026, 10, 26), "semana", 2),
+    (date(2026, 10, 25), date(2026, 10, 26), "semana", 2),
+    (date(2025, 11, 30), date(2026, 2, 1), "mes", 4),
+])
+def test_cantidad_cubetas(desde, hasta, resolucion, esperado):
+    assert series_entradas.cantidad_cubetas(desde, hasta, resolucion) == esperado
+
+
+def test_elegir_resolucion():
+    una_semana = (date(2026, 10, 19), date(2026, 10, 25))
+    assert series_entradas.elegir_resolucion(*una_semana, 168) == "hora"
+    assert series_entradas.elegir_resolucion(*una_semana, 167) == "dia"
+    assert series_entradas.elegir_resolucion(*una_semana, 7, "dia") == "dia"
+    assert series_entradas.elegir_resolucion(*una_semana, 6, "dia") == "semana"
+    # Pedir una más gruesa nunca devuelve una más fina
+    assert series_entradas.elegir_resolucion(*una_semana, 1000, "mes") == "mes"
+    # El mes es el tope aunque no entre
+    assert series_entradas.elegir_resolucion(date(1990, 1, 1), date(2026, 1, 1), 10) == "mes"
+
+
+def test_meses_cruzan_el_cambio_de_anio():
+    assert series_entradas._siguiente(date(2025, 11, 1), "mes") == date(2025, 12, 1)
+    assert series_entradas._siguiente(date(2025, 12, 1), "mes") == date(2026, 1, 1)
+    serie = series_entradas.armar_serie({(date(2025, 12, 24),): 3, (date(2026, 1, 2),): 1},
+                                        date(2025, 11, 15), date(2026, 2, 10), "mes")
+    assert [(p["inicio"], p["total"]) for p in serie["puntos"]] == [
+        ("2025-11-01", 0), ("2025-12-01", 3), ("2026-01-01", 1), ("2026-02-01", 0)]
+
+
+def test_conteos_suman_activas_y_archivadas(engine):
+    with Session(engine) as session:
+        session.add(Socio(id="1", nombre="Ana", vencimiento="2999-01-01"))
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2026-10-19 08:10:00"))
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2026-10-19 18:30:00"))
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2026-10-21 07:00:00"))
+        # Fuera del rango por un segundo
+        session.add(Entrada(socio_id="1", nombre_socio="Ana", fecha_hora="2026-10-22 00:00:00"))
+        # Misma hora que una activa (parte del día ya archivada) y una hora sólo archivada
+        session.add(ResumenEntradasHora(fecha="2026-10-19", hora=8, total=4))
+        session.add(ResumenEntradasHora(fecha="2026-10-20", hora=12, total=2))
+        session.commit()
+
+    with engine.connect() as conn:
+        assert series_entradas.conteos_por_hora(conn, date(2026, 10, 19), date(2026, 10, 21)) == {
+            (date(2026, 10, 19), 8): 5, (date(2026, 10, 19), 18): 1,
+            (date(2026, 10, 20), 12): 2, (date(2026, 10, 21), 7): 1}
+        assert series_entradas._conteos(conn, date(2026, 10, 19), date(2026, 10, 21), por_hora=False) == {
+            (date(2026, 10, 19),): 6, (date(2026, 10, 20),): 2, (date(2026, 10, 21),): 1}
+        assert series_entradas.primera_fecha(conn) == date(2026, 10, 19)
+
+    serie = series_entradas.serie_entradas(engine, date(2026, 10, 19), date(2026, 10, 21), max_puntos=3)
+    assert serie["resolucion"] == "dia" and [p["total"] for p in serie["puntos"]] == [6, 2, 1]
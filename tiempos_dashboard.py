@@ -0,0 +1,108 @@
+# tiempos_dashboard.py - Tiempos por etapa del dashboard (fetch, decode, transform, chart) y su registro estructurado
+import json
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+ETAPAS = ("fetch", "decode", "transform", "chart", "otros")
+_local = threading.local()
+
+
+@contextmanager
+def recolectar():
+    """Acumula lo que midan `medir` en este hilo (p. ej. durante la carga de un conjunto)"""
+    previo = getattr(_local, "tiempos", None)
+    _local.tiempos = tiempos = {}
+    try:
+        yield tiempos
+    finally:
+        _local.tiempos = previo
+
+
+@contextmanager
+def medir(etapa: str):
+    """Suma la duración del bloque a `etapa` si hay un `recolectar` activo en el hilo; si no, no hace nada"""
+    inicio = time.perf_counter()
+    try:
+        yield
+    finally:
+        tiempos = getattr(_local, "tiempos", None)
+        if tiempos is not None:
+            tiempos[etapa] = tiempos.get(etapa, 0.0) + time.perf_counter() - inicio
+
+
+class Medidor:
+    """Cronómetro de un render: cada `marca(etapa)` asigna a `etapa` el tiempo desde la marca anterior.
+
+    Las marcas van después de cada bloque (cálculos → "transform", figura y
+    st.plotly_chart → "chart"); así no hace falta reindentar la sección. La
+    espera por datos se registra con `esperar_datos`, que reparte el tiempo
+    entre fetch y decode según lo que midieron las cargas hechas durante la
+    espera (las que salieron de la caché no suman nada).
+    """
+
+    def __init__(self, seccion: str, sesion: str = "", version: str = ""):
+        self.seccion = seccion
+        self.sesion = sesion
+        self.version = version
+        self.etapas: Dict[str, float] = {etapa: 0.0 for etapa in ETAPAS}
+        self.cargas: List[Dict[str, Any]] = []
+        self.inicio = time.perf_counter()
+        self._ultima = self.inicio
+        self.total: Optional[float] = None
+
+    def marca(self, etapa: str):
+        ahora = time.perf_counter()
+        self.etapas[etapa] = self.etapas.get(etapa, 0.0) + ahora - self._ultima
+        self._ultima = ahora
+
+    @contextmanager
+    def esperar_datos(self):
+        """Bloque que obtiene datos; el código previo sin marcar cuenta como transform.
+
+        Dentro se pueden añadir a `self.cargas` los tiempos de carga de cada
+        conjunto ({"conjunto", "fetch", "decode", "en_este_render"}).
+        """
+        self.marca("transform")
+        desde = len(self.cargas)
+        yield
+        ahora = time.perf_counter()
+        espera = ahora - self._ultima
+        propias = [c for c in self.cargas[desde:] if c.get("en_este_render")]
+        fetch = sum(c.get("fetch", 0.0) for c in propias)
+        decode = sum(c.get("decode", 0.0) for c in propias)
+        # Las cargas corren en paralelo: se reparte la espera real, no la suma de duraciones
+        parte_decode = espera * decode / (fetch + decode) if fetch + decode > 0 else 0.0
+        self.etapas["decode"] += parte_decode
+        self.etapas["fetch"] += espera - parte_decode
+        self._ultima = ahora
+
+    def terminar(self) -> Dict[str, Any]:
+        self.marca("otros")
+        self.total = self._ultima - self.inicio
+        return self.registro()
+
+    def registro(self) -> Dict[str, Any]:
+        return {
+            "evento": "render_dashboard",
+            "fecha": datetime.now().isoformat(timespec="seconds"),
+            "seccion": self.seccion,
+            "sesion": self.sesion,
+            "version": self.version,
+            "total_ms": round((self.total or 0.0) * 1000, 1),
+            "etapas_ms": {etapa: round(t * 1000, 1) for etapa, t in self.etapas.items()},
+            "cargas": [{"conjunto": c["conjunto"], "fetch_ms": round(c.get("fetch", 0.0) * 1000, 1),
+                        "decode_ms": round(c.get("decode", 0.0) * 1000, 1), "en_este_render": c.get("en_este_render")}
+                       for c in self.cargas],
+        }
+
+    def registrar(self) -> Dict[str, Any]:
+        """Termina el render y deja una línea JSON en el log (una por render, fácil de filtrar)"""
+        registro = self.terminar()
+        logger.info(json.dumps(registro, ensure_ascii=False))
+        return registro
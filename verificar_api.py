@@ -18,6 +18,7 @@ endpoints = [
     "/entradas/",
     "/pagos/",
     "/debug-routes",
+    "/stats",
     "/create-tables"
 ]
 
@@ -46,15 +47,25 @@ except Exception as e:
 
 print("="*50)
 print(" Verificando datos después de inicialización...")
-tables_to_check = ["/socios/", "/clases/", "/reservas/", "/pagos/"]
-for table in tables_to_check:
-    try:
-        response = requests.get(f"{BASE_URL}{table}")
-        if response.status_code == 200:
-            data = response.json()
-            count = len(data) if isinstance(data, list) else 0
-            print(f" {table:<15} - {count} registros")
-        else:
-            print(f" {table:<15} - Error: {response.status_code}")
-    except Exception as e:
-        print(f" {table:<15} - Error: {str(e)[:50]}...")
+tables_to_check = ["socio", "clase", "reserva", "pago"]
+try:
+    # /stats cuenta en la base; descargar cada tabla sólo para hacer len() no escala
+    response = requests.get(f"{BASE_URL}/stats", timeout=10)
+    if response.status_code == 200:
+        tablas = response.json()["tablas"]
+        for table in tables_to_check:
+            info = tablas.get(table)
+            if info is None:
+                print(f" {table:<15} - no existe")
+                continue
+            aprox = "~" if info["filas_estimadas"] else ""
+            print(f" {table:<15} - {aprox}{info['filas']} registros, {info['indices']} índices, "
+                  f"última escritura: {info['ultima_escritura'] or '-'}")
+    else:
+        # Servidor sin /stats: contar descargando el listado
+        for table in tables_to_check:
+            response = requests.get(f"{BASE_URL}/{table}s/")
+            data = response.json() if response.status_code == 200 else []
+            print(f" {table:<15} - {len(data) if isinstance(data, list) else 0} registros")
+except Exception as e:
+    print(f" Error consultando estadísticas: {str(e)[:50]}...")